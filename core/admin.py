@@ -1,6 +1,6 @@
 ﻿from django.contrib import admin
 
-from .models import Ingredient, IngredientCategory, Recipe, RecipeIngredient, ShoppingList, ShoppingListItem
+from .models import Ingredient, IngredientCategory, Recipe, RecipeIngredient, ShoppingList, ShoppingListItem, ShoppingListSnapshot
 
 
 @admin.register(IngredientCategory)
@@ -40,5 +40,12 @@ class ShoppingListAdmin(admin.ModelAdmin):
     inlines = [ShoppingListItemInline]
 
 
+@admin.register(ShoppingListSnapshot)
+class ShoppingListSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('shopping_list', 'item_count', 'created_at')
+    readonly_fields = ('shopping_list', 'item_count', 'created_at')
+    exclude = ('data',)
+
+
 admin.site.register(ShoppingListItem)
 admin.site.register(RecipeIngredient)
@@ -0,0 +1,139 @@
+import gzip
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import ShoppingList, ShoppingListSnapshot
+
+# Cold storage for old archived lists: one JSON document per line, gzip
+# compressed, one file per month of closing. Files are only ever appended to.
+FORMAT_VERSION = 1
+FILE_PATTERN = 'lists-{:%Y-%m}.ndjson.gz'
+
+
+def archive_directory():
+    return Path(settings.ARCHIVE_EXPORT_DIR)
+
+
+def archive_files(directory=None):
+    return sorted((directory or archive_directory()).glob('lists-*.ndjson.gz'))
+
+
+def export_records(lists):
+    # Frozen lists export their snapshot rows, older ones their live items.
+    list_ids = [shopping_list.id for shopping_list in lists]
+    payloads = {
+        snapshot.shopping_list_id: snapshot.payload()
+        for snapshot in ShoppingListSnapshot.objects.filter(shopping_list_id__in=list_ids)
+    }
+    live_rows = ShoppingListSnapshot.rows_for_lists([list_id for list_id in list_ids if list_id not in payloads])
+    participants = {list_id: [] for list_id in list_ids}
+    for list_id, user_id in ShoppingList.participants.through.objects.filter(
+        shoppinglist_id__in=list_ids
+    ).values_list('shoppinglist_id', 'user_id'):
+        participants[list_id].append(user_id)
+
+    for shopping_list in lists:
+        payload = payloads.get(shopping_list.id)
+        yield {
+            'format': FORMAT_VERSION,
+            'id': shopping_list.id,
+            'owner': shopping_list.owner_id,
+            'participants': participants[shopping_list.id],
+            'name': shopping_list.name,
+            'people_count': shopping_list.people_count,
+            'created_at': shopping_list.created_at.isoformat(),
+            'closed_at': shopping_list.closed_at.isoformat(),
+            'summary': shopping_list.summary,
+            'fields': payload['fields'] if payload else ShoppingListSnapshot.FIELDS,
+            'items': payload['items'] if payload else live_rows[shopping_list.id],
+        }
+
+
+def append_records(directory, records):
+    # One gzip member per file and call: concatenated members read back as a
+    # single stream, so earlier exports are never rewritten. Returns the files
+    # written, synced to disk.
+    lines = {}
+    for record in records:
+        path = directory / FILE_PATTERN.format(parse_datetime(record['closed_at']))
+        lines.setdefault(path, []).append(json.dumps(record, separators=(',', ':'), ensure_ascii=False))
+    directory.mkdir(parents=True, exist_ok=True)
+    for path, path_lines in lines.items():
+        with open(path, 'ab') as raw:
+            with gzip.GzipFile(filename='', mode='ab', fileobj=raw, mtime=0) as compressed:
+                compressed.write(('\n'.join(path_lines) + '\n').encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+    return list(lines)
+
+
+def read_records(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as handle:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+
+
+def restore_records(records, freeze=None):
+    # Lists already in the database are skipped, so a file can be replayed.
+    # Lists whose owner no longer exists cannot be restored.
+    if freeze is None:
+        freeze = getattr(settings, 'FREEZE_CLOSED_LISTS', True)
+    records = {record['id']: record for record in records}
+    present = set(ShoppingList.objects.filter(id__in=records).values_list('id', flat=True))
+    users = set(
+        get_user_model().objects.filter(
+            id__in={user_id for record in records.values() for user_id in [record['owner'], *record['participants']]}
+        ).values_list('id', flat=True)
+    )
+    restorable = [
+        record for list_id, record in records.items() if list_id not in present and record['owner'] in users
+    ]
+
+    with transaction.atomic():
+        lists = ShoppingList.objects.bulk_create(
+            ShoppingList(
+                id=record['id'],
+                owner_id=record['owner'],
+                name=record['name'],
+                people_count=record['people_count'],
+                is_closed=True,
+                closed_at=parse_datetime(record['closed_at']),
+                summary=record['summary'],
+            )
+            for record in restorable
+        )
+        # auto_now_add overwrote the original creation dates.
+        for shopping_list, record in zip(lists, restorable):
+            shopping_list.created_at = parse_datetime(record['created_at'])
+        ShoppingList.objects.bulk_update(lists, ['created_at'])
+        ShoppingList.participants.through.objects.bulk_create(
+            ShoppingList.participants.through(shoppinglist_id=record['id'], user_id=user_id)
+            for record in restorable
+            for user_id in record['participants']
+            if user_id in users
+        )
+        snapshots = ShoppingListSnapshot.objects.bulk_create(
+            ShoppingListSnapshot.from_rows(
+                record['id'],
+                [
+                    [dict(zip(record['fields'], row)).get(field) for field in ShoppingListSnapshot.FIELDS]
+                    for row in record['items']
+                ],
+            )
+            for record in restorable
+        )
+        if not freeze:
+            for snapshot in snapshots:
+                snapshot.thaw()
+    return {
+        'restored': len(restorable),
+        'present': len(present),
+        'orphaned': len(records) - len(present) - len(restorable),
+    }
@@ -0,0 +1,68 @@
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import request_started
+from django.db.models import Subquery
+
+from .models import Counter, Ingredient, IngredientCategory
+from .pagination import estimate_row_count
+
+# The version lives in the database so every gunicorn worker sees a bump at
+# once; cached entries are keyed by it and simply stop being read when it moves.
+_state = threading.local()
+
+
+def _cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def _reset_version(**kwargs):
+    _state.version = None
+
+
+request_started.connect(_reset_version, dispatch_uid='core.catalog.reset_version')
+
+
+def get_version():
+    version = getattr(_state, 'version', None)
+    if version is None:
+        version = Counter.read(Counter.CATALOG_VERSION)
+        _state.version = version
+    return version
+
+
+def annotate_version(queryset):
+    # Reads the catalog version within the queryset's own query; hand the
+    # fetched value to prime_version() to skip the separate Counter read.
+    return queryset.annotate(
+        catalog_version=Subquery(Counter.objects.filter(name=Counter.CATALOG_VERSION).values('value')[:1])
+    )
+
+
+def prime_version(version):
+    _state.version = version or 0
+
+
+def invalidate():
+    Counter.increment(Counter.CATALOG_VERSION)
+    _reset_version()
+
+
+def _cached(name, compute):
+    key = f'catalog:{get_version()}:{name}'
+    cache = _cache()
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 3600))
+    return value
+
+
+def get_categories():
+    return _cached('categories', lambda: list(IngredientCategory.objects.order_by('name')))
+
+
+def get_ingredient_count_estimate():
+    return _cached('ingredient_estimate', partial(estimate_row_count, Ingredient))
@@ -5,6 +5,7 @@ from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 
+from . import catalog
 from .models import (
     Ingredient,
     IngredientCategory,
@@ -50,9 +51,12 @@ class IngredientForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['category'].queryset = IngredientCategory.objects.all().order_by('name')
         self.fields['category'].required = False
         self.fields['category'].empty_label = 'Sans catégorie'
+        # Rendering uses the cached catalog; validation still resolves the pk against the queryset.
+        self.fields['category'].choices = [('', 'Sans catégorie')] + [
+            (category.pk, category.name) for category in catalog.get_categories()
+        ]
 
     def clean_name(self):
         name = self.cleaned_data['name'].strip()
@@ -85,7 +89,7 @@ class RecipeIngredientQuickAddForm(forms.Form):
 
     def clean_ingredient_id(self):
         ingredient_id = self.cleaned_data['ingredient_id']
-        ingredient = Ingredient.objects.filter(pk=ingredient_id).first()
+        ingredient = Ingredient.objects.select_related('category').filter(pk=ingredient_id).first()
         if ingredient is None:
             raise ValidationError('Ingrédient introuvable.')
         return ingredient
@@ -102,40 +106,38 @@ class ShoppingListForm(forms.ModelForm):
 
 
 class AddRecipesForm(forms.Form):
-    def __init__(self, *args, recipes=None, default_people=1, **kwargs):
+    # The picker posts one `selection` value per recipe, "recipe_id:people".
+    # Without JavaScript the page's checkboxes post bare ids and the people
+    # count comes from the matching people_<id> field.
+    MAX_RECIPES = 50
+
+    selection = forms.CharField(required=False)
+
+    def __init__(self, *args, default_people=1, **kwargs):
         super().__init__(*args, **kwargs)
-        self.recipes = list(recipes) if recipes is not None else []
         self.default_people = max(int(default_people or 1), 1)
 
-        for recipe in self.recipes:
-            self.fields[f'select_{recipe.id}'] = forms.BooleanField(required=False)
-            self.fields[f'people_{recipe.id}'] = forms.IntegerField(
-                min_value=1,
-                required=False,
-                initial=self.default_people,
-                widget=forms.NumberInput(attrs={'min': 1, 'class': 'compact'}),
-            )
-
-    @property
-    def recipe_rows(self):
-        rows = []
-        for recipe in self.recipes:
-            rows.append(
-                {
-                    'recipe': recipe,
-                    'select': self[f'select_{recipe.id}'],
-                    'people': self[f'people_{recipe.id}'],
-                }
-            )
-        return rows
-
-    def selected_recipes(self):
-        selected = []
-        for recipe in self.recipes:
-            if self.cleaned_data.get(f'select_{recipe.id}'):
-                people = self.cleaned_data.get(f'people_{recipe.id}') or self.default_people
-                selected.append((recipe, int(people)))
-        return selected
+    def clean_selection(self):
+        tokens = self.data.getlist('selection') if hasattr(self.data, 'getlist') else []
+        selection = {}
+        for token in tokens:
+            recipe_id, _, people = str(token).partition(':')
+            people = people or self.data.get(f'people_{recipe_id}') or self.default_people
+            try:
+                recipe_id, people = int(recipe_id), int(people)
+            except (TypeError, ValueError):
+                raise ValidationError('Sélection invalide.')
+            if recipe_id < 1 or people < 1:
+                raise ValidationError('Sélection invalide.')
+            selection[recipe_id] = people
+
+        if not selection:
+            raise ValidationError('Sélectionnez au moins une recette.')
+        if len(selection) > self.MAX_RECIPES:
+            raise ValidationError(f'{self.MAX_RECIPES} recettes au maximum à la fois.')
+        if Recipe.objects.filter(id__in=selection).count() != len(selection):
+            raise ValidationError("Certaines recettes n'existent plus.")
+        return list(selection.items())
 
 
 class ManualItemQuickAddForm(forms.Form):
@@ -150,7 +152,7 @@ class ManualItemQuickAddForm(forms.Form):
 
     def clean_ingredient_id(self):
         ingredient_id = self.cleaned_data['ingredient_id']
-        ingredient = Ingredient.objects.filter(pk=ingredient_id).first()
+        ingredient = Ingredient.objects.select_related('category').filter(pk=ingredient_id).first()
         if ingredient is None:
             raise ValidationError('Ingrédient introuvable.')
         return ingredient
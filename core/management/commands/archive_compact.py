@@ -0,0 +1,56 @@
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.archive import append_records, archive_directory, export_records
+from core.models import ShoppingList
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporte les listes clôturées plus anciennes que --older-than jours dans des fichiers '
+        'NDJSON compressés (ajout seulement), puis les supprime de la base.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=settings.ARCHIVE_RETENTION_DAYS,
+            help=f'Âge minimal depuis la clôture, en jours (défaut : {settings.ARCHIVE_RETENTION_DAYS}).',
+        )
+        parser.add_argument('--directory', type=Path, help='Répertoire des exports (défaut : ARCHIVE_EXPORT_DIR).')
+        parser.add_argument('--batch-size', type=int, default=500, help='Listes exportées puis supprimées par lot.')
+        parser.add_argument('--dry-run', action='store_true', help='Compte les listes concernées sans rien modifier.')
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 0 or options['batch_size'] <= 0:
+            raise CommandError('--older-than doit être positif ou nul et --batch-size positif.')
+        directory = Path(options['directory'] or archive_directory())
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        queryset = ShoppingList.objects.filter(is_closed=True, closed_at__lt=cutoff).order_by('closed_at', 'id')
+
+        if options['dry_run']:
+            self.stdout.write(f'{queryset.count()} listes clôturées avant le {cutoff:%d/%m/%Y} seraient exportées.')
+            return
+
+        # Each batch is written and synced before it is deleted: an interrupted
+        # run leaves at worst duplicates in the files, which restore skips.
+        exported = 0
+        files = set()
+        while batch := list(queryset[:options['batch_size']]):
+            files.update(append_records(directory, export_records(batch)))
+            with transaction.atomic():
+                ShoppingList.objects.filter(id__in=[shopping_list.id for shopping_list in batch]).delete()
+            exported += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{exported} listes clôturées avant le {cutoff:%d/%m/%Y} exportées dans {len(files)} fichier(s) '
+                f'de {directory}.'
+            )
+        )
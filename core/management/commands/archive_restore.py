@@ -0,0 +1,44 @@
+import itertools
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archive import archive_directory, archive_files, read_records, restore_records
+
+
+class Command(BaseCommand):
+    help = 'Réimporte des listes exportées par archive_compact (les listes déjà présentes sont ignorées).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', type=Path, help='Fichiers à relire (défaut : tous ceux du répertoire).')
+        parser.add_argument('--directory', type=Path, help='Répertoire des exports (défaut : ARCHIVE_EXPORT_DIR).')
+        parser.add_argument('--ids', help='Identifiants de listes séparés par des virgules.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Listes réimportées par transaction.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size doit être positif.')
+        try:
+            ids = {int(value) for value in options['ids'].split(',')} if options['ids'] else None
+        except ValueError:
+            raise CommandError(f"--ids invalide : {options['ids']!r}.")
+        directory = Path(options['directory'] or archive_directory())
+        files = [Path(path) for path in options['files']] or archive_files(directory)
+        if not files:
+            raise CommandError('Aucun fichier d\'archive à relire.')
+
+        totals = {'restored': 0, 'present': 0, 'orphaned': 0}
+        for path in files:
+            if not path.is_file():
+                raise CommandError(f'Fichier introuvable : {path}')
+            records = (record for record in read_records(path) if ids is None or record['id'] in ids)
+            while batch := list(itertools.islice(records, options['batch_size'])):
+                for key, value in restore_records(batch).items():
+                    totals[key] += value
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{totals['restored']} listes réimportées, {totals['present']} déjà présentes, "
+                f"{totals['orphaned']} sans propriétaire."
+            )
+        )
@@ -0,0 +1,343 @@
+import json
+import math
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import Resolver404, resolve
+
+# Worker processes only use the standard library: each one drives a single
+# keep-alive connection, so the client side never competes for one GIL.
+
+SEARCH_TERMS = ['tomate', 'poulet', 'fromage', 'carotte', 'saumon', 'chocolat', 'farine', 'courgette', 'citron']
+DEFAULT_WEIGHTS = 'search=4,toggle=4,dashboard=2,add_recipes=1'
+
+# The toggle form of each row, with the state it posts next.
+ITEM_PATTERN = re.compile(r'/lists/\d+/items/(\d+)/toggle/".*?name="checked" value="([01])"', re.S)
+RECIPE_PATTERN = re.compile(r'data-recipe-row data-recipe-id="(\d+)"')
+RECIPE_TERMS = ['gratin', 'soupe', 'tarte', 'salade', 'curry', 'poulet', 'risotto']
+CSRF_PATTERN = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class _Session:
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.netloc = parts.netloc
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cookies = {}
+        self.samples = []
+        self.connection = None
+
+    def _connect(self):
+        connection_class = HTTPSConnection if self.https else HTTPConnection
+        self.connection = connection_class(self.netloc, timeout=self.timeout)
+
+    def request(self, method, path, data=None, ajax=False):
+        headers = {'Accept': 'application/json' if ajax else 'text/html'}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        body = None
+        if method == 'POST':
+            body = urlencode(data or {}, doseq=True)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = self.cookies.get('csrftoken', '')
+            headers['Referer'] = self.base_url + path
+        if ajax:
+            headers['X-Requested-With'] = 'XMLHttpRequest'
+
+        if self.connection is None:
+            self._connect()
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            payload = response.read()
+            status = response.status
+        except (OSError, HTTPException):
+            # Drop the connection; the next request reconnects.
+            self.connection.close()
+            self.connection = None
+            self.samples.append((method, path, 0, time.perf_counter() - started))
+            return 0, None, b''
+        self.samples.append((method, path, status, time.perf_counter() - started))
+
+        for header in response.headers.get_all('Set-Cookie') or []:
+            cookie = SimpleCookie(header)
+            for name, morsel in cookie.items():
+                self.cookies[name] = morsel.value
+        return status, response.headers.get('Location'), payload
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+def _login(session, username, password):
+    status, _, payload = session.request('GET', '/accounts/login/')
+    match = CSRF_PATTERN.search(payload.decode('utf-8', 'replace'))
+    if status != 200 or not match:
+        return False
+    status, _, _ = session.request(
+        'POST',
+        '/accounts/login/',
+        {'username': username, 'password': password, 'csrfmiddlewaretoken': match.group(1)},
+    )
+    return status == 302
+
+
+def _active_list(session, state):
+    if 'list_id' not in state:
+        status, location, _ = session.request('GET', '/lists/active/')
+        match = re.search(r'/lists/(\d+)/', location or '')
+        if status != 302 or not match or 'new' in location:
+            return None
+        state['list_id'] = int(match.group(1))
+    return state['list_id']
+
+
+def _scenario_dashboard(session, rng, state):
+    session.request('GET', '/')
+
+
+def _scenario_search(session, rng, state):
+    # One request per keystroke from the second character, like a fast typist.
+    term = rng.choice(SEARCH_TERMS)
+    for length in range(2, len(term) + 1):
+        session.request('GET', '/api/ingredients/search/?' + urlencode({'q': term[:length]}), ajax=True)
+
+
+def _scenario_toggle(session, rng, state):
+    list_id = _active_list(session, state)
+    if list_id is None:
+        return
+    if not state.get('items'):
+        _, _, payload = session.request('GET', f'/lists/{list_id}/')
+        forms = ITEM_PATTERN.findall(payload.decode('utf-8', 'replace'))
+        # Item 0 is the row template cloned for live additions.
+        state['items'] = {int(item_id): checked for item_id, checked in forms if item_id != '0'}
+        if not state['items']:
+            return
+    item_id = rng.choice(list(state['items']))
+    # The same form data as the page: the token and the state to set.
+    data = {'csrfmiddlewaretoken': session.cookies.get('csrftoken', ''), 'checked': state['items'][item_id]}
+    status, _, payload = session.request('POST', f'/lists/{list_id}/items/{item_id}/toggle/', data, ajax=True)
+    if status == 200:
+        state['items'][item_id] = '0' if json.loads(payload)['checked'] else '1'
+    elif status == 404:
+        del state['items'][item_id]
+
+
+def _scenario_add_recipes(session, rng, state):
+    list_id = _active_list(session, state)
+    if list_id is None:
+        return
+    path = f'/lists/{list_id}/add-recipes/'
+    _, _, payload = session.request('GET', path)
+    recipe_ids = RECIPE_PATTERN.findall(payload.decode('utf-8', 'replace'))
+    # Like the picker: search, then pick among the results.
+    status, _, payload = session.request(
+        'GET', '/api/recipes/search/?' + urlencode({'q': rng.choice(RECIPE_TERMS)}), ajax=True
+    )
+    if status == 200:
+        recipe_ids = [result['id'] for result in json.loads(payload)['results']] or recipe_ids
+    if not recipe_ids:
+        return
+    data = {
+        'selection': [
+            f'{recipe_id}:{rng.randint(1, 6)}' for recipe_id in rng.sample(recipe_ids, min(3, len(recipe_ids)))
+        ]
+    }
+    session.request('POST', path, data)
+    # New items were added: reload them on the next toggle.
+    state.pop('items', None)
+
+
+SCENARIOS = {
+    'dashboard': _scenario_dashboard,
+    'search': _scenario_search,
+    'toggle': _scenario_toggle,
+    'add_recipes': _scenario_add_recipes,
+}
+
+
+def _run_session(index, config):
+    rng = random.Random(config['seed'] + index)
+    session = _Session(config['base_url'], config['timeout'])
+    username = config['usernames'][index % len(config['usernames'])]
+    names = list(config['weights'])
+    weights = [config['weights'][name] for name in names]
+    state = {}
+    try:
+        if not _login(session, username, config['password']):
+            return {'error': f'connexion impossible pour {username}', 'samples': session.samples}
+        # Logging in is not part of the measure: start the window afterwards.
+        session.samples = []
+        # Wall-clock bounds, comparable across the worker processes.
+        started = time.time()
+        deadline = time.monotonic() + config['duration']
+        while time.monotonic() < deadline:
+            SCENARIOS[rng.choices(names, weights)[0]](session, rng, state)
+            if config['think']:
+                time.sleep(rng.uniform(0, 2 * config['think']))
+        finished = time.time()
+    finally:
+        session.close()
+    return {'error': None, 'samples': session.samples, 'started': started, 'finished': finished}
+
+
+def _percentile(sorted_values, percent):
+    # Nearest-rank percentile.
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(percent / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def _url_name(path):
+    try:
+        match = resolve(urlsplit(path).path)
+    except Resolver404:
+        return 'unresolved'
+    return match.url_name or match.view_name
+
+
+class Command(BaseCommand):
+    help = (
+        'Charge un serveur local avec des sessions authentifiées concurrentes '
+        '(recherche, cochage, ajout de recettes, tableau de bord) et affiche '
+        'le débit et les latences p50/p95/p99 par route.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--sessions', type=int, default=8, help='Sessions concurrentes (un processus chacune).')
+        parser.add_argument('--duration', type=float, default=30.0, help='Durée de la mesure, en secondes.')
+        parser.add_argument('--think', type=float, default=0.0, help="Temps de réflexion moyen entre deux actions (s).")
+        parser.add_argument('--users', default='chef00001', help='Utilisateurs séparés par des virgules (cf. seed_load).')
+        parser.add_argument('--password', default='seed-password')
+        parser.add_argument('--weights', default=DEFAULT_WEIGHTS, help=f'Poids des scénarios ({DEFAULT_WEIGHTS}).')
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', dest='json_path', help='Écrit aussi le rapport en JSON dans ce fichier.')
+
+    def _parse_weights(self, value):
+        weights = {}
+        for part in value.split(','):
+            name, _, weight = part.partition('=')
+            name = name.strip()
+            if name not in SCENARIOS:
+                raise CommandError(f'Scénario inconnu : {name!r} (choix : {", ".join(SCENARIOS)}).')
+            try:
+                weights[name] = float(weight)
+            except ValueError:
+                raise CommandError(f'Poids invalide pour {name!r} : {weight!r}.')
+        if not any(weight > 0 for weight in weights.values()):
+            raise CommandError('Au moins un scénario doit avoir un poids positif.')
+        return weights
+
+    def handle(self, *args, **options):
+        if options['sessions'] < 1 or options['duration'] <= 0:
+            raise CommandError('--sessions et --duration doivent être positifs.')
+        config = {
+            'base_url': options['base_url'],
+            'usernames': [name.strip() for name in options['users'].split(',') if name.strip()],
+            'password': options['password'],
+            'weights': self._parse_weights(options['weights']),
+            'duration': options['duration'],
+            'think': options['think'],
+            'timeout': options['timeout'],
+            'seed': options['seed'],
+        }
+        if not config['usernames']:
+            raise CommandError('--users ne peut pas être vide.')
+
+        self.stdout.write(
+            f"{options['sessions']} sessions pendant {options['duration']:.0f}s sur {config['base_url']}…"
+        )
+        with ProcessPoolExecutor(max_workers=options['sessions']) as executor:
+            futures = [executor.submit(_run_session, index, config) for index in range(options['sessions'])]
+            outcomes = [future.result() for future in futures]
+
+        for outcome in outcomes:
+            if outcome['error']:
+                self.stderr.write(outcome['error'])
+
+        report = self._build_report(outcomes, options)
+        self._print_report(report)
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as handle:
+                json.dump(report, handle, indent=2, ensure_ascii=False)
+                handle.write('\n')
+
+    def _build_report(self, outcomes, options):
+        # The measured window, from the first session start to the last end:
+        # the last action overruns --duration, and sessions may stop early.
+        windows = [outcome for outcome in outcomes if not outcome['error']]
+        elapsed = 0.0
+        if windows:
+            elapsed = max(outcome['finished'] for outcome in windows) - min(outcome['started'] for outcome in windows)
+        by_route = {}
+        for outcome in outcomes:
+            for method, path, status, seconds in outcome['samples']:
+                route = by_route.setdefault((_url_name(path), method), {'latencies': [], 'errors': 0})
+                # Failed requests (network errors, 4xx and 5xx) are counted
+                # apart and kept out of the latency percentiles.
+                if status == 0 or status >= 400:
+                    route['errors'] += 1
+                else:
+                    route['latencies'].append(seconds)
+
+        routes = []
+        total = 0
+        errors = 0
+        for (url_name, method), route in sorted(by_route.items()):
+            latencies = sorted(route['latencies'])
+            requests = len(latencies) + route['errors']
+            total += requests
+            errors += route['errors']
+            routes.append(
+                {
+                    'url_name': url_name,
+                    'method': method,
+                    'requests': requests,
+                    'errors': route['errors'],
+                    'throughput': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+                    'p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+                    'p95_ms': round(_percentile(latencies, 95) * 1000, 1),
+                    'p99_ms': round(_percentile(latencies, 99) * 1000, 1),
+                    'max_ms': round(latencies[-1] * 1000, 1) if latencies else 0.0,
+                }
+            )
+        return {
+            'base_url': options['base_url'],
+            'sessions': options['sessions'],
+            'duration': round(elapsed, 2),
+            'requests': total,
+            'errors': errors,
+            'throughput': round((total - errors) / elapsed, 2) if elapsed else 0.0,
+            'routes': routes,
+        }
+
+    def _print_report(self, report):
+        header = f"{'route':<34} {'méthode':<7} {'req':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for route in report['routes']:
+            self.stdout.write(
+                f"{route['url_name']:<34} {route['method']:<7} {route['requests']:>7} {route['errors']:>5} "
+                f"{route['throughput']:>8.1f} {route['p50_ms']:>8.1f} {route['p95_ms']:>8.1f} "
+                f"{route['p99_ms']:>8.1f} {route['max_ms']:>8.1f}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{report['requests']} requêtes ({report['errors']} en erreur) en {report['duration']}s, "
+                f"{report['throughput']} req/s réussies (latences en ms)."
+            )
+        )
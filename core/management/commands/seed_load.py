@@ -0,0 +1,288 @@
+import itertools
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core import catalog
+from core.models import (
+    Ingredient,
+    IngredientCategory,
+    Recipe,
+    RecipeIngredient,
+    ShoppingList,
+    ShoppingListItem,
+    ShoppingListSnapshot,
+    UNIT_CHOICES,
+    build_list_summaries,
+)
+
+# Row counts at --scale 1: roughly one million rows once recipe ingredients
+# and list items are included.
+BASE_COUNTS = {
+    'users': 50,
+    'ingredients': 20000,
+    'recipes': 40000,
+    'open_lists': 100,
+    'closed_lists': 12000,
+}
+RECIPE_SIZE = (6, 14)
+OPEN_LIST_SIZE = (80, 200)
+CLOSED_LIST_SIZE = (20, 60)
+# Recipes and lists are generated in chunks so memory stays flat at any scale.
+CHUNK_SIZE = 2000
+
+CATALOG = {
+    'Fruits': ['Pomme', 'Poire', 'Banane', 'Orange', 'Citron', 'Fraise', 'Framboise', 'Abricot', 'Pêche', 'Cerise',
+               'Raisin', 'Mangue', 'Ananas', 'Kiwi', 'Prune', 'Figue', 'Myrtille', 'Clémentine'],
+    'Légumes': ['Tomate', 'Carotte', 'Courgette', 'Aubergine', 'Poivron', 'Oignon', 'Échalote', 'Ail', 'Poireau',
+                'Épinard', 'Chou-fleur', 'Brocoli', 'Haricot vert', 'Petit pois', 'Champignon', 'Potiron',
+                'Navet', 'Betterave', 'Céleri', 'Fenouil', 'Concombre', 'Salade'],
+    'Viandes': ['Poulet', 'Dinde', 'Bœuf', 'Veau', 'Porc', 'Agneau', 'Canard', 'Lardons', 'Jambon', 'Saucisse',
+                'Chorizo', 'Steak haché'],
+    'Poissons et fruits de mer': ['Saumon', 'Cabillaud', 'Thon', 'Sardine', 'Maquereau', 'Crevette', 'Moule',
+                                  'Colin', 'Truite', 'Lieu noir'],
+    'Produits laitiers': ['Lait', 'Beurre', 'Crème fraîche', 'Yaourt', 'Fromage blanc', 'Œuf', 'Crème liquide'],
+    'Fromages': ['Emmental', 'Comté', 'Gruyère', 'Parmesan', 'Mozzarella', 'Chèvre', 'Roquefort', 'Camembert',
+                 'Reblochon', 'Feta'],
+    'Céréales et féculents': ['Riz', 'Pâtes', 'Semoule', 'Quinoa', 'Boulgour', 'Lentilles', 'Pois chiches',
+                              'Pomme de terre', 'Farine', 'Flocons d\'avoine'],
+    'Boulangerie': ['Pain', 'Baguette', 'Pâte feuilletée', 'Pâte brisée', 'Pain de mie', 'Brioche', 'Tortilla'],
+    'Épicerie salée': ['Huile d\'olive', 'Huile de tournesol', 'Vinaigre', 'Moutarde', 'Bouillon', 'Sauce soja',
+                       'Concentré de tomate', 'Olives', 'Cornichons', 'Câpres'],
+    'Épicerie sucrée': ['Sucre', 'Miel', 'Chocolat', 'Confiture', 'Cacao', 'Levure chimique', 'Sucre vanillé',
+                        'Amandes', 'Noisettes', 'Noix'],
+    'Épices et aromates': ['Sel', 'Poivre', 'Paprika', 'Cumin', 'Curry', 'Curcuma', 'Cannelle', 'Muscade',
+                           'Thym', 'Laurier', 'Persil', 'Basilic', 'Ciboulette', 'Coriandre', 'Menthe'],
+    'Boissons': ['Eau minérale', 'Jus d\'orange', 'Jus de pomme', 'Vin blanc', 'Vin rouge', 'Bière', 'Cidre'],
+    'Surgelés': ['Épinards hachés', 'Frites', 'Poêlée de légumes', 'Glace vanille', 'Pizza', 'Haricots plats'],
+}
+QUALIFIERS = ['', 'bio', 'frais', 'fermier', 'extra', 'de saison', 'du marché', 'surgelé', 'en conserve',
+              'allégé', 'entier', 'sec', 'fumé', 'râpé', 'émincé', 'nature', 'premium', 'local']
+ORIGINS = ['', 'de France', 'de Bretagne', 'de Provence', 'd\'Alsace', 'de Normandie', 'du Sud-Ouest',
+           'd\'Italie', 'd\'Espagne', 'du Maroc', 'des Landes', 'de Savoie', 'd\'Auvergne', 'du Jura']
+
+DISHES = ['Gratin', 'Velouté', 'Tarte', 'Salade', 'Curry', 'Risotto', 'Poêlée', 'Quiche', 'Soupe', 'Clafoutis',
+          'Blanquette', 'Tajine', 'Crumble', 'Wok', 'Cake', 'Lasagnes', 'Gaspacho', 'Parmentier', 'Ragoût', 'Bowl']
+DISH_STYLES = ['maison', 'de grand-mère', 'express', 'du dimanche', 'végétarien', 'à la provençale',
+               'à la normande', 'd\'été', 'd\'hiver', 'épicé', 'façon bistrot', 'rapide', 'gourmand', 'léger']
+
+UNITS = [value for value, _ in UNIT_CHOICES]
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Génère un gros jeu de données synthétique (≈ 1 million de lignes avec --scale 1).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help='Facteur appliqué à tous les volumes.')
+        parser.add_argument('--seed', type=int, default=42, help='Graine aléatoire (même graine, mêmes données).')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Lignes par INSERT.')
+        parser.add_argument('--password', default='seed-password', help='Mot de passe des utilisateurs créés.')
+        for name, default in BASE_COUNTS.items():
+            parser.add_argument(
+                f"--{name.replace('_', '-')}",
+                type=int,
+                dest=name,
+                help=f'Nombre exact, remplace {default} × scale.',
+            )
+
+    def handle(self, *args, **options):
+        if options['scale'] <= 0 or options['batch_size'] <= 0:
+            raise CommandError('--scale et --batch-size doivent être positifs.')
+
+        counts = {
+            name: options[name] if options[name] is not None else max(int(default * options['scale']), 1)
+            for name, default in BASE_COUNTS.items()
+        }
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.rows = 0
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            users = self._seed_users(counts['users'], options['password'])
+            ingredients = self._seed_ingredients(counts['ingredients'])
+            recipe_count = self._seed_recipes(counts['recipes'], users, ingredients)
+            open_count = self._seed_lists(counts['open_lists'], users, ingredients, closed=False)
+            closed_count = self._seed_lists(counts['closed_lists'], users, ingredients, closed=True)
+
+        # bulk_create sends no post_save signal: bump the catalog version by hand.
+        catalog.invalidate()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{self.rows} lignes en {elapsed:.1f}s ({self.rows / max(elapsed, 1e-9):.0f} lignes/s) : '
+                f'{len(users)} utilisateurs, {len(ingredients)} ingrédients, {recipe_count} recettes, '
+                f'{open_count} listes ouvertes, {closed_count} listes clôturées.'
+            )
+        )
+
+    def _bulk_create(self, model, objects):
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.rows += len(created)
+        return created
+
+    def _insert_rows(self, model, fields, rows):
+        # The two child tables hold most of the rows. Their values are built
+        # already adapted and sent with executemany: bulk_create would spend
+        # most of its time preparing each value through the ORM.
+        columns = [model._meta.get_field(name).column for name in fields + ['created_at']]
+        created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(model._meta.db_table),
+            ', '.join(connection.ops.quote_name(column) for column in columns),
+            ', '.join(['%s'] * len(columns)),
+        )
+        with connection.cursor() as cursor:
+            for batch in _batched(rows, self.batch_size):
+                cursor.executemany(sql, [row + (created_at,) for row in batch])
+                self.rows += len(batch)
+
+    def _seed_users(self, count, password):
+        User = get_user_model()
+        usernames = [f'chef{index:05d}' for index in range(1, count + 1)]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        # Hash once: the password hasher is deliberately slow.
+        password_hash = make_password(password)
+        self._bulk_create(
+            User,
+            [User(username=username, password=password_hash) for username in usernames if username not in existing],
+        )
+        return list(User.objects.filter(username__in=usernames).values_list('id', flat=True))
+
+    def _seed_ingredients(self, count):
+        categories = {}
+        for name in CATALOG:
+            category, created = IngredientCategory.objects.get_or_create(name=name)
+            self.rows += created
+            categories[name] = category.id
+
+        candidates = [
+            (' '.join(part for part in (base, qualifier, origin) if part), category)
+            for category, bases in CATALOG.items()
+            for base in bases
+            for qualifier in QUALIFIERS
+            for origin in ORIGINS
+        ]
+        self.rng.shuffle(candidates)
+
+        taken = set(Ingredient.objects.values_list('name', flat=True))
+        names = []
+        for round_number in itertools.count(1):
+            for name, category in candidates:
+                if len(names) == count:
+                    break
+                # Beyond the combinations, number the names to keep them unique.
+                if round_number > 1:
+                    name = f'{name} n°{round_number}'
+                if name not in taken:
+                    taken.add(name)
+                    names.append((name, category))
+            if len(names) == count:
+                break
+
+        self._bulk_create(
+            Ingredient,
+            (Ingredient(name=name, category_id=categories[category]) for name, category in names),
+        )
+        return dict(Ingredient.objects.filter(name__in=[name for name, _ in names]).values_list('id', 'name'))
+
+    def _seed_recipes(self, count, users, ingredients):
+        ingredient_ids = list(ingredients)
+        for chunk in _batched(range(count), CHUNK_SIZE):
+            recipes = self._bulk_create(
+                Recipe,
+                [
+                    Recipe(
+                        owner_id=self.rng.choice(users),
+                        name=f'{self.rng.choice(DISHES)} {self.rng.choice(DISH_STYLES)}',
+                    )
+                    for _ in chunk
+                ],
+            )
+            self._insert_rows(
+                RecipeIngredient,
+                ['recipe', 'ingredient', 'quantity_per_person', 'unit'],
+                (
+                    (
+                        recipe.id,
+                        ingredient_id,
+                        Decimal(self.rng.randint(5, 400)) / 4,
+                        self.rng.choice(UNITS),
+                    )
+                    for recipe in recipes
+                    for ingredient_id in self.rng.sample(
+                        ingredient_ids, min(self.rng.randint(*RECIPE_SIZE), len(ingredient_ids))
+                    )
+                ),
+            )
+        return count
+
+    def _seed_lists(self, count, users, ingredients, closed):
+        ingredient_ids = list(ingredients)
+        size_range = CLOSED_LIST_SIZE if closed else OPEN_LIST_SIZE
+        now = timezone.now()
+        for chunk in _batched(range(count), CHUNK_SIZE):
+            lists = []
+            for _ in chunk:
+                closed_at = now - timedelta(minutes=self.rng.randint(60, 3 * 365 * 24 * 60)) if closed else None
+                label = closed_at.strftime('%d/%m/%Y') if closed else f'semaine {self.rng.randint(1, 52)}'
+                lists.append(
+                    ShoppingList(
+                        owner_id=self.rng.choice(users),
+                        name=f'Courses {label}',
+                        people_count=self.rng.randint(1, 6),
+                        is_closed=closed,
+                        closed_at=closed_at,
+                    )
+                )
+            lists = self._bulk_create(ShoppingList, lists)
+
+            self._insert_rows(
+                ShoppingListItem,
+                ['shopping_list', 'ingredient', 'name', 'unit', 'quantity', 'per_person_quantity', 'checked'],
+                (
+                    row
+                    for shopping_list in lists
+                    for row in self._list_items(shopping_list, ingredients, ingredient_ids, size_range, closed)
+                ),
+            )
+            if closed:
+                # What ShoppingList.close() would have stored.
+                summaries = build_list_summaries(ShoppingListItem.objects.filter(shopping_list__in=lists))
+                for shopping_list in lists:
+                    shopping_list.summary = summaries.get(shopping_list.id)
+                ShoppingList.objects.bulk_update(lists, ['summary'], batch_size=self.batch_size)
+                if settings.FREEZE_CLOSED_LISTS:
+                    self.rows += len(ShoppingListSnapshot.freeze_many(shopping_list.id for shopping_list in lists))
+        return count
+
+    def _list_items(self, shopping_list, ingredients, ingredient_ids, size_range, closed):
+        size = min(self.rng.randint(*size_range), len(ingredient_ids))
+        for ingredient_id in self.rng.sample(ingredient_ids, size):
+            # Two thirds come from recipes (per person), the rest were added by hand.
+            per_person = Decimal(self.rng.randint(5, 400)) / 4 if self.rng.random() < 0.66 else None
+            quantity = per_person * shopping_list.people_count if per_person else Decimal(self.rng.randint(1, 10))
+            yield (
+                shopping_list.id,
+                ingredient_id,
+                ingredients[ingredient_id],
+                self.rng.choice(UNITS),
+                quantity,
+                per_person,
+                closed or self.rng.random() < 0.2,
+            )
@@ -0,0 +1,108 @@
+from django.db import migrations
+
+
+SQLITE_FTS_FORWARD = [
+    "CREATE VIRTUAL TABLE core_ingredient_fts USING fts5(name, category, tokenize='trigram')",
+    """
+    INSERT INTO core_ingredient_fts (rowid, name, category)
+    SELECT i.id, i.name, COALESCE(c.name, '')
+    FROM core_ingredient i LEFT JOIN core_ingredientcategory c ON c.id = i.category_id
+    """,
+    """
+    CREATE TRIGGER core_ingredient_fts_insert AFTER INSERT ON core_ingredient BEGIN
+        INSERT INTO core_ingredient_fts (rowid, name, category)
+        VALUES (
+            new.id,
+            new.name,
+            COALESCE((SELECT name FROM core_ingredientcategory WHERE id = new.category_id), '')
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER core_ingredient_fts_update AFTER UPDATE OF name, category_id ON core_ingredient BEGIN
+        UPDATE core_ingredient_fts
+        SET name = new.name,
+            category = COALESCE((SELECT name FROM core_ingredientcategory WHERE id = new.category_id), '')
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER core_ingredient_fts_delete AFTER DELETE ON core_ingredient BEGIN
+        DELETE FROM core_ingredient_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER core_ingredientcategory_fts_update AFTER UPDATE OF name ON core_ingredientcategory BEGIN
+        UPDATE core_ingredient_fts
+        SET category = new.name
+        WHERE rowid IN (SELECT id FROM core_ingredient WHERE category_id = new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER core_ingredientcategory_fts_delete AFTER DELETE ON core_ingredientcategory BEGIN
+        UPDATE core_ingredient_fts
+        SET category = ''
+        WHERE rowid IN (SELECT id FROM core_ingredient WHERE category_id = old.id);
+    END
+    """,
+]
+
+SQLITE_FTS_BACKWARD = [
+    'DROP TRIGGER IF EXISTS core_ingredientcategory_fts_delete',
+    'DROP TRIGGER IF EXISTS core_ingredientcategory_fts_update',
+    'DROP TRIGGER IF EXISTS core_ingredient_fts_delete',
+    'DROP TRIGGER IF EXISTS core_ingredient_fts_update',
+    'DROP TRIGGER IF EXISTS core_ingredient_fts_insert',
+    'DROP TABLE IF EXISTS core_ingredient_fts',
+]
+
+POSTGRES_TRGM_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS core_ingredient_name_trgm ON core_ingredient USING gin (name gin_trgm_ops)',
+]
+
+POSTGRES_TRGM_BACKWARD = [
+    'DROP INDEX IF EXISTS core_ingredient_name_trgm',
+]
+
+
+def _sqlite_supports_trigram_fts(connection):
+    # The FTS5 trigram tokenizer ships with SQLite 3.34+.
+    return connection.Database.sqlite_version_info >= (3, 34, 0)
+
+
+def create_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        statements = POSTGRES_TRGM_FORWARD
+    elif connection.vendor == 'sqlite' and _sqlite_supports_trigram_fts(connection):
+        statements = SQLITE_FTS_FORWARD
+    else:
+        return
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        statements = POSTGRES_TRGM_BACKWARD
+    elif connection.vendor == 'sqlite':
+        statements = SQLITE_FTS_BACKWARD
+    else:
+        return
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_ingredientcategory_ingredient_category'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:36
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def merge_duplicates(apps, schema_editor):
+    RecipeIngredient = apps.get_model('core', 'RecipeIngredient')
+    ShoppingListItem = apps.get_model('core', 'ShoppingListItem')
+
+    kept = {}
+    for row in RecipeIngredient.objects.order_by('id').iterator():
+        key = (row.recipe_id, row.ingredient_id, row.unit)
+        first = kept.get(key)
+        if first is None:
+            kept[key] = row
+            continue
+        first.quantity_per_person = (first.quantity_per_person + row.quantity_per_person).quantize(Decimal('0.01'))
+        first.save(update_fields=['quantity_per_person'])
+        row.delete()
+
+    kept = {}
+    for item in ShoppingListItem.objects.order_by('id').iterator():
+        key = (item.shopping_list_id, item.ingredient_id, item.unit, item.per_person_quantity is None)
+        first = kept.get(key)
+        if first is None or item.ingredient_id is None:
+            kept[key] = item
+            continue
+        first.quantity = (first.quantity + item.quantity).quantize(Decimal('0.01'))
+        if first.per_person_quantity is not None:
+            first.per_person_quantity = (first.per_person_quantity + item.per_person_quantity).quantize(
+                Decimal('0.0001')
+            )
+        first.checked = first.checked and item.checked
+        first.save(update_fields=['quantity', 'per_person_quantity', 'checked'])
+        item.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_counter'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient', 'unit'), name='unique_recipe_ingredient_unit'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('per_person_quantity__isnull', True)), fields=('shopping_list', 'ingredient', 'unit'), name='unique_manual_list_item'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('per_person_quantity__isnull', False)), fields=('shopping_list', 'ingredient', 'unit'), name='unique_per_person_list_item'),
+        ),
+    ]
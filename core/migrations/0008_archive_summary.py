@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:49
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+BATCH_SIZE = 500
+
+
+def backfill_summaries(apps, schema_editor):
+    ShoppingList = apps.get_model('core', 'ShoppingList')
+    ShoppingListItem = apps.get_model('core', 'ShoppingListItem')
+
+    # Keyset pagination on closed_at needs a value on every archived list.
+    for shopping_list in ShoppingList.objects.filter(is_closed=True, closed_at__isnull=True):
+        shopping_list.closed_at = shopping_list.created_at
+        shopping_list.save(update_fields=['closed_at'])
+
+    list_ids = list(ShoppingList.objects.filter(is_closed=True).values_list('id', flat=True))
+    for start in range(0, len(list_ids), BATCH_SIZE):
+        batch = list_ids[start:start + BATCH_SIZE]
+        summaries = {list_id: {'items': 0, 'checked': 0, 'categories': []} for list_id in batch}
+        rows = (
+            ShoppingListItem.objects.filter(shopping_list_id__in=batch)
+            .order_by()
+            .values('shopping_list_id', 'ingredient__category__name')
+            .annotate(item_count=Count('id'), checked_count=Count('id', filter=Q(checked=True)))
+        )
+        for row in rows:
+            summary = summaries[row['shopping_list_id']]
+            summary['items'] += row['item_count']
+            summary['checked'] += row['checked_count']
+            summary['categories'].append(
+                {
+                    'name': row['ingredient__category__name'] or 'Sans catégorie',
+                    'items': row['item_count'],
+                    'checked': row['checked_count'],
+                }
+            )
+        lists = list(ShoppingList.objects.filter(id__in=batch))
+        for shopping_list in lists:
+            shopping_list.summary = summaries[shopping_list.id]
+            shopping_list.summary['categories'].sort(
+                key=lambda category: (category['name'] == 'Sans catégorie', category['name'].lower())
+            )
+        ShoppingList.objects.bulk_update(lists, ['summary'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_unique_natural_keys'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='summary',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(condition=models.Q(('is_closed', True)), fields=['-closed_at', '-id'], name='shoppinglist_archive_idx'),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:53
+
+import json
+import zlib
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 200
+FIELDS = ['ingredient', 'name', 'category', 'quantity', 'per_person_quantity', 'unit', 'checked']
+
+
+def _sort_key(row):
+    category = row[2]
+    return (category.lower() if category else 'zzzzzzzz', row[6], row[1].lower())
+
+
+def freeze_closed_lists(apps, schema_editor):
+    if not getattr(settings, 'FREEZE_CLOSED_LISTS', True):
+        return
+    ShoppingList = apps.get_model('core', 'ShoppingList')
+    ShoppingListItem = apps.get_model('core', 'ShoppingListItem')
+    ShoppingListSnapshot = apps.get_model('core', 'ShoppingListSnapshot')
+
+    list_ids = list(ShoppingList.objects.filter(is_closed=True).values_list('id', flat=True))
+    for start in range(0, len(list_ids), BATCH_SIZE):
+        batch = list_ids[start:start + BATCH_SIZE]
+        rows = {list_id: [] for list_id in batch}
+        items = ShoppingListItem.objects.filter(shopping_list_id__in=batch).values_list(
+            'shopping_list_id',
+            'ingredient_id',
+            'name',
+            'ingredient__name',
+            'ingredient__category__name',
+            'quantity',
+            'per_person_quantity',
+            'unit',
+            'checked',
+        )
+        for list_id, ingredient_id, name, ingredient_name, category, quantity, per_person, unit, checked in items:
+            rows[list_id].append([
+                ingredient_id,
+                ingredient_name or name,
+                category or None,
+                str(quantity),
+                str(per_person) if per_person is not None else None,
+                unit,
+                checked,
+            ])
+        snapshots = []
+        for list_id, list_rows in rows.items():
+            list_rows.sort(key=_sort_key)
+            payload = {'version': 1, 'fields': FIELDS, 'items': list_rows}
+            data = zlib.compress(json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8'), 9)
+            snapshots.append(ShoppingListSnapshot(shopping_list_id=list_id, data=data, item_count=len(list_rows)))
+        ShoppingListSnapshot.objects.bulk_create(snapshots)
+        ShoppingListItem.objects.filter(shopping_list_id__in=batch).delete()
+
+
+def thaw_snapshots(apps, schema_editor):
+    Ingredient = apps.get_model('core', 'Ingredient')
+    ShoppingListItem = apps.get_model('core', 'ShoppingListItem')
+    ShoppingListSnapshot = apps.get_model('core', 'ShoppingListSnapshot')
+
+    existing = set(Ingredient.objects.values_list('id', flat=True))
+    for snapshot in ShoppingListSnapshot.objects.iterator(chunk_size=BATCH_SIZE):
+        payload = json.loads(zlib.decompress(bytes(snapshot.data)))
+        items = []
+        for row in payload['items']:
+            values = dict(zip(payload['fields'], row))
+            items.append(
+                ShoppingListItem(
+                    shopping_list_id=snapshot.shopping_list_id,
+                    ingredient_id=values['ingredient'] if values['ingredient'] in existing else None,
+                    name=values['name'],
+                    unit=values['unit'],
+                    quantity=values['quantity'],
+                    per_person_quantity=values['per_person_quantity'],
+                    checked=values['checked'],
+                )
+            )
+        ShoppingListItem.objects.bulk_create(items)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_archive_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListSnapshot',
+            fields=[
+                ('shopping_list', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='core.shoppinglist')),
+                ('data', models.BinaryField()),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(freeze_closed_lists, thaw_snapshots),
+    ]
@@ -0,0 +1,215 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:58
+
+from django.db import migrations, models
+
+RECIPES = 'recipe_count'
+OPEN_LISTS = 'open_list_count'
+
+SQLITE_FORWARD = [
+    """
+    CREATE TRIGGER core_shoppinglistitem_counts_insert AFTER INSERT ON core_shoppinglistitem BEGIN
+        UPDATE core_shoppinglist
+        SET item_count = item_count + 1, checked_count = checked_count + new.checked
+        WHERE id = new.shopping_list_id;
+    END
+    """,
+    """
+    CREATE TRIGGER core_shoppinglistitem_counts_update AFTER UPDATE OF checked, shopping_list_id
+    ON core_shoppinglistitem BEGIN
+        UPDATE core_shoppinglist
+        SET item_count = item_count - 1, checked_count = checked_count - old.checked
+        WHERE id = old.shopping_list_id;
+        UPDATE core_shoppinglist
+        SET item_count = item_count + 1, checked_count = checked_count + new.checked
+        WHERE id = new.shopping_list_id;
+    END
+    """,
+    """
+    CREATE TRIGGER core_shoppinglistitem_counts_delete AFTER DELETE ON core_shoppinglistitem BEGIN
+        UPDATE core_shoppinglist
+        SET item_count = item_count - 1, checked_count = checked_count - old.checked
+        WHERE id = old.shopping_list_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER core_recipe_count_insert AFTER INSERT ON core_recipe BEGIN
+        UPDATE core_counter SET value = value + 1 WHERE name = '{RECIPES}';
+    END
+    """,
+    f"""
+    CREATE TRIGGER core_recipe_count_delete AFTER DELETE ON core_recipe BEGIN
+        UPDATE core_counter SET value = value - 1 WHERE name = '{RECIPES}';
+    END
+    """,
+    f"""
+    CREATE TRIGGER core_open_list_count_insert AFTER INSERT ON core_shoppinglist WHEN NOT new.is_closed BEGIN
+        UPDATE core_counter SET value = value + 1 WHERE name = '{OPEN_LISTS}';
+    END
+    """,
+    f"""
+    CREATE TRIGGER core_open_list_count_update AFTER UPDATE OF is_closed ON core_shoppinglist
+    WHEN old.is_closed <> new.is_closed BEGIN
+        UPDATE core_counter
+        SET value = value + CASE WHEN new.is_closed THEN -1 ELSE 1 END
+        WHERE name = '{OPEN_LISTS}';
+    END
+    """,
+    f"""
+    CREATE TRIGGER core_open_list_count_delete AFTER DELETE ON core_shoppinglist WHEN NOT old.is_closed BEGIN
+        UPDATE core_counter SET value = value - 1 WHERE name = '{OPEN_LISTS}';
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS core_open_list_count_delete',
+    'DROP TRIGGER IF EXISTS core_open_list_count_update',
+    'DROP TRIGGER IF EXISTS core_open_list_count_insert',
+    'DROP TRIGGER IF EXISTS core_recipe_count_delete',
+    'DROP TRIGGER IF EXISTS core_recipe_count_insert',
+    'DROP TRIGGER IF EXISTS core_shoppinglistitem_counts_delete',
+    'DROP TRIGGER IF EXISTS core_shoppinglistitem_counts_update',
+    'DROP TRIGGER IF EXISTS core_shoppinglistitem_counts_insert',
+]
+
+POSTGRES_FORWARD = [
+    """
+    CREATE OR REPLACE FUNCTION core_shoppinglistitem_counts() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE core_shoppinglist
+            SET item_count = item_count - 1, checked_count = checked_count - OLD.checked::int
+            WHERE id = OLD.shopping_list_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE core_shoppinglist
+            SET item_count = item_count + 1, checked_count = checked_count + NEW.checked::int
+            WHERE id = NEW.shopping_list_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER core_shoppinglistitem_counts
+    AFTER INSERT OR DELETE OR UPDATE OF checked, shopping_list_id ON core_shoppinglistitem
+    FOR EACH ROW EXECUTE FUNCTION core_shoppinglistitem_counts()
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION core_recipe_count() RETURNS trigger AS $$
+    BEGIN
+        UPDATE core_counter
+        SET value = value + CASE TG_OP WHEN 'INSERT' THEN 1 ELSE -1 END
+        WHERE name = '{RECIPES}';
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER core_recipe_count AFTER INSERT OR DELETE ON core_recipe
+    FOR EACH ROW EXECUTE FUNCTION core_recipe_count()
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION core_open_list_count() RETURNS trigger AS $$
+    DECLARE
+        delta integer := 0;
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') AND NOT OLD.is_closed THEN
+            delta := delta - 1;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NOT NEW.is_closed THEN
+            delta := delta + 1;
+        END IF;
+        IF delta <> 0 THEN
+            UPDATE core_counter SET value = value + delta WHERE name = '{OPEN_LISTS}';
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER core_open_list_count AFTER INSERT OR DELETE OR UPDATE OF is_closed ON core_shoppinglist
+    FOR EACH ROW EXECUTE FUNCTION core_open_list_count()
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    'DROP TRIGGER IF EXISTS core_open_list_count ON core_shoppinglist',
+    'DROP FUNCTION IF EXISTS core_open_list_count()',
+    'DROP TRIGGER IF EXISTS core_recipe_count ON core_recipe',
+    'DROP FUNCTION IF EXISTS core_recipe_count()',
+    'DROP TRIGGER IF EXISTS core_shoppinglistitem_counts ON core_shoppinglistitem',
+    'DROP FUNCTION IF EXISTS core_shoppinglistitem_counts()',
+]
+
+BACKFILL = [
+    """
+    UPDATE core_shoppinglist
+    SET item_count = (
+            SELECT COUNT(*) FROM core_shoppinglistitem WHERE shopping_list_id = core_shoppinglist.id
+        ),
+        checked_count = (
+            SELECT COUNT(*) FROM core_shoppinglistitem
+            WHERE shopping_list_id = core_shoppinglist.id AND checked
+        )
+    """,
+]
+
+
+def create_counters(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        statements = POSTGRES_FORWARD
+    elif connection.vendor == 'sqlite':
+        statements = SQLITE_FORWARD
+    else:
+        return
+
+    # Triggers first, then the backfill, inside the migration transaction: no
+    # write can slip between the two.
+    for statement in statements + BACKFILL:
+        schema_editor.execute(statement)
+
+    Counter = apps.get_model('core', 'Counter')
+    Recipe = apps.get_model('core', 'Recipe')
+    ShoppingList = apps.get_model('core', 'ShoppingList')
+    for name, value in (
+        (RECIPES, Recipe.objects.count()),
+        (OPEN_LISTS, ShoppingList.objects.filter(is_closed=False).count()),
+    ):
+        Counter.objects.update_or_create(name=name, defaults={'value': value})
+
+
+def drop_counters(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        statements = POSTGRES_BACKWARD
+    elif connection.vendor == 'sqlite':
+        statements = SQLITE_BACKWARD
+    else:
+        return
+
+    for statement in statements:
+        schema_editor.execute(statement)
+    apps.get_model('core', 'Counter').objects.filter(name__in=[RECIPES, OPEN_LISTS]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_shopping_list_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='checked_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(create_counters, drop_counters),
+    ]
@@ -0,0 +1,84 @@
+from django.db import migrations, models
+
+
+SQLITE_FTS_FORWARD = [
+    "CREATE VIRTUAL TABLE core_recipe_fts USING fts5(name, tokenize='trigram')",
+    'INSERT INTO core_recipe_fts (rowid, name) SELECT id, name FROM core_recipe',
+    """
+    CREATE TRIGGER core_recipe_fts_insert AFTER INSERT ON core_recipe BEGIN
+        INSERT INTO core_recipe_fts (rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+    """
+    CREATE TRIGGER core_recipe_fts_update AFTER UPDATE OF name ON core_recipe BEGIN
+        UPDATE core_recipe_fts SET name = new.name WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER core_recipe_fts_delete AFTER DELETE ON core_recipe BEGIN
+        DELETE FROM core_recipe_fts WHERE rowid = old.id;
+    END
+    """,
+]
+
+SQLITE_FTS_BACKWARD = [
+    'DROP TRIGGER IF EXISTS core_recipe_fts_delete',
+    'DROP TRIGGER IF EXISTS core_recipe_fts_update',
+    'DROP TRIGGER IF EXISTS core_recipe_fts_insert',
+    'DROP TABLE IF EXISTS core_recipe_fts',
+]
+
+POSTGRES_TRGM_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS core_recipe_name_trgm ON core_recipe USING gin (name gin_trgm_ops)',
+]
+
+POSTGRES_TRGM_BACKWARD = [
+    'DROP INDEX IF EXISTS core_recipe_name_trgm',
+]
+
+
+def _sqlite_supports_trigram_fts(connection):
+    # The FTS5 trigram tokenizer ships with SQLite 3.34+.
+    return connection.Database.sqlite_version_info >= (3, 34, 0)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        statements = POSTGRES_TRGM_FORWARD
+    elif connection.vendor == 'sqlite' and _sqlite_supports_trigram_fts(connection):
+        statements = SQLITE_FTS_FORWARD
+    else:
+        return
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        statements = POSTGRES_TRGM_BACKWARD
+    elif connection.vendor == 'sqlite':
+        statements = SQLITE_FTS_BACKWARD
+    else:
+        return
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['name', 'id'], name='recipe_name_keyset_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,149 @@
+from django.db import migrations, models
+
+SQLITE_FORWARD = [
+    """
+    CREATE TRIGGER core_shoppinglist_version_item_insert AFTER INSERT ON core_shoppinglistitem BEGIN
+        UPDATE core_shoppinglist SET version = version + 1 WHERE id = new.shopping_list_id;
+    END
+    """,
+    """
+    CREATE TRIGGER core_shoppinglist_version_item_update AFTER UPDATE ON core_shoppinglistitem BEGIN
+        UPDATE core_shoppinglist SET version = version + 1
+        WHERE id IN (old.shopping_list_id, new.shopping_list_id);
+    END
+    """,
+    """
+    CREATE TRIGGER core_shoppinglist_version_item_delete AFTER DELETE ON core_shoppinglistitem BEGIN
+        UPDATE core_shoppinglist SET version = version + 1 WHERE id = old.shopping_list_id;
+    END
+    """,
+    """
+    CREATE TRIGGER core_shoppinglist_version_people AFTER UPDATE OF people_count ON core_shoppinglist
+    WHEN old.people_count <> new.people_count BEGIN
+        UPDATE core_shoppinglist SET version = version + 1 WHERE id = new.id;
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS core_shoppinglist_version_people',
+    'DROP TRIGGER IF EXISTS core_shoppinglist_version_item_delete',
+    'DROP TRIGGER IF EXISTS core_shoppinglist_version_item_update',
+    'DROP TRIGGER IF EXISTS core_shoppinglist_version_item_insert',
+]
+
+POSTGRES_FORWARD = [
+    """
+    CREATE OR REPLACE FUNCTION core_shoppinglistitem_version() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE core_shoppinglist SET version = version + 1 WHERE id = NEW.shopping_list_id;
+        ELSIF TG_OP = 'DELETE' THEN
+            UPDATE core_shoppinglist SET version = version + 1 WHERE id = OLD.shopping_list_id;
+        ELSE
+            UPDATE core_shoppinglist SET version = version + 1
+            WHERE id IN (OLD.shopping_list_id, NEW.shopping_list_id);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER core_shoppinglistitem_version
+    AFTER INSERT OR DELETE OR UPDATE ON core_shoppinglistitem
+    FOR EACH ROW EXECUTE FUNCTION core_shoppinglistitem_version()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION core_shoppinglist_version_people() RETURNS trigger AS $$
+    BEGIN
+        NEW.version := OLD.version + 1;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER core_shoppinglist_version_people BEFORE UPDATE OF people_count ON core_shoppinglist
+    FOR EACH ROW WHEN (OLD.people_count IS DISTINCT FROM NEW.people_count)
+    EXECUTE FUNCTION core_shoppinglist_version_people()
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    'DROP TRIGGER IF EXISTS core_shoppinglist_version_people ON core_shoppinglist',
+    'DROP FUNCTION IF EXISTS core_shoppinglist_version_people()',
+    'DROP TRIGGER IF EXISTS core_shoppinglistitem_version ON core_shoppinglistitem',
+    'DROP FUNCTION IF EXISTS core_shoppinglistitem_version()',
+]
+
+
+def _version_field():
+    field = models.PositiveIntegerField(default=0, editable=False)
+    field.set_attributes_from_name('version')
+    return field
+
+
+def add_version_column(apps, schema_editor):
+    # SQLite would rebuild core_shoppinglist for AddField, which the counter
+    # triggers of 0010 forbid (and a rebuild would drop the table's own
+    # triggers): add the column in place instead.
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            'ALTER TABLE core_shoppinglist ADD COLUMN "version" integer unsigned NOT NULL DEFAULT 0 '
+            'CHECK ("version" >= 0)'
+        )
+    else:
+        schema_editor.add_field(apps.get_model('core', 'ShoppingList'), _version_field())
+
+
+def drop_version_column(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('ALTER TABLE core_shoppinglist DROP COLUMN "version"')
+    else:
+        schema_editor.remove_field(apps.get_model('core', 'ShoppingList'), _version_field())
+
+
+def create_version_triggers(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        statements = POSTGRES_FORWARD
+    elif connection.vendor == 'sqlite':
+        statements = SQLITE_FORWARD
+    else:
+        return
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_version_triggers(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        statements = POSTGRES_BACKWARD
+    elif connection.vendor == 'sqlite':
+        statements = SQLITE_BACKWARD
+    else:
+        return
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(add_version_column, drop_version_column)],
+            state_operations=[
+                migrations.AddField(
+                    model_name='shoppinglist',
+                    name='version',
+                    field=models.PositiveIntegerField(default=0, editable=False),
+                ),
+            ],
+        ),
+        migrations.RunPython(create_version_triggers, drop_version_triggers),
+    ]
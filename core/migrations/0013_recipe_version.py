@@ -0,0 +1,146 @@
+from django.db import migrations, models
+
+SQLITE_FORWARD = [
+    """
+    CREATE TRIGGER core_recipe_version_ingredient_insert AFTER INSERT ON core_recipeingredient BEGIN
+        UPDATE core_recipe SET version = version + 1 WHERE id = new.recipe_id;
+    END
+    """,
+    """
+    CREATE TRIGGER core_recipe_version_ingredient_update AFTER UPDATE ON core_recipeingredient BEGIN
+        UPDATE core_recipe SET version = version + 1 WHERE id IN (old.recipe_id, new.recipe_id);
+    END
+    """,
+    """
+    CREATE TRIGGER core_recipe_version_ingredient_delete AFTER DELETE ON core_recipeingredient BEGIN
+        UPDATE core_recipe SET version = version + 1 WHERE id = old.recipe_id;
+    END
+    """,
+    """
+    CREATE TRIGGER core_recipe_version_name AFTER UPDATE OF name ON core_recipe
+    WHEN old.name <> new.name BEGIN
+        UPDATE core_recipe SET version = version + 1 WHERE id = new.id;
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS core_recipe_version_name',
+    'DROP TRIGGER IF EXISTS core_recipe_version_ingredient_delete',
+    'DROP TRIGGER IF EXISTS core_recipe_version_ingredient_update',
+    'DROP TRIGGER IF EXISTS core_recipe_version_ingredient_insert',
+]
+
+POSTGRES_FORWARD = [
+    """
+    CREATE OR REPLACE FUNCTION core_recipeingredient_version() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE core_recipe SET version = version + 1 WHERE id = NEW.recipe_id;
+        ELSIF TG_OP = 'DELETE' THEN
+            UPDATE core_recipe SET version = version + 1 WHERE id = OLD.recipe_id;
+        ELSE
+            UPDATE core_recipe SET version = version + 1 WHERE id IN (OLD.recipe_id, NEW.recipe_id);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER core_recipeingredient_version
+    AFTER INSERT OR DELETE OR UPDATE ON core_recipeingredient
+    FOR EACH ROW EXECUTE FUNCTION core_recipeingredient_version()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION core_recipe_version_name() RETURNS trigger AS $$
+    BEGIN
+        NEW.version := OLD.version + 1;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER core_recipe_version_name BEFORE UPDATE OF name ON core_recipe
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION core_recipe_version_name()
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    'DROP TRIGGER IF EXISTS core_recipe_version_name ON core_recipe',
+    'DROP FUNCTION IF EXISTS core_recipe_version_name()',
+    'DROP TRIGGER IF EXISTS core_recipeingredient_version ON core_recipeingredient',
+    'DROP FUNCTION IF EXISTS core_recipeingredient_version()',
+]
+
+
+def _version_field():
+    field = models.PositiveIntegerField(default=0, editable=False)
+    field.set_attributes_from_name('version')
+    return field
+
+
+def add_version_column(apps, schema_editor):
+    # Same as 0012: core_recipe carries the counter and FTS triggers, so
+    # SQLite must not rebuild it.
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            'ALTER TABLE core_recipe ADD COLUMN "version" integer unsigned NOT NULL DEFAULT 0 '
+            'CHECK ("version" >= 0)'
+        )
+    else:
+        schema_editor.add_field(apps.get_model('core', 'Recipe'), _version_field())
+
+
+def drop_version_column(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('ALTER TABLE core_recipe DROP COLUMN "version"')
+    else:
+        schema_editor.remove_field(apps.get_model('core', 'Recipe'), _version_field())
+
+
+def create_version_triggers(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        statements = POSTGRES_FORWARD
+    elif connection.vendor == 'sqlite':
+        statements = SQLITE_FORWARD
+    else:
+        return
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_version_triggers(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        statements = POSTGRES_BACKWARD
+    elif connection.vendor == 'sqlite':
+        statements = SQLITE_BACKWARD
+    else:
+        return
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_shopping_list_version'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(add_version_column, drop_version_column)],
+            state_operations=[
+                migrations.AddField(
+                    model_name='recipe',
+                    name='version',
+                    field=models.PositiveIntegerField(default=0, editable=False),
+                ),
+            ],
+        ),
+        migrations.RunPython(create_version_triggers, drop_version_triggers),
+    ]
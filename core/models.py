@@ -1,7 +1,12 @@
-﻿from decimal import Decimal
+﻿import json
+import zlib
+from collections import OrderedDict
+from decimal import ROUND_HALF_UP, Decimal
 
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Coalesce, Lower, Round
 from django.utils import timezone
 
 UNIT_CHOICES = [
@@ -15,6 +20,129 @@ UNIT_CHOICES = [
     ('pincee', 'pincée'),
 ]
 
+QUANTITY_STEP = Decimal('0.01')
+PER_PERSON_STEP = Decimal('0.0001')
+
+
+def round_quantity(value, step=QUANTITY_STEP):
+    # Half away from zero, like the SQL ROUND() of set_people_count, so a
+    # quantity does not depend on the code path that computed it.
+    return value.quantize(step, rounding=ROUND_HALF_UP)
+
+
+def upsert_increment(model, match, values, field, amount):
+    # Adds `amount` to `field` on the row selected by `match`, creating it from
+    # `values` when missing. Backed by a unique constraint on the natural key:
+    # one UPDATE when the row exists, and a concurrent insert is folded back
+    # into an increment instead of producing a duplicate. Returns True if created.
+    queryset = model.objects.filter(**match)
+    if queryset.update(**{field: F(field) + amount}):
+        return False
+    try:
+        with transaction.atomic():
+            model.objects.create(**values, **{field: amount})
+    except IntegrityError:
+        if not queryset.update(**{field: F(field) + amount}):
+            raise
+        return False
+    return True
+
+
+class GroupConcat(models.Aggregate):
+    # Comma-separated values of the group. Meant for ids: SQLite accepts no
+    # custom separator together with DISTINCT.
+    function = 'GROUP_CONCAT'
+    template = '%(function)s(%(distinct)s%(expressions)s)'
+    allow_distinct = True
+    output_field = models.TextField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler,
+            connection,
+            function='STRING_AGG',
+            template="%(function)s(%(distinct)s%(expressions)s::text, ',')",
+            **extra_context,
+        )
+
+
+UNCATEGORIZED_LABEL = 'Sans catégorie'
+
+
+def build_list_summaries(items):
+    # One grouped query for any number of lists: {list_id: summary}. Categories
+    # are sorted by name, uncategorised items last, like the list detail page.
+    rows = (
+        items.order_by()
+        .values('shopping_list_id', 'ingredient__category__name')
+        .annotate(item_count=Count('id'), checked_count=Count('id', filter=Q(checked=True)))
+    )
+    summaries = {}
+    for row in rows:
+        summary = summaries.setdefault(row['shopping_list_id'], {'items': 0, 'checked': 0, 'categories': []})
+        summary['items'] += row['item_count']
+        summary['checked'] += row['checked_count']
+        summary['categories'].append(
+            {
+                'name': row['ingredient__category__name'] or UNCATEGORIZED_LABEL,
+                'items': row['item_count'],
+                'checked': row['checked_count'],
+            }
+        )
+    for summary in summaries.values():
+        summary['categories'].sort(
+            key=lambda category: (category['name'] == UNCATEGORIZED_LABEL, category['name'].lower())
+        )
+    return summaries
+
+
+def empty_list_summary():
+    return {'items': 0, 'checked': 0, 'categories': []}
+
+
+def item_category_name(item):
+    if item.ingredient and item.ingredient.category:
+        return item.ingredient.category.name
+    return ''
+
+
+# Display order of list items, applied by the database: categories
+# alphabetically with uncategorised items last, then unchecked before checked,
+# then by name. The category id keeps each category in one contiguous run.
+ITEM_DISPLAY_ORDER = [
+    Lower('ingredient__category__name').asc(nulls_last=True),
+    'ingredient__category_id',
+    'checked',
+    Lower(Coalesce('ingredient__name', 'name')),
+    'id',
+]
+
+
+class Counter(models.Model):
+    CATALOG_VERSION = 'catalog_version'
+    # Kept exact by database triggers (migration 0010), whatever the write path.
+    RECIPES = 'recipe_count'
+    OPEN_LISTS = 'open_list_count'
+
+    name = models.CharField(max_length=60, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+    @classmethod
+    def read(cls, name):
+        return cls.objects.filter(name=name).values_list('value', flat=True).first() or 0
+
+    @classmethod
+    def read_many(cls, *names):
+        values = dict(cls.objects.filter(name__in=names).values_list('name', 'value'))
+        return {name: values.get(name, 0) for name in names}
+
+    @classmethod
+    def increment(cls, name, delta=1):
+        upsert_increment(cls, match={'name': name}, values={'name': name}, field='value', amount=delta)
+
 
 class IngredientCategory(models.Model):
     name = models.CharField(max_length=120, unique=True)
@@ -48,14 +176,29 @@ class Ingredient(models.Model):
 class Recipe(models.Model):
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='recipes')
     name = models.CharField(max_length=200)
+    # Bumped by triggers (migration 0013) on any change of the recipe's name
+    # or ingredients; validates the cached recipe page.
+    version = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Keyset pagination of the recipe list.
+            models.Index(fields=['name', 'id'], name='recipe_name_keyset_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # The version belongs to the triggers, as on ShoppingList.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields if not field.primary_key and field.name != 'version'
+            ]
+        super().save(*args, **kwargs)
+
 
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='ingredients')
@@ -66,6 +209,12 @@ class RecipeIngredient(models.Model):
 
     class Meta:
         ordering = ['ingredient__name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'ingredient', 'unit'],
+                name='unique_recipe_ingredient_unit',
+            ),
+        ]
 
     def __str__(self):
         unit_label = self.get_unit_display()
@@ -84,18 +233,143 @@ class ShoppingList(models.Model):
     participants = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='shared_lists', blank=True)
     is_closed = models.BooleanField(default=False)
     closed_at = models.DateTimeField(null=True, blank=True)
+    # Frozen at close time: {items, checked, categories: [{name, items, checked}]}.
+    summary = models.JSONField(null=True, blank=True)
+    # Live items of the list, kept by database triggers (migration 0010).
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+    checked_count = models.PositiveIntegerField(default=0, editable=False)
+    # Bumped by triggers (migration 0012) on any item or people count change;
+    # keys the cached rendering of the items.
+    version = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['-closed_at', '-id'],
+                condition=models.Q(is_closed=True),
+                name='shoppinglist_archive_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
-    def close(self):
-        self.is_closed = True
-        self.closed_at = timezone.now()
-        self.save(update_fields=['is_closed', 'closed_at'])
+    def save(self, *args, **kwargs):
+        # The item counters and the version belong to the triggers: a full
+        # save from a stale instance must not write them back.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('item_count', 'checked_count', 'version')
+            ]
+        super().save(*args, **kwargs)
+
+    def close(self, freeze=None):
+        if freeze is None:
+            freeze = getattr(settings, 'FREEZE_CLOSED_LISTS', True)
+        # Closing is one-way: a second close (double submit, stale page) would
+        # rebuild the summary from the frozen, now empty, items.
+        if self.is_closed:
+            return
+        with transaction.atomic():
+            summary = build_list_summaries(self.items.all()).get(self.id, empty_list_summary())
+            closed_at = timezone.now()
+            # Conditional UPDATE: of two concurrent closes, only one freezes.
+            if not ShoppingList.objects.filter(id=self.id, is_closed=False).update(
+                is_closed=True, closed_at=closed_at, summary=summary
+            ):
+                self.refresh_from_db(fields=['is_closed', 'closed_at', 'summary'])
+                return
+            self.is_closed, self.closed_at, self.summary = True, closed_at, summary
+            if freeze:
+                ShoppingListSnapshot.freeze(self)
+
+    def set_people_count(self, people_count):
+        # Rescales every per-person item with a single UPDATE. SQL ROUND() rounds
+        # half away from zero, as round_quantity() does for the other paths.
+        with transaction.atomic():
+            self.people_count = people_count
+            self.save(update_fields=['people_count'])
+            people = max(self.people_count, 1)
+            self.items.filter(per_person_quantity__isnull=False).update(
+                quantity=Round(
+                    F('per_person_quantity') * people,
+                    2,
+                    output_field=models.DecimalField(max_digits=10, decimal_places=2),
+                )
+            )
+
+    def add_recipes(self, selections):
+        # selections: iterable of (recipe_id, people). Quantities are merged per
+        # (ingredient, unit) in memory, then applied with one fetch + bulk writes.
+        # Returns the (created, updated) items.
+        people_by_recipe = {recipe_id: people for recipe_id, people in selections}
+        if not people_by_recipe:
+            return [], []
+
+        list_people = max(self.people_count, 1)
+        totals = OrderedDict()
+        ingredients = {}
+        recipe_ingredients = RecipeIngredient.objects.filter(recipe_id__in=people_by_recipe).select_related(
+            'ingredient__category'
+        )
+        for recipe_ingredient in recipe_ingredients:
+            ratio = Decimal(people_by_recipe[recipe_ingredient.recipe_id]) / Decimal(list_people)
+            per_person = round_quantity(recipe_ingredient.quantity_per_person * ratio, PER_PERSON_STEP)
+            key = (recipe_ingredient.ingredient_id, recipe_ingredient.unit)
+            totals[key] = totals.get(key, Decimal('0')) + per_person
+            ingredients[recipe_ingredient.ingredient_id] = recipe_ingredient.ingredient
+
+        if not totals:
+            return [], []
+
+        try:
+            return self._apply_recipe_totals(totals, ingredients, list_people)
+        except IntegrityError:
+            # A concurrent merge inserted one of the rows first: the unique
+            # constraint rejected ours, so apply again on top of it.
+            return self._apply_recipe_totals(totals, ingredients, list_people)
+
+    def _apply_recipe_totals(self, totals, ingredients, list_people):
+        with transaction.atomic():
+            candidates = ShoppingListItem.objects.select_for_update().filter(
+                shopping_list=self,
+                ingredient_id__in=ingredients,
+                per_person_quantity__isnull=False,
+            )
+            existing_items = {(item.ingredient_id, item.unit): item for item in candidates}
+
+            to_create = []
+            to_update = []
+            for key, per_person in totals.items():
+                ingredient = ingredients[key[0]]
+                item = existing_items.get(key)
+                if item:
+                    item.per_person_quantity = round_quantity(item.per_person_quantity + per_person, PER_PERSON_STEP)
+                    item.quantity = round_quantity(Decimal(list_people) * item.per_person_quantity)
+                    item.name = ingredient.name
+                    to_update.append(item)
+                else:
+                    to_create.append(
+                        ShoppingListItem(
+                            shopping_list=self,
+                            ingredient=ingredient,
+                            name=ingredient.name,
+                            unit=key[1],
+                            quantity=round_quantity(Decimal(list_people) * per_person),
+                            per_person_quantity=per_person,
+                        )
+                    )
+
+            if to_update:
+                ShoppingListItem.objects.bulk_update(to_update, ['per_person_quantity', 'quantity', 'name'])
+            if to_create:
+                ShoppingListItem.objects.bulk_create(to_create)
+
+        return to_create, to_update
 
 
 class ShoppingListItem(models.Model):
@@ -116,6 +390,18 @@ class ShoppingListItem(models.Model):
 
     class Meta:
         ordering = ['checked', 'name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['shopping_list', 'ingredient', 'unit'],
+                condition=models.Q(per_person_quantity__isnull=True),
+                name='unique_manual_list_item',
+            ),
+            models.UniqueConstraint(
+                fields=['shopping_list', 'ingredient', 'unit'],
+                condition=models.Q(per_person_quantity__isnull=False),
+                name='unique_per_person_list_item',
+            ),
+        ]
 
     def __str__(self):
         unit_label = self.get_unit_display()
@@ -133,9 +419,130 @@ class ShoppingListItem(models.Model):
             self.name = self.ingredient.name
         super().save(*args, **kwargs)
 
-    def recalculate(self):
-        if self.per_person_quantity is None:
-            return
-        people = max(self.shopping_list.people_count, 1)
-        self.quantity = (Decimal(people) * self.per_person_quantity).quantize(Decimal('0.01'))
-        self.save(update_fields=['quantity'])
+
+class FrozenItem:
+    # Read-only stand-in for a ShoppingListItem rebuilt from a snapshot: it
+    # exposes what the item templates read.
+    id = None
+
+    def __init__(self, ingredient, name, category, quantity, per_person_quantity, unit, checked):
+        self.ingredient_id = ingredient
+        self.name = name
+        self.category = category
+        self.quantity = Decimal(quantity)
+        self.per_person_quantity = Decimal(per_person_quantity) if per_person_quantity is not None else None
+        self.unit = unit
+        self.checked = checked
+
+    @property
+    def display_name(self):
+        return self.name
+
+    def get_unit_display(self):
+        return dict(UNIT_CHOICES).get(self.unit, self.unit)
+
+
+class ShoppingListSnapshot(models.Model):
+    # The items of a closed list frozen into one zlib-compressed JSON document,
+    # in display order. Once it exists the live ShoppingListItem rows are gone;
+    # thaw() brings them back.
+    FORMAT_VERSION = 1
+    FIELDS = ['ingredient', 'name', 'category', 'quantity', 'per_person_quantity', 'unit', 'checked']
+
+    shopping_list = models.OneToOneField(
+        ShoppingList,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='snapshot',
+    )
+    data = models.BinaryField()
+    item_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.shopping_list_id} ({self.item_count} items)"
+
+    @classmethod
+    def encode(cls, rows):
+        payload = {'version': cls.FORMAT_VERSION, 'fields': cls.FIELDS, 'items': rows}
+        return zlib.compress(json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8'), 9)
+
+    @classmethod
+    def rows_for_lists(cls, list_ids):
+        # Live items of the given lists as snapshot rows, in display order.
+        # Plain tuples: building model instances dominated the cost of freezing
+        # (and of seed_load, which freezes thousands of lists).
+        rows = {list_id: [] for list_id in list_ids}
+        items = (
+            ShoppingListItem.objects.filter(shopping_list_id__in=list_ids)
+            .order_by(*ITEM_DISPLAY_ORDER)
+            .values_list(
+                'shopping_list_id',
+                'ingredient_id',
+                Coalesce('ingredient__name', 'name'),
+                'ingredient__category__name',
+                'quantity',
+                'per_person_quantity',
+                'unit',
+                'checked',
+            )
+        )
+        for list_id, ingredient_id, name, category, quantity, per_person_quantity, unit, checked in items.iterator():
+            rows[list_id].append(
+                [
+                    ingredient_id,
+                    name,
+                    category or None,
+                    str(quantity),
+                    str(per_person_quantity) if per_person_quantity is not None else None,
+                    unit,
+                    checked,
+                ]
+            )
+        return rows
+
+    @classmethod
+    def from_rows(cls, list_id, rows):
+        return cls(shopping_list_id=list_id, data=cls.encode(rows), item_count=len(rows))
+
+    @classmethod
+    def freeze_many(cls, list_ids):
+        list_ids = list(list_ids)
+        rows = cls.rows_for_lists(list_ids)
+        snapshots = cls.objects.bulk_create(cls.from_rows(list_id, list_rows) for list_id, list_rows in rows.items())
+        ShoppingListItem.objects.filter(shopping_list_id__in=list_ids).delete()
+        return snapshots
+
+    @classmethod
+    def freeze(cls, shopping_list):
+        return cls.freeze_many([shopping_list.id])[0]
+
+    def payload(self):
+        return json.loads(zlib.decompress(bytes(self.data)))
+
+    def frozen_items(self):
+        payload = self.payload()
+        return [FrozenItem(**dict(zip(payload['fields'], row))) for row in payload['items']]
+
+    def thaw(self):
+        # Restores the live items; ingredients deleted since keep their name.
+        frozen_items = self.frozen_items()
+        existing = set(
+            Ingredient.objects.filter(
+                id__in=[item.ingredient_id for item in frozen_items if item.ingredient_id]
+            ).values_list('id', flat=True)
+        )
+        with transaction.atomic():
+            ShoppingListItem.objects.bulk_create(
+                ShoppingListItem(
+                    shopping_list_id=self.shopping_list_id,
+                    ingredient_id=item.ingredient_id if item.ingredient_id in existing else None,
+                    name=item.name,
+                    unit=item.unit,
+                    quantity=item.quantity,
+                    per_person_quantity=item.per_person_quantity,
+                    checked=item.checked,
+                )
+                for item in frozen_items
+            )
+            self.delete()
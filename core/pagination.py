@@ -0,0 +1,128 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db import connection
+from django.db.models import Max, Q
+
+INGREDIENT_PAGE_SIZE = 50
+ARCHIVE_PAGE_SIZE = 20
+RECIPE_PAGE_SIZE = 30
+
+
+def encode_keyset_token(values):
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_keyset_token(token, types=(str, int)):
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (ValueError, binascii.Error, UnicodeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(types):
+        return None
+    if not all(isinstance(value, expected) for value, expected in zip(values, types)):
+        return None
+    return values
+
+
+class KeysetPage:
+    def __init__(self, items, next_token, count_label=None):
+        self.items = items
+        self.next_token = next_token
+        self.count_label = count_label
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_token is not None
+
+
+def estimate_row_count(model):
+    # Planner statistics on PostgreSQL, the highest primary key elsewhere:
+    # both are answered without scanning the table.
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+        if row and row[0] is not None and row[0] >= 0:
+            return row[0]
+    return model.objects.aggregate(highest=Max('pk'))['highest'] or 0
+
+
+def paginate_by_name(queryset, after=None, page_size=INGREDIENT_PAGE_SIZE, estimate=None):
+    # Keyset pagination on (name, id), or on (search_rank, name, id) for ranked
+    # querysets (carrying a search_rank annotation), in the rank direction the
+    # search backend ordered by.
+    ranked = 'search_rank' in queryset.query.annotations
+    if ranked:
+        descending = '-search_rank' in queryset.query.order_by
+        keyset = decode_keyset_token(after, types=((int, float), str, int))
+        queryset = queryset.order_by('-search_rank' if descending else 'search_rank', 'name', 'id')
+        if keyset is not None:
+            rank, name, pk = keyset
+            queryset = queryset.filter(
+                Q(**{'search_rank__lt' if descending else 'search_rank__gt': rank})
+                | Q(search_rank=rank, name__gt=name)
+                | Q(search_rank=rank, name=name, id__gt=pk)
+            )
+    else:
+        keyset = decode_keyset_token(after)
+        queryset = queryset.order_by('name', 'id')
+        if keyset is not None:
+            name, pk = keyset
+            queryset = queryset.filter(Q(name__gt=name) | Q(name=name, id__gt=pk))
+
+    rows = list(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    items = rows[:page_size]
+
+    next_token = None
+    if has_more:
+        last = items[-1]
+        keys = [last.search_rank, last.name, last.pk] if ranked else [last.name, last.pk]
+        next_token = encode_keyset_token(keys)
+
+    if not has_more and keyset is None:
+        count_label = str(len(items))
+    elif estimate is not None:
+        count_label = f'≈ {estimate()}'
+    else:
+        count_label = f'{page_size}+'
+
+    return KeysetPage(items, next_token, count_label)
+
+
+def paginate_by_closed_at(queryset, after=None, page_size=ARCHIVE_PAGE_SIZE):
+    # Newest first on (closed_at, id), served by the partial archive index.
+    queryset = queryset.order_by('-closed_at', '-id')
+    keyset = decode_keyset_token(after)
+    if keyset is not None:
+        try:
+            closed_at = datetime.fromisoformat(keyset[0])
+        except ValueError:
+            closed_at = None
+        if closed_at is not None:
+            queryset = queryset.filter(Q(closed_at__lt=closed_at) | Q(closed_at=closed_at, id__lt=keyset[1]))
+
+    rows = list(queryset[:page_size + 1])
+    items = rows[:page_size]
+    next_token = None
+    if len(rows) > page_size:
+        last = items[-1]
+        next_token = encode_keyset_token([last.closed_at.isoformat(), last.pk])
+    return KeysetPage(items, next_token)
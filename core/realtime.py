@@ -0,0 +1,205 @@
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_SECONDS = 20
+SUBSCRIPTION_BUFFER = 256
+RECONNECT_SECONDS = 3
+
+
+class _AsyncSubscription:
+    # Consumed from the ASGI event loop; publishers may run in any thread.
+    def __init__(self, list_id):
+        self.list_id = list_id
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=SUBSCRIPTION_BUFFER)
+
+    def deliver(self, event):
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Event loop already closed: the client is gone.
+            pass
+
+    def _put(self, event):
+        if not self._queue.full():
+            self._queue.put_nowait(event)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class _ThreadSubscription:
+    # Used under WSGI (runserver): one blocked thread per connected client.
+    def __init__(self, list_id):
+        self.list_id = list_id
+        self._queue = queue.Queue(maxsize=SUBSCRIPTION_BUFFER)
+
+    def deliver(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            pass
+
+    def get(self, timeout):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def subscribe(self, list_id, asynchronous=True):
+        subscription = _AsyncSubscription(list_id) if asynchronous else _ThreadSubscription(list_id)
+        with self._lock:
+            self._subscriptions.setdefault(list_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.list_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.list_id]
+
+    def publish(self, list_id, event):
+        self._deliver(list_id, event)
+
+    def _deliver(self, list_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(list_id, ()))
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+
+class PostgresBroker(InProcessBroker):
+    # Fans out across processes (gunicorn workers) with LISTEN/NOTIFY: publish
+    # sends a NOTIFY, and each process with subscribers keeps one listening
+    # connection, outside the pool, that hands events to its own subscriptions.
+    # Events sent while that connection is being re-established are lost.
+    # Needs psycopg 3.
+    channel = 'shopping_list_events'
+
+    def __init__(self, alias=DEFAULT_DB_ALIAS):
+        super().__init__()
+        self.alias = alias
+        self._listener = None
+
+    def subscribe(self, list_id, asynchronous=True):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='shopping-list-events', daemon=True)
+                self._listener.start()
+        return super().subscribe(list_id, asynchronous)
+
+    def publish(self, list_id, event):
+        payload = json.dumps({'list': list_id, 'event': event})
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, payload])
+
+    def _listen(self):
+        import psycopg
+
+        params = connections[self.alias].get_connection_params()
+        while True:
+            try:
+                with psycopg.connect(**params, autocommit=True) as connection:
+                    connection.execute(f'LISTEN {self.channel}')
+                    for notify in connection.notifies():
+                        self._dispatch(notify.payload)
+            except psycopg.Error:
+                logger.exception('Shopping list event listener lost its connection')
+                time.sleep(RECONNECT_SECONDS)
+
+    def _dispatch(self, payload):
+        message = json.loads(payload)
+        self._deliver(message['list'], message['event'])
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_path = getattr(settings, 'SHOPPING_LIST_BROKER', 'core.realtime.InProcessBroker')
+                _broker = import_string(broker_path)()
+    return _broker
+
+
+@contextmanager
+def use_broker(broker):
+    global _broker
+    previous = _broker
+    _broker = broker
+    try:
+        yield broker
+    finally:
+        _broker = previous
+
+
+def publish(list_id, event):
+    # Deltas go out once the write is committed, never for a rolled back change.
+    transaction.on_commit(lambda: get_broker().publish(list_id, event))
+
+
+def item_event(event_type, item, group_label):
+    return {
+        'type': event_type,
+        'item': item.id,
+        'name': item.display_name,
+        'quantity': str(Decimal(item.quantity).quantize(Decimal('0.01'))),
+        'unit': item.get_unit_display(),
+        'checked': item.checked,
+        'group': group_label,
+    }
+
+
+def _format(event):
+    return f"data: {json.dumps(event)}\n\n"
+
+
+async def stream_events_async(list_id):
+    broker = get_broker()
+    subscription = broker.subscribe(list_id, asynchronous=True)
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            event = await subscription.get(KEEPALIVE_SECONDS)
+            yield ': keepalive\n\n' if event is None else _format(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def stream_events(list_id):
+    broker = get_broker()
+    subscription = broker.subscribe(list_id, asynchronous=False)
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            event = subscription.get(KEEPALIVE_SECONDS)
+            yield ': keepalive\n\n' if event is None else _format(event)
+    finally:
+        broker.unsubscribe(subscription)
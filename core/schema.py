@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+
+from django.db import migrations
+
+
+@contextmanager
+def triggers_dropped(schema_editor):
+    # SQLite rebuilds a table for most AlterField/AddField/RemoveField: a copy
+    # is renamed over the original and every trigger of the database is checked
+    # against the intermediate schema, which fails for the cross-table triggers
+    # (FTS sync of 0005/0011, counters of 0010, versions of 0012/0013) with
+    # "no such table". The rebuild would also drop the table's own triggers.
+    # Drop them all for the duration and recreate them from their stored SQL.
+    if schema_editor.connection.vendor != 'sqlite':
+        yield
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' ORDER BY name")
+        triggers = cursor.fetchall()
+    for name, _ in triggers:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {schema_editor.quote_name(name)}', None)
+    yield
+    for _, sql in triggers:
+        schema_editor.execute(sql, None)
+
+
+class PreserveTriggers(migrations.SeparateDatabaseAndState):
+    # Wrap every schema operation on a table that carries triggers or is read
+    # by one (core_ingredient, core_ingredientcategory, core_recipe,
+    # core_recipeingredient, core_shoppinglist, core_shoppinglistitem):
+    #
+    #     PreserveTriggers([migrations.AlterField(...), migrations.AddField(...)])
+    #
+    # makemigrations writes the bare operations; wrap them by hand.
+
+    def __init__(self, operations):
+        super().__init__(database_operations=operations, state_operations=operations)
+
+    def deconstruct(self):
+        return self.__class__.__qualname__, [], {'operations': self.database_operations}
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        with triggers_dropped(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        with triggers_dropped(schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+    def describe(self):
+        return 'Preserve triggers around: ' + '; '.join(operation.describe() for operation in self.database_operations)
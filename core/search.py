@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+FTS_TABLE = 'core_ingredient_fts'
+RECIPE_FTS_TABLE = 'core_recipe_fts'
+# The FTS5 trigram tokenizer cannot match terms shorter than three characters.
+FTS_MIN_TERM_LENGTH = 3
+
+
+def _fts_matches(table, match):
+    return RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s', (match,))
+
+
+class ContainsIngredientSearch:
+    def search(self, queryset, query):
+        return queryset.filter(name__icontains=query).order_by('name')
+
+
+class PostgresTrigramIngredientSearch:
+    # Relies on the gin_trgm_ops index created by migration 0005: both ILIKE and
+    # the word-similarity operator are answered from the index.
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        from django.db.models import Q
+
+        return (
+            queryset.annotate(search_rank=TrigramWordSimilarity(query, 'name'))
+            .filter(Q(name__icontains=query) | Q(name__trigram_word_similar=query))
+            .order_by('-search_rank', 'name')
+        )
+
+
+class SqliteFtsIngredientSearch:
+    fts_table = FTS_TABLE
+    fallback = ContainsIngredientSearch()
+
+    def search(self, queryset, query):
+        match = self.build_match(query)
+        if not match or not self.is_available():
+            return self.fallback.search(queryset, query)
+
+        # The rank reads a MATERIALIZED CTE (SQLite 3.35+): SQLite runs the
+        # MATCH once and looks each row up through an automatic index. A plain
+        # subquery is flattened into a per-row MATCH and grew quadratically with
+        # broad terms. bm25() is negative, lower is better; the name column
+        # weighs more than the category.
+        rank = RawSQL(
+            f'(WITH matches AS MATERIALIZED ('
+            f'SELECT rowid, bm25({FTS_TABLE}, 10.0, 1.0) AS rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+            f') SELECT rank FROM matches WHERE matches.rowid = core_ingredient.id)',
+            (match,),
+            output_field=FloatField(),
+        )
+        return (
+            queryset.filter(id__in=_fts_matches(FTS_TABLE, match))
+            .annotate(search_rank=rank)
+            .order_by('search_rank', 'name')
+        )
+
+    @staticmethod
+    def build_match(query):
+        terms = [term for term in query.split() if len(term) >= FTS_MIN_TERM_LENGTH]
+        return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+    _available = None
+
+    @classmethod
+    def is_available(cls):
+        if cls._available is None:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [cls.fts_table])
+                cls._available = cursor.fetchone() is not None
+        return cls._available
+
+
+class ContainsRecipeSearch:
+    # Served by the gin_trgm_ops index of migration 0011 on PostgreSQL.
+    def search(self, queryset, query):
+        return queryset.filter(name__icontains=query)
+
+
+class SqliteFtsRecipeSearch(SqliteFtsIngredientSearch):
+    # Filters without ranking: matches keep the (name, id) keyset order of
+    # the recipe list.
+    fts_table = RECIPE_FTS_TABLE
+    fallback = ContainsRecipeSearch()
+    _available = None
+
+    def search(self, queryset, query):
+        match = self.build_match(query)
+        if not match or not self.is_available():
+            return self.fallback.search(queryset, query)
+        return queryset.filter(id__in=_fts_matches(RECIPE_FTS_TABLE, match))
+
+
+DEFAULT_BACKENDS = {
+    'postgresql': PostgresTrigramIngredientSearch,
+    'sqlite': SqliteFtsIngredientSearch,
+}
+
+
+def get_ingredient_search():
+    backend_path = getattr(settings, 'INGREDIENT_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    return DEFAULT_BACKENDS.get(connection.vendor, ContainsIngredientSearch)()
+
+
+def search_ingredients(queryset, query):
+    return get_ingredient_search().search(queryset, query)
+
+
+def search_recipes(queryset, query):
+    backend = SqliteFtsRecipeSearch if connection.vendor == 'sqlite' else ContainsRecipeSearch
+    return backend().search(queryset, query)
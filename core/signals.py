@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import catalog
+from .models import Ingredient, IngredientCategory
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=IngredientCategory)
+@receiver(post_delete, sender=IngredientCategory)
+def bump_catalog_version(sender, **kwargs):
+    catalog.invalidate()
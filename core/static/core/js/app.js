@@ -0,0 +1,210 @@
+// Shared front-end code, loaded by base.html on every page. Page scripts use
+// the helpers exposed on window.listCourses.
+(() => {
+    const storageKey = 'list-courses:scroll-restore';
+    const maxAgeMs = 15000;
+
+    // Classic form posts redirect back to the same page: restore the scroll
+    // position they started from.
+    const restoreScroll = () => {
+        const rawValue = sessionStorage.getItem(storageKey);
+        if (!rawValue) {
+            return;
+        }
+
+        let data = null;
+        try {
+            data = JSON.parse(rawValue);
+        } catch (error) {
+            sessionStorage.removeItem(storageKey);
+            return;
+        }
+
+        if (!data || typeof data.path !== 'string' || typeof data.scrollY !== 'number' || typeof data.ts !== 'number') {
+            sessionStorage.removeItem(storageKey);
+            return;
+        }
+
+        if (Date.now() - data.ts > maxAgeMs) {
+            sessionStorage.removeItem(storageKey);
+            return;
+        }
+
+        if (window.location.pathname !== data.path) {
+            return;
+        }
+
+        sessionStorage.removeItem(storageKey);
+        requestAnimationFrame(() => {
+            window.scrollTo(0, data.scrollY);
+        });
+    };
+
+    restoreScroll();
+
+    window.addEventListener(
+        'submit',
+        (event) => {
+            const form = event.target;
+            if (!(form instanceof HTMLFormElement)) {
+                return;
+            }
+
+            if (form.dataset.preserveScroll === 'false') {
+                return;
+            }
+
+            const payload = {
+                path: window.location.pathname,
+                scrollY: window.scrollY,
+                ts: Date.now(),
+            };
+
+            sessionStorage.setItem(storageKey, JSON.stringify(payload));
+        },
+        true
+    );
+})();
+
+(() => {
+    const listCourses = (window.listCourses = window.listCourses || {});
+
+    // Live search over a JSON endpoint answering {count, next, results}.
+    // The container holds [data-results-rows], [data-results-count],
+    // [data-results-empty], a .load-more block with a [data-after] control and
+    // a <template data-row-template>; buildRow(row, result) fills a clone of
+    // that template. filters maps extra query parameters to their fields.
+    listCourses.liveSearch = ({ container, input, buildRow, filters = {}, form = null, delay = 180 }) => {
+        const rows = container.querySelector('[data-results-rows]');
+        const count = container.querySelector('[data-results-count]');
+        const empty = container.querySelector('[data-results-empty]');
+        const loadMore = container.querySelector('.load-more');
+        const loadMoreControl = loadMore.querySelector('[data-after]');
+        const rowTemplate = container.querySelector('template[data-row-template]');
+
+        let debounceTimer = null;
+        let activeController = null;
+
+        const loadResults = (after) => {
+            const params = new URLSearchParams();
+            const query = input.value.trim();
+
+            if (query) {
+                params.set('q', query);
+            }
+            Object.entries(filters).forEach(([name, field]) => {
+                if (field.value) {
+                    params.set(name, field.value);
+                }
+            });
+            if (after) {
+                params.set('after', after);
+            }
+
+            if (activeController) {
+                activeController.abort();
+            }
+
+            activeController = new AbortController();
+
+            fetch(`${container.dataset.searchUrl}?${params.toString()}`, {
+                method: 'GET',
+                signal: activeController.signal,
+                headers: {
+                    Accept: 'application/json',
+                },
+            })
+                .then((response) => {
+                    if (!response.ok) {
+                        throw new Error('Erreur de chargement');
+                    }
+                    return response.json();
+                })
+                .then((data) => {
+                    if (!after) {
+                        rows.replaceChildren();
+                        count.textContent = data.count;
+                    }
+                    data.results.forEach((result) => {
+                        rows.appendChild(buildRow(rowTemplate.content.firstElementChild.cloneNode(true), result));
+                    });
+                    empty.hidden = rows.children.length > 0;
+                    loadMore.hidden = !data.next;
+                    loadMoreControl.dataset.after = data.next || '';
+                    loadMoreControl.disabled = false;
+                })
+                .catch((error) => {
+                    loadMoreControl.disabled = false;
+                    if (error.name !== 'AbortError') {
+                        console.error(error);
+                    }
+                });
+        };
+
+        loadMoreControl.addEventListener('click', (event) => {
+            event.preventDefault();
+            loadMoreControl.disabled = true;
+            loadResults(loadMoreControl.dataset.after);
+        });
+
+        input.addEventListener('input', () => {
+            clearTimeout(debounceTimer);
+            debounceTimer = setTimeout(() => loadResults(), delay);
+        });
+
+        Object.values(filters).forEach((field) => {
+            field.addEventListener('change', () => loadResults());
+        });
+
+        if (form) {
+            form.addEventListener('submit', (event) => {
+                event.preventDefault();
+                loadResults();
+            });
+        }
+
+        return { loadResults };
+    };
+
+    // Name, category and the hidden filter fields shared by every ingredient
+    // result row, so a classic POST redirects back to the same search.
+    listCourses.fillIngredientRow = (row, ingredient, input, category) => {
+        row.querySelector('[data-field="name"]').textContent = ingredient.name;
+        row.querySelector('[data-field="category"]').textContent = ingredient.category || 'Sans catégorie';
+        row.querySelectorAll('[data-field="query"]').forEach((field) => {
+            field.value = input.value.trim();
+        });
+        row.querySelectorAll('[data-field="category-filter"]').forEach((field) => {
+            field.value = category.value;
+        });
+        return row;
+    };
+
+    // Quick-add rows of the recipe and shopping list pages: the ingredient id
+    // goes in the form and suffixes the ids its labels point to.
+    listCourses.ingredientQuickAddSearch = (inputId, categoryId, containerId) => {
+        const input = document.getElementById(inputId);
+        const category = document.getElementById(categoryId);
+        const container = document.getElementById(containerId);
+
+        if (!input || !category || !container) {
+            return;
+        }
+
+        listCourses.liveSearch({
+            container,
+            input,
+            filters: { category },
+            buildRow: (row, ingredient) => {
+                row.querySelector('[data-field="id"]').value = ingredient.id;
+                row.querySelectorAll('[id]').forEach((element) => {
+                    element.id += ingredient.id;
+                });
+                row.querySelectorAll('label[for]').forEach((label) => {
+                    label.htmlFor += ingredient.id;
+                });
+                return listCourses.fillIngredientRow(row, ingredient, input, category);
+            },
+        });
+    };
+})();
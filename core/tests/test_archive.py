@@ -0,0 +1,106 @@
+import gzip
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.archive import archive_files, read_records
+from core.models import Ingredient, ShoppingList, ShoppingListItem, ShoppingListSnapshot
+
+
+class ArchiveCompactTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('archiviste', password='archiviste-password')
+        cls.guest = get_user_model().objects.create_user('invite', password='invite-password')
+        cls.flour = Ingredient.objects.create(name='Farine')
+
+    def setUp(self):
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        self.directory = Path(temporary.name)
+        self.now = timezone.now()
+
+    def _closed_list(self, name, days_ago, freeze=True):
+        shopping_list = ShoppingList.objects.create(owner=self.user, name=name, people_count=2)
+        shopping_list.participants.add(self.guest)
+        ShoppingListItem.objects.create(
+            shopping_list=shopping_list, ingredient=self.flour, name='Farine', unit='kg',
+            quantity=Decimal('2'), per_person_quantity=Decimal('1'), checked=True,
+        )
+        ShoppingListItem.objects.create(shopping_list=shopping_list, name='Bougies', quantity=Decimal('3'))
+        shopping_list.close(freeze=freeze)
+        ShoppingList.objects.filter(id=shopping_list.id).update(closed_at=self.now - timedelta(days=days_ago))
+        return shopping_list
+
+    def _compact(self, *args):
+        call_command('archive_compact', '--directory', str(self.directory), *args, stdout=StringIO())
+
+    def _restore(self, *args, **settings):
+        with override_settings(**settings):
+            call_command('archive_restore', '--directory', str(self.directory), *args, stdout=StringIO())
+
+    def test_old_lists_move_to_monthly_files(self):
+        old = self._closed_list('Vieille', days_ago=400)
+        unfrozen = self._closed_list('Ancienne', days_ago=800, freeze=False)
+        recent = self._closed_list('Récente', days_ago=10)
+
+        self._compact('--older-than', '365', '--batch-size', '1')
+
+        self.assertEqual(list(ShoppingList.objects.values_list('id', flat=True)), [recent.id])
+        self.assertFalse(ShoppingListItem.objects.filter(shopping_list_id=unfrozen.id).exists())
+        files = archive_files(self.directory)
+        self.assertEqual(len(files), 2)
+        records = {record['id']: record for path in files for record in read_records(path)}
+        self.assertEqual(set(records), {old.id, unfrozen.id})
+        self.assertEqual(records[unfrozen.id]['items'], records[old.id]['items'])
+        self.assertEqual(records[old.id]['participants'], [self.guest.id])
+
+    def test_new_exports_append_to_existing_files(self):
+        self._closed_list('Première', days_ago=400)
+        self._compact()
+        path = archive_files(self.directory)[0]
+        before = path.read_bytes()
+
+        self._closed_list('Seconde', days_ago=400)
+        self._compact()
+
+        after = path.read_bytes()
+        self.assertTrue(after.startswith(before))
+        with gzip.open(path, 'rt', encoding='utf-8') as handle:
+            self.assertEqual(len(handle.readlines()), 2)
+
+    def test_restore_round_trip(self):
+        shopping_list = self._closed_list('Vieille', days_ago=400)
+        original = ShoppingList.objects.get(id=shopping_list.id)
+        self._compact()
+
+        self._restore('--ids', str(shopping_list.id))
+        self._restore()
+
+        restored = ShoppingList.objects.get(id=shopping_list.id)
+        self.assertEqual(ShoppingList.objects.count(), 1)
+        self.assertEqual(restored.created_at, original.created_at)
+        self.assertEqual(restored.closed_at, original.closed_at)
+        self.assertEqual(restored.summary, original.summary)
+        self.assertEqual(list(restored.participants.all()), [self.guest])
+        self.assertEqual(
+            [(item.name, item.quantity, item.checked) for item in restored.snapshot.frozen_items()],
+            [('Bougies', Decimal('3'), False), ('Farine', Decimal('2'), True)],
+        )
+
+    def test_restore_without_freezing_recreates_items(self):
+        shopping_list = self._closed_list('Vieille', days_ago=400)
+        self._compact()
+
+        self._restore(FREEZE_CLOSED_LISTS=False)
+
+        self.assertFalse(ShoppingListSnapshot.objects.exists())
+        item = ShoppingListItem.objects.get(shopping_list_id=shopping_list.id, ingredient=self.flour)
+        self.assertEqual(item.per_person_quantity, Decimal('1'))
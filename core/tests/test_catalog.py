@@ -0,0 +1,92 @@
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core import catalog
+from core.forms import IngredientForm
+from core.models import Ingredient, IngredientCategory, ShoppingList, ShoppingListItem
+
+
+class CatalogInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('catalogue', password='catalogue-password')
+        cls.fruits = IngredientCategory.objects.create(name='Fruits')
+        cls.apple = Ingredient.objects.create(name='Pomme', category=cls.fruits)
+
+    def setUp(self):
+        # Rolled back versions come around again: drop what earlier tests cached.
+        cache.clear()
+        # The version is memoised per thread until the next request starts.
+        catalog._reset_version()
+
+    def _category_choices(self):
+        return [label for _, label in IngredientForm().fields['category'].choices]
+
+    @contextmanager
+    def _assert_bumps(self):
+        version = catalog.get_version()
+        yield
+        self.assertGreater(catalog.get_version(), version)
+
+    def test_every_catalog_write_bumps_the_version(self):
+        with self._assert_bumps():
+            vegetables = IngredientCategory.objects.create(name='Légumes')
+        with self._assert_bumps():
+            pear = Ingredient.objects.create(name='Poire', category=self.fruits)
+        with self._assert_bumps():
+            pear.delete()
+        with self._assert_bumps():
+            self.apple.name = 'Pomme verte'
+            self.apple.save()
+        with self._assert_bumps():
+            self.fruits.name = 'Fruits frais'
+            self.fruits.save()
+        with self._assert_bumps():
+            vegetables.delete()
+
+    def test_form_choices_follow_category_changes(self):
+        self.assertEqual(self._category_choices(), ['Sans catégorie', 'Fruits'])
+
+        vegetables = IngredientCategory.objects.create(name='Légumes')
+        self.assertEqual(self._category_choices(), ['Sans catégorie', 'Fruits', 'Légumes'])
+
+        self.fruits.name = 'Agrumes'
+        self.fruits.save()
+        vegetables.delete()
+        self.assertEqual(self._category_choices(), ['Sans catégorie', 'Agrumes'])
+
+    def test_search_etag_moves_with_the_catalog(self):
+        self.client.force_login(self.user)
+        url = reverse('api_ingredient_search')
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            etag = self.client.get(url, {'q': 'pomme'})['ETag']
+            self.assertEqual(self.client.get(url, {'q': 'pomme'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+            self.apple.name = 'Pomme verte'
+            self.apple.save()
+            response = self.client.get(url, {'q': 'pomme'}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['name'] for result in response.json()['results']], ['Pomme verte'])
+
+    def test_cached_list_page_shows_renamed_category(self):
+        shopping_list = ShoppingList.objects.create(owner=self.user, name='Courses')
+        ShoppingListItem.objects.create(
+            shopping_list=shopping_list, ingredient=self.apple, name='Pomme', quantity=Decimal('3')
+        )
+        self.client.force_login(self.user)
+        url = reverse('shopping_list_detail', args=[shopping_list.id])
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            etag = self.client.get(url)['ETag']
+            self.fruits.name = 'Vergers'
+            self.fruits.save()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Vergers')
+        self.assertNotContains(response, '>Fruits<')
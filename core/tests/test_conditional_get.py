@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.models import Ingredient, Recipe, RecipeIngredient, ShoppingList, ShoppingListItem
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('cuisinier', password='cuisinier-password')
+        cls.flour = Ingredient.objects.create(name='Farine')
+        cls.recipe = Recipe.objects.create(owner=cls.user, name='Crêpes')
+        cls.shopping_list = ShoppingList.objects.create(owner=cls.user, name='Courses', people_count=2)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _get(self, url, client=None, **headers):
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            return (client or self.client).get(url, **headers)
+
+    def _revalidate(self, url, response, client=None):
+        return self._get(url, client, HTTP_IF_NONE_MATCH=response['ETag']).status_code
+
+    def test_shopping_list_detail(self):
+        url = reverse('shopping_list_detail', args=[self.shopping_list.id])
+        response = self._get(url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(self._revalidate(url, response), 304)
+
+        ShoppingListItem.objects.create(shopping_list=self.shopping_list, name='Bougies', quantity=Decimal('1'))
+        self.assertEqual(self._revalidate(url, response), 200)
+
+    def test_recipe_detail(self):
+        url = reverse('recipe_detail', args=[self.recipe.id])
+        response = self._get(url)
+        self.assertEqual(self._revalidate(url, response), 304)
+
+        RecipeIngredient.objects.create(recipe=self.recipe, ingredient=self.flour, quantity_per_person=Decimal('50'))
+        response_after_change = self._get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response_after_change.status_code, 200)
+        self.assertContains(response_after_change, 'Farine')
+
+        self.flour.name = 'Farine de blé'
+        self.flour.save()
+        self.assertEqual(self._revalidate(url, response_after_change), 200)
+
+    def test_validator_is_bound_to_the_session(self):
+        url = reverse('shopping_list_detail', args=[self.shopping_list.id])
+        response = self._get(url)
+
+        other = Client()
+        other.force_login(self.user)
+        self.assertEqual(self._revalidate(url, response, other), 200)
+
+    def test_pending_messages_are_always_shown(self):
+        url = reverse('shopping_list_detail', args=[self.shopping_list.id])
+        response = self._get(url)
+
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            self.client.post(url, {'ingredient_id': self.flour.id, 'quantity': '0'})
+        response = self._get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Vérifiez la quantité.')
@@ -0,0 +1,76 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.models import Counter, Ingredient, Recipe, ShoppingList, ShoppingListItem, upsert_increment
+
+
+class DenormalizedCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('compteur', password='compteur-password')
+        cls.ingredients = Ingredient.objects.bulk_create(Ingredient(name=f'Ingrédient {index}') for index in range(3))
+
+    def _counts(self, shopping_list):
+        shopping_list.refresh_from_db(fields=['item_count', 'checked_count'])
+        return shopping_list.item_count, shopping_list.checked_count
+
+    def test_item_counts_follow_every_write_path(self):
+        shopping_list = ShoppingList.objects.create(owner=self.user, name='Courses')
+        item = ShoppingListItem.objects.create(
+            shopping_list=shopping_list, ingredient=self.ingredients[0], name='a', quantity=Decimal('1')
+        )
+        ShoppingListItem.objects.bulk_create(
+            ShoppingListItem(shopping_list=shopping_list, ingredient=ingredient, name='b', quantity=1, checked=True)
+            for ingredient in self.ingredients[1:]
+        )
+        self.assertEqual(self._counts(shopping_list), (3, 2))
+
+        ShoppingListItem.objects.filter(id=item.id).update(checked=True)
+        self.assertEqual(self._counts(shopping_list), (3, 3))
+
+        item.checked = False
+        item.save(update_fields=['checked'])
+        self.assertEqual(self._counts(shopping_list), (3, 2))
+
+        upsert_increment(
+            ShoppingListItem,
+            match={'shopping_list': shopping_list, 'ingredient': item.ingredient, 'unit': '', 'per_person_quantity': None},
+            values={'shopping_list': shopping_list, 'ingredient': item.ingredient, 'name': 'a'},
+            field='quantity',
+            amount=Decimal('2'),
+        )
+        self.assertEqual(self._counts(shopping_list), (3, 2))
+
+        ShoppingListItem.objects.filter(shopping_list=shopping_list, checked=True).delete()
+        self.assertEqual(self._counts(shopping_list), (1, 0))
+
+    def test_stale_instance_does_not_overwrite_counts(self):
+        shopping_list = ShoppingList.objects.create(owner=self.user, name='Courses')
+        ShoppingListItem.objects.create(shopping_list=shopping_list, name='a', quantity=Decimal('1'))
+
+        shopping_list.people_count = 4
+        shopping_list.save()
+
+        self.assertEqual(self._counts(shopping_list), (1, 0))
+        self.assertEqual(ShoppingList.objects.get(id=shopping_list.id).people_count, 4)
+
+    def test_global_counters(self):
+        recipes = Counter.read(Counter.RECIPES)
+        open_lists = Counter.read(Counter.OPEN_LISTS)
+
+        recipe = Recipe.objects.create(owner=self.user, name='Crêpes')
+        Recipe.objects.bulk_create([Recipe(owner=self.user, name='Gaufres'), Recipe(owner=self.user, name='Soupe')])
+        recipe.delete()
+        first = ShoppingList.objects.create(owner=self.user, name='Lundi')
+        second = ShoppingList.objects.create(owner=self.user, name='Mardi')
+        ShoppingList.objects.create(owner=self.user, name='Archive', is_closed=True)
+        first.close()
+        second.delete()
+
+        self.assertEqual(
+            Counter.read_many(Counter.RECIPES, Counter.OPEN_LISTS),
+            {Counter.RECIPES: recipes + 2, Counter.OPEN_LISTS: open_lists},
+        )
+        self.assertEqual(Counter.read(Counter.RECIPES), Recipe.objects.count())
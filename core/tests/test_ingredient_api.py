@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import Ingredient, IngredientCategory
+from core.pagination import INGREDIENT_PAGE_SIZE
+
+
+class IngredientSearchApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('api', password='api-password')
+        cls.herbs = IngredientCategory.objects.create(name='Herbes')
+        Ingredient.objects.create(name='Basilic', category=cls.herbs)
+        Ingredient.objects.create(name='Sel')
+        Ingredient.objects.bulk_create(Ingredient(name=f'Épice {index:03d}') for index in range(70))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('api_ingredient_search')
+
+    def _get(self, params=None, **headers):
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            return self.client.get(self.url, params or {}, **headers)
+
+    def _walk(self, params):
+        names, after, pages = [], None, 0
+        while True:
+            payload = self._get({**params, 'after': after} if after else params).json()
+            names += [result['name'] for result in payload['results']]
+            pages += 1
+            after = payload['next']
+            if after is None:
+                return names, pages
+
+    def test_response_shape(self):
+        response = self._get({'q': 'basilic'})
+
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('ETag', response)
+        basil = Ingredient.objects.get(name='Basilic')
+        self.assertEqual(
+            response.json(),
+            {'count': '1', 'next': None, 'results': [{'id': basil.id, 'name': 'Basilic', 'category': 'Herbes'}]},
+        )
+        self.assertIsNone(self._get({'q': 'sel'}).json()['results'][0]['category'])
+
+    def test_next_walks_the_whole_catalog(self):
+        first = self._get().json()
+        self.assertEqual(len(first['results']), INGREDIENT_PAGE_SIZE)
+        self.assertIsNotNone(first['next'])
+
+        names, pages = self._walk({})
+        self.assertEqual(pages, 2)
+        self.assertEqual(names, list(Ingredient.objects.order_by('name', 'id').values_list('name', flat=True)))
+
+    def test_next_walks_every_search_match(self):
+        names, pages = self._walk({'q': 'épice'})
+        self.assertEqual(pages, 2)
+        self.assertEqual(sorted(names), [f'Épice {index:03d}' for index in range(70)])
+
+    def test_matching_etag_answers_not_modified(self):
+        etag = self._get({'q': 'basilic'})['ETag']
+
+        response = self._get({'q': 'basilic'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self._get({'q': 'sel'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        next_page = self._get({'after': self._get().json()['next']}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(next_page.status_code, 200)
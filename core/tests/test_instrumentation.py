@@ -0,0 +1,143 @@
+import json
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from core.models import ShoppingList, ShoppingListItem
+
+
+class InstrumentationMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('instrumented', password='instrumented-password')
+        cls.shopping_list = ShoppingList.objects.create(owner=cls.user, name='Courses')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_server_timing_and_log_line(self):
+        url = reverse('shopping_list_detail', args=[self.shopping_list.id])
+        with self.assertLogs('mealplanner.instrumentation', 'INFO') as logs, CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        timing = dict(part.strip().split(';', 1) for part in response['Server-Timing'].split(','))
+        self.assertEqual(set(timing), {'db', 'tpl', 'view', 'total'})
+        self.assertIn(f'desc="{len(queries)} queries"', timing['db'])
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['url_name'], 'shopping_list_detail')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['queries'], len(queries))
+        self.assertEqual(record['bytes'], len(response.content))
+        self.assertEqual(record['connections'], 0)
+        self.assertGreater(record['template_ms'], 0)
+
+    async def test_async_request_is_instrumented(self):
+        await self.async_client.aforce_login(self.user)
+        url = reverse('shopping_list_detail', args=[self.shopping_list.id])
+        with self.assertLogs('mealplanner.instrumentation', 'INFO') as logs:
+            response = await self.async_client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        timing = dict(part.strip().split(';', 1) for part in response['Server-Timing'].split(','))
+        self.assertEqual(set(timing), {'db', 'tpl', 'view', 'total'})
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((record['url_name'], record['status']), ('shopping_list_detail', 200))
+        self.assertGreater(record['queries'], 0)
+        self.assertIn(f'desc="{record["queries"]} queries"', timing['db'])
+        self.assertEqual(record['bytes'], len(response.content))
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreater(record['view_ms'], 0)
+
+    def test_unresolved_path_is_logged_without_name(self):
+        with self.assertLogs('mealplanner.instrumentation', 'INFO') as logs:
+            response = self.client.get('/nope/')
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(json.loads(logs.records[-1].getMessage())['url_name'])
+
+    @override_settings(SERVER_TIMING=False)
+    def test_header_can_be_disabled(self):
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            response = self.client.get(reverse('dashboard'))
+        self.assertNotIn('Server-Timing', response)
+
+
+@override_settings(METRICS_TOKEN='scrape-token')
+class MetricsEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('scraped', password='scraped-password')
+        cls.shopping_list = ShoppingList.objects.create(owner=cls.user, name='Courses')
+        for index in range(7):
+            ShoppingListItem.objects.create(
+                shopping_list=cls.shopping_list, name=f'Article {index}', quantity=Decimal('1'), checked=index < 2
+            )
+        ShoppingList.objects.create(owner=cls.user, name='Vide')
+
+    def _scrape(self):
+        return self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-token')
+
+    def test_exposes_request_and_domain_metrics(self):
+        self.client.force_login(self.user)
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            self.client.get(reverse('dashboard'))
+            response = self._scrape()
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('mealplanner_http_request_duration_seconds_bucket{', body)
+        self.assertRegex(body, r'mealplanner_http_request_db_queries_count\{method="GET",url_name="dashboard"\} [1-9]')
+        self.assertIn('mealplanner_open_lists 2.0', body)
+        self.assertIn('mealplanner_open_list_items{checked="true"} 2.0', body)
+        self.assertIn('mealplanner_open_list_items{checked="false"} 5.0', body)
+        self.assertIn('mealplanner_open_list_size_bucket{le="5"} 1.0', body)
+        self.assertIn('mealplanner_open_list_size_bucket{le="10"} 2.0', body)
+        self.assertIn('mealplanner_open_list_size_count 2.0', body)
+        self.assertIn('mealplanner_open_list_size_sum 7.0', body)
+        self.assertNotIn('list_id', body)
+
+    def test_token_is_required_when_configured(self):
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong-token')
+            self.assertEqual(response.status_code, 403)
+            self.assertEqual(self._scrape().status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_denied_without_a_token_unless_debugging(self):
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+            with self.settings(DEBUG=True):
+                self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    def test_exposes_connection_and_pool_metrics(self):
+        connection_created.send(sender=type(connection), connection=connection)
+        # Like psycopg's pop_stats(): the counters start over after each call.
+        measures = {'pool_max': 8, 'pool_size': 4, 'pool_available': 1}
+        reports = [{**measures, 'requests_num': 9, 'requests_queued': 5, 'requests_wait_ms': 1500}]
+        pool = SimpleNamespace(pop_stats=lambda: reports.pop() if reports else dict(measures))
+        queued = REGISTRY.get_sample_value('mealplanner_db_pool_queued_requests_total', {'alias': 'default'}) or 0
+
+        with mock.patch.object(connections['default'], 'pool', pool, create=True):
+            with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+                self.client.get(reverse('dashboard'))
+                self._scrape()
+                body = self._scrape().content.decode()
+
+        self.assertRegex(body, r'mealplanner_db_connections_total\{alias="default"\} [1-9]')
+        self.assertIn('mealplanner_db_pool_connections{alias="default",state="in_use"} 3.0', body)
+        self.assertIn('mealplanner_db_pool_max_size{alias="default"} 8.0', body)
+        # Reported once, then kept: no drop for Prometheus to read as a reset.
+        self.assertEqual(
+            REGISTRY.get_sample_value('mealplanner_db_pool_queued_requests_total', {'alias': 'default'}), queued + 5
+        )
+        self.assertIn('mealplanner_db_pool_timeouts_total{alias="default"}', body)
@@ -0,0 +1,79 @@
+import re
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Ingredient, ShoppingList, ShoppingListItem
+
+
+class ItemGroupsCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('caissier', password='caissier-password')
+        cls.guest = get_user_model().objects.create_user('invite', password='invite-password')
+        cls.flour = Ingredient.objects.create(name='Farine')
+
+    def setUp(self):
+        cache.clear()
+        self.shopping_list = ShoppingList.objects.create(owner=self.user, name='Courses', people_count=2)
+        self.item = ShoppingListItem.objects.create(
+            shopping_list=self.shopping_list, ingredient=self.flour, name='Farine', quantity=Decimal('1'),
+            per_person_quantity=Decimal('0.5'),
+        )
+        self.url = reverse('shopping_list_detail', args=[self.shopping_list.id])
+
+    def _version(self):
+        self.shopping_list.refresh_from_db(fields=['version'])
+        return self.shopping_list.version
+
+    def _get(self, client):
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            with CaptureQueriesContext(connection) as captured:
+                response = client.get(self.url)
+        item_queries = [query['sql'] for query in captured if 'core_shoppinglistitem' in query['sql']]
+        return response, item_queries
+
+    def test_version_follows_item_and_people_changes(self):
+        version = self._version()
+        ShoppingListItem.objects.filter(id=self.item.id).update(checked=True)
+        self.assertEqual(self._version(), version + 1)
+
+        self.shopping_list.set_people_count(4)
+        self.assertEqual(self._version(), version + 3)
+
+        self.shopping_list.name = 'Renommée'
+        self.shopping_list.save()
+        self.assertEqual(self._version(), version + 3)
+
+        self.item.delete()
+        self.assertEqual(self._version(), version + 4)
+
+    def test_unchanged_list_renders_items_from_cache(self):
+        self.client.force_login(self.user)
+        response, item_queries = self._get(self.client)
+        self.assertTrue(item_queries)
+        self.assertContains(response, 'Farine')
+
+        guest = Client(enforce_csrf_checks=True)
+        guest.force_login(self.guest)
+        response, item_queries = self._get(guest)
+        self.assertEqual(item_queries, [])
+        self.assertContains(response, 'Farine')
+
+        # The cached row forms carry the guest's own CSRF token.
+        toggle_url = reverse('shopping_list_toggle_item', args=[self.shopping_list.id, self.item.id])
+        token = re.search(
+            rf'action="{toggle_url}".*?name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode(), re.S
+        ).group(1)
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            response = guest.post(toggle_url, {'csrfmiddlewaretoken': token, 'checked': '1'})
+        self.assertEqual(response.status_code, 302)
+
+        response, item_queries = self._get(self.client)
+        self.assertTrue(item_queries)
+        self.assertContains(response, 'Décocher')
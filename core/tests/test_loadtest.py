@@ -0,0 +1,120 @@
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from core.management.commands.loadtest import Command, _scenario_toggle
+from core.models import ShoppingList, ShoppingListItem
+
+
+class LoadtestReportTests(SimpleTestCase):
+    def test_failed_requests_are_counted_apart(self):
+        search = '/api/ingredients/search/?q=to'
+        toggle = '/lists/1/items/2/toggle/'
+        outcomes = [
+            {
+                'error': None,
+                'samples': [
+                    ('GET', search, 200, 0.010),
+                    ('GET', search, 200, 0.030),
+                    ('GET', search, 500, 2.0),
+                    ('POST', toggle, 200, 0.020),
+                    ('POST', toggle, 403, 0.001),
+                ],
+                'started': 100.0,
+                'finished': 102.0,
+            },
+            {
+                'error': None,
+                'samples': [
+                    ('GET', search, 200, 0.020),
+                    ('GET', search, 0, 30.0),
+                    ('POST', toggle, 404, 0.002),
+                    ('POST', toggle, 302, 0.040),
+                ],
+                'started': 100.5,
+                'finished': 102.5,
+            },
+        ]
+        # --duration says 1s: the 2.5s the sessions actually ran are what counts.
+        report = Command()._build_report(outcomes, {'duration': 1.0, 'base_url': 'http://testserver', 'sessions': 2})
+
+        self.assertEqual(
+            (report['duration'], report['requests'], report['errors'], report['throughput']), (2.5, 9, 4, 2.0)
+        )
+        routes = {route['url_name']: route for route in report['routes']}
+
+        search_route = routes['api_ingredient_search']
+        self.assertEqual((search_route['requests'], search_route['errors']), (5, 2))
+        self.assertEqual(search_route['throughput'], 1.2)
+        self.assertEqual((search_route['p50_ms'], search_route['max_ms']), (20.0, 30.0))
+
+        toggle_route = routes['shopping_list_toggle_item']
+        self.assertEqual((toggle_route['method'], toggle_route['requests'], toggle_route['errors']), ('POST', 4, 2))
+        self.assertEqual((toggle_route['p50_ms'], toggle_route['max_ms']), (20.0, 40.0))
+
+    def test_route_with_only_errors(self):
+        outcomes = [{'error': None, 'samples': [('GET', '/nope/', 404, 0.005)], 'started': 0.0, 'finished': 1.0}]
+        report = Command()._build_report(outcomes, {'duration': 1.0, 'base_url': 'http://testserver', 'sessions': 1})
+
+        self.assertEqual(
+            report['routes'],
+            [
+                {
+                    'url_name': 'unresolved', 'method': 'GET', 'requests': 1, 'errors': 1, 'throughput': 0.0,
+                    'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0,
+                }
+            ],
+        )
+
+    def test_no_session_logged_in(self):
+        outcomes = [{'error': 'connexion impossible pour chef00001', 'samples': []}]
+        report = Command()._build_report(outcomes, {'duration': 1.0, 'base_url': 'http://testserver', 'sessions': 1})
+
+        self.assertEqual((report['duration'], report['requests'], report['throughput']), (0.0, 0, 0.0))
+
+
+class _PageSession:
+    # Serves pages rendered by the test client instead of going over HTTP.
+    def __init__(self, client):
+        self.client = client
+        self.cookies = {'csrftoken': 'jeton'}
+        self.posts = []
+
+    def request(self, method, path, data=None, ajax=False):
+        if method == 'GET':
+            response = self.client.get(path)
+        else:
+            self.posts.append((path, data))
+            response = self.client.post(path, data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        return response.status_code, response.get('Location'), response.content
+
+
+class LoadtestToggleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('charge', password='charge-password')
+        cls.shopping_list = ShoppingList.objects.create(owner=cls.user, name='Courses')
+        cls.item = ShoppingListItem.objects.create(
+            shopping_list=cls.shopping_list, name='Sel', quantity=Decimal('1'), checked=True
+        )
+
+    def test_toggle_posts_the_form_data_of_the_page(self):
+        self.client.force_login(self.user)
+        session = _PageSession(self.client)
+        state = {'list_id': self.shopping_list.id}
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            _scenario_toggle(session, random.Random(0), state)
+            _scenario_toggle(session, random.Random(0), state)
+
+        path = f'/lists/{self.shopping_list.id}/items/{self.item.id}/toggle/'
+        self.assertEqual(
+            session.posts,
+            [
+                (path, {'csrfmiddlewaretoken': 'jeton', 'checked': '0'}),
+                (path, {'csrfmiddlewaretoken': 'jeton', 'checked': '1'}),
+            ],
+        )
+        self.item.refresh_from_db()
+        self.assertTrue(self.item.checked)
@@ -0,0 +1,514 @@
+import json
+import logging
+import os
+import platform
+import subprocess
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import catalog, realtime, urls as core_urls
+from core.models import (
+    Ingredient,
+    IngredientCategory,
+    Recipe,
+    RecipeIngredient,
+    ShoppingList,
+    ShoppingListItem,
+    ShoppingListSnapshot,
+    UNIT_CHOICES,
+    build_list_summaries,
+)
+
+# Dataset size and wall-time budgets can be tuned per machine, e.g.
+# PERF_SCALE=3 PERF_TIME_FACTOR=2 python manage.py test core.tests.test_performance
+SCALE = float(os.environ.get('PERF_SCALE', '1'))
+TIME_FACTOR = float(os.environ.get('PERF_TIME_FACTOR', '1'))
+REPORT_PATH = os.environ.get('PERF_REPORT', str(settings.BASE_DIR / 'perf-report.json'))
+
+CATEGORY_COUNT = 40
+INGREDIENT_COUNT = int(3000 * SCALE)
+RECIPE_COUNT = int(300 * SCALE)
+INGREDIENTS_PER_RECIPE = 12
+OPEN_LIST_COUNT = 3
+OPEN_LIST_ITEMS = int(300 * SCALE)
+CLOSED_LIST_COUNT = int(60 * SCALE)
+CLOSED_LIST_ITEMS = 40
+
+UNITS = [value for value, _ in UNIT_CHOICES]
+
+
+def _seed_dataset(owner):
+    categories = IngredientCategory.objects.bulk_create(
+        IngredientCategory(name=f'Rayon {index:03d}') for index in range(CATEGORY_COUNT)
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(
+            name=f'Ingrédient {index:05d}',
+            # Leave some ingredients uncategorised to exercise the fallback group.
+            category=None if index % 25 == 0 else categories[index % CATEGORY_COUNT],
+        )
+        for index in range(INGREDIENT_COUNT)
+    )
+    recipes = Recipe.objects.bulk_create(
+        Recipe(owner=owner, name=f'Recette {index:04d}') for index in range(RECIPE_COUNT)
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe,
+            ingredient=ingredients[(recipe_index * 7 + offset * 131) % INGREDIENT_COUNT],
+            quantity_per_person=Decimal(10 + offset),
+            unit=UNITS[offset % len(UNITS)],
+        )
+        for recipe_index, recipe in enumerate(recipes)
+        for offset in range(INGREDIENTS_PER_RECIPE)
+    )
+
+    open_lists = [
+        ShoppingList.objects.create(owner=owner, name=f'Courses {index}', people_count=4)
+        for index in range(OPEN_LIST_COUNT)
+    ]
+    closed_lists = ShoppingList.objects.bulk_create(
+        ShoppingList(
+            owner=owner,
+            name=f'Archive {index}',
+            is_closed=True,
+            closed_at=timezone.now() - timedelta(days=index // 2),
+        )
+        for index in range(CLOSED_LIST_COUNT)
+    )
+    items = []
+    for shopping_list, size in [(lst, OPEN_LIST_ITEMS) for lst in open_lists] + [
+        (lst, CLOSED_LIST_ITEMS) for lst in closed_lists
+    ]:
+        for index in range(size):
+            ingredient = ingredients[(index * 11) % INGREDIENT_COUNT]
+            items.append(
+                ShoppingListItem(
+                    shopping_list=shopping_list,
+                    ingredient=ingredient,
+                    name=ingredient.name,
+                    unit=UNITS[index % len(UNITS)],
+                    quantity=Decimal('4.00'),
+                    per_person_quantity=Decimal('1.0000') if index % 3 else None,
+                    checked=index % 4 == 0,
+                )
+            )
+    ShoppingListItem.objects.bulk_create(items, batch_size=500)
+    summaries = build_list_summaries(ShoppingListItem.objects.filter(shopping_list__in=closed_lists))
+    for shopping_list in closed_lists:
+        shopping_list.summary = summaries.get(shopping_list.id)
+    ShoppingList.objects.bulk_update(closed_lists, ['summary'])
+    # Half the archive is frozen, as close() does; the rest predates snapshots.
+    ShoppingListSnapshot.freeze_many(shopping_list.id for shopping_list in closed_lists[::2])
+
+    # Bulk inserts skip the signals that normally bump the catalog version.
+    catalog.invalidate()
+    return {
+        'ingredients': ingredients,
+        'recipes': recipes,
+        'open_lists': open_lists,
+        'closed_lists': closed_lists,
+    }
+
+
+def _server_timing(response):
+    timings = {}
+    for metric in response.get('Server-Timing', '').split(','):
+        name, _, params = metric.strip().partition(';')
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if name and key == 'dur':
+                timings[f'{name}_ms'] = float(value)
+    return timings
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class ViewBudgetTests(TestCase):
+    # Every route of core/urls.py is exercised against a large dataset. Query
+    # budgets are exact upper bounds: a new N+1 pattern breaks them at once.
+    # Wall-time budgets are deliberately loose and only catch gross regressions.
+    results = []
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.results = []
+        # The per-request log lines would drown the test output; timings are
+        # read from the Server-Timing header instead.
+        cls.request_logger = logging.getLogger('mealplanner.instrumentation')
+        cls.request_logger_level = cls.request_logger.level
+        cls.request_logger.setLevel(logging.WARNING)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.request_logger.setLevel(cls.request_logger_level)
+        cls._write_report()
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('bench', password='bench-password')
+        cls.data = _seed_dataset(cls.user)
+
+    @classmethod
+    def _write_report(cls):
+        report = {
+            'revision': _git_revision(),
+            'generated_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'scale': SCALE,
+            'time_factor': TIME_FACTOR,
+            'dataset': {
+                'ingredients': INGREDIENT_COUNT,
+                'recipes': RECIPE_COUNT,
+                'recipe_ingredients': RECIPE_COUNT * INGREDIENTS_PER_RECIPE,
+                'open_lists': OPEN_LIST_COUNT,
+                'open_list_items': OPEN_LIST_ITEMS,
+                'closed_lists': CLOSED_LIST_COUNT,
+            },
+            'views': sorted(cls.results, key=lambda result: (result['url_name'], result['label'])),
+        }
+        with open(REPORT_PATH, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2, ensure_ascii=False)
+            handle.write('\n')
+
+    def setUp(self):
+        # Cache keys embed database versions, which roll back between tests:
+        # start every test cold rather than read another test's entries.
+        cache.clear()
+        self.client.force_login(self.user)
+        self.open_list = self.data['open_lists'][0]
+        self.closed_list = self.data['closed_lists'][0]
+        self.recipe = self.data['recipes'][0]
+        self.ingredient = self.data['ingredients'][1]
+        self.item = self.open_list.items.order_by('id').first()
+
+    def assertWithinBudget(self, url_name, url, *, queries, seconds, method='get', label='', data=None,
+                           status=200, warm=None, consume=None, **extra):
+        if warm is None:
+            warm = method == 'get'
+        send = getattr(self.client, method)
+        if warm:
+            # Prime per-process caches (catalog, templates) so the measured
+            # request reflects the steady state, not the first hit.
+            response = send(url, data, **extra)
+            if consume:
+                consume(response)
+
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = send(url, data, **extra)
+            if consume:
+                consume(response)
+            elapsed = time.perf_counter() - started
+
+        time_budget = seconds * TIME_FACTOR
+        self.results.append(
+            {
+                'url_name': url_name,
+                'label': label or method.upper(),
+                'method': method.upper(),
+                'path': url,
+                'status': response.status_code,
+                'queries': len(captured),
+                'query_budget': queries,
+                'seconds': round(elapsed, 4),
+                'seconds_budget': time_budget,
+                'response_bytes': 0 if response.streaming else len(response.content),
+                'server_timing': _server_timing(response),
+            }
+        )
+
+        self.assertEqual(response.status_code, status)
+        self.assertLessEqual(
+            len(captured),
+            queries,
+            f'{url_name} ({label or method}) ran {len(captured)} queries, budget is {queries}:\n'
+            + '\n'.join(query['sql'] for query in captured.captured_queries),
+        )
+        self.assertLessEqual(
+            elapsed,
+            time_budget,
+            f'{url_name} ({label or method}) took {elapsed:.3f}s, budget is {time_budget:.3f}s',
+        )
+        return response
+
+    def test_every_route_has_a_budget(self):
+        names = {pattern.name for pattern in core_urls.urlpatterns}
+        covered = {name[len('test_'):] for name in dir(self) if name.startswith('test_')}
+        self.assertEqual(sorted(names - covered), [])
+
+    def test_dashboard(self):
+        response = self.assertWithinBudget('dashboard', reverse('dashboard'), queries=4, seconds=0.5)
+        # Counters come from triggers, bulk inserts included.
+        self.assertEqual(response.context['recipes_count'], RECIPE_COUNT)
+        active_list = response.context['active_list']
+        self.assertEqual(active_list.item_count, active_list.items.count())
+
+    def test_register(self):
+        self.client.logout()
+        self.assertWithinBudget('register', reverse('register'), queries=0, seconds=0.5)
+
+    def test_api_recipe_search(self):
+        url = reverse('api_recipe_search')
+        response = self.assertWithinBudget('api_recipe_search', url, label='first page', queries=5, seconds=0.5)
+        self.assertEqual(len(response.json()['results']), 30)
+        self.assertWithinBudget('api_recipe_search', url, label='query', data={'q': 'cette 01'}, queries=4, seconds=0.5)
+
+    def test_api_ingredient_search(self):
+        url = reverse('api_ingredient_search')
+        self.assertWithinBudget('api_ingredient_search', url, label='first page', queries=4, seconds=0.5)
+        self.assertWithinBudget(
+            'api_ingredient_search', url, label='query', data={'q': 'dient 012'}, queries=4, seconds=0.5
+        )
+        response = self.client.get(url)
+        self.assertWithinBudget(
+            'api_ingredient_search',
+            url,
+            label='revalidated',
+            queries=3,
+            seconds=0.5,
+            status=304,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+
+    def test_ingredient_list(self):
+        url = reverse('ingredient_list')
+        self.assertWithinBudget('ingredient_list', url, queries=4, seconds=1.0)
+        self.assertWithinBudget(
+            'ingredient_list', url, label='filtered', data={'q': 'dient 01'}, queries=4, seconds=1.0
+        )
+
+    def test_ingredient_edit(self):
+        url = reverse('ingredient_edit', args=[self.ingredient.id])
+        self.assertWithinBudget('ingredient_edit', url, queries=4, seconds=0.5)
+
+    def test_ingredient_delete(self):
+        # Used by recipes and lists: the PROTECT path must stay cheap too.
+        url = reverse('ingredient_delete', args=[self.data['ingredients'][0].id])
+        self.assertWithinBudget('ingredient_delete', url, method='post', queries=4, seconds=0.5, status=302)
+
+    def test_recipe_list(self):
+        url = reverse('recipe_list')
+        response = self.assertWithinBudget('recipe_list', url, queries=6, seconds=0.5)
+        first = response.context['recipe_page'].items[0]
+        self.assertEqual(first.ingredient_count, INGREDIENTS_PER_RECIPE)
+        self.assertTrue(first.category_names)
+        self.assertWithinBudget(
+            'recipe_list',
+            url,
+            label='next page',
+            data={'after': response.context['recipe_page'].next_token},
+            queries=6,
+            seconds=0.5,
+        )
+        response = self.assertWithinBudget(
+            'recipe_list',
+            url,
+            label='search and owner',
+            data={'q': '0012', 'owner': self.user.id},
+            queries=5,
+            seconds=0.5,
+        )
+        self.assertEqual([recipe.name for recipe in response.context['recipe_page']], ['Recette 0012'])
+
+    def test_recipe_create(self):
+        self.assertWithinBudget('recipe_create', reverse('recipe_create'), queries=2, seconds=0.5)
+
+    def test_recipe_detail(self):
+        url = reverse('recipe_detail', args=[self.recipe.id])
+        response = self.assertWithinBudget('recipe_detail', url, queries=5, seconds=1.0)
+        self.assertWithinBudget(
+            'recipe_detail',
+            url,
+            label='revalidated',
+            queries=3,
+            seconds=0.5,
+            status=304,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertWithinBudget(
+            'recipe_detail',
+            url,
+            label='add ingredient',
+            method='post',
+            data={'ingredient_id': self.ingredient.id, 'quantity_per_person': '12', 'unit': 'g'},
+            queries=8,
+            seconds=0.5,
+            status=302,
+        )
+
+    def test_recipe_delete(self):
+        url = reverse('recipe_delete', args=[self.recipe.id])
+        self.assertWithinBudget('recipe_delete', url, queries=3, seconds=0.5)
+
+    def test_recipe_ingredient_delete(self):
+        recipe_ingredient = self.recipe.ingredients.first()
+        url = reverse('recipe_ingredient_delete', args=[recipe_ingredient.id])
+        self.assertWithinBudget('recipe_ingredient_delete', url, queries=5, seconds=0.5)
+
+    def test_shopping_list_create(self):
+        url = reverse('shopping_list_create')
+        self.assertWithinBudget('shopping_list_create', url, queries=2, seconds=0.5)
+
+    def test_shopping_list_active(self):
+        url = reverse('shopping_list_active')
+        self.assertWithinBudget('shopping_list_active', url, queries=3, seconds=0.5, status=302)
+
+    def test_shopping_list_archive(self):
+        url = reverse('shopping_list_archive')
+        response = self.assertWithinBudget('shopping_list_archive', url, queries=3, seconds=0.5)
+        self.assertWithinBudget(
+            'shopping_list_archive',
+            url,
+            label='older page',
+            data={'after': response.context['closed_lists'].next_token},
+            queries=3,
+            seconds=0.5,
+        )
+
+    def test_shopping_list_detail(self):
+        url = reverse('shopping_list_detail', args=[self.open_list.id])
+        response = self.assertWithinBudget('shopping_list_detail', url, queries=4, seconds=1.5)
+        self.assertWithinBudget(
+            'shopping_list_detail',
+            url,
+            label='revalidated',
+            queries=3,
+            seconds=0.5,
+            status=304,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertWithinBudget(
+            'shopping_list_detail',
+            url,
+            label='quick add',
+            method='post',
+            data={'ingredient_id': self.ingredient.id, 'quantity': '2', 'unit': 'kg'},
+            queries=9,
+            seconds=0.5,
+            status=302,
+        )
+        self.assertWithinBudget(
+            'shopping_list_detail',
+            reverse('shopping_list_detail', args=[self.closed_list.id]),
+            label='closed (frozen)',
+            queries=3,
+            seconds=0.5,
+        )
+        self.assertWithinBudget(
+            'shopping_list_detail',
+            reverse('shopping_list_detail', args=[self.data['closed_lists'][1].id]),
+            label='closed (live items)',
+            queries=3,
+            seconds=0.5,
+        )
+
+    def test_shopping_list_add_recipes(self):
+        url = reverse('shopping_list_add_recipes', args=[self.open_list.id])
+        self.assertWithinBudget('shopping_list_add_recipes', url, queries=6, seconds=0.5)
+
+        self.assertWithinBudget(
+            'shopping_list_add_recipes',
+            url,
+            label='add five recipes',
+            method='post',
+            data={'selection': [f'{recipe.id}:3' for recipe in self.data['recipes'][:5]]},
+            queries=12,
+            seconds=1.0,
+            status=302,
+        )
+
+    def test_shopping_list_update_people(self):
+        url = reverse('shopping_list_update_people', args=[self.open_list.id])
+        self.assertWithinBudget('shopping_list_update_people', url, queries=3, seconds=0.5)
+        self.assertWithinBudget(
+            'shopping_list_update_people',
+            url,
+            method='post',
+            data={'people_count': 6},
+            queries=7,
+            seconds=0.5,
+            status=302,
+        )
+
+    def test_shopping_list_toggle_item(self):
+        url = reverse('shopping_list_toggle_item', args=[self.open_list.id, self.item.id])
+        self.assertWithinBudget(
+            'shopping_list_toggle_item',
+            url,
+            label='async',
+            method='post',
+            data={'checked': '1'},
+            queries=3,
+            seconds=0.25,
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertWithinBudget(
+            'shopping_list_toggle_item', url, method='post', queries=6, seconds=0.5, status=302
+        )
+
+    def test_shopping_list_remove_item(self):
+        items = list(self.open_list.items.order_by('id')[:2])
+        self.assertWithinBudget(
+            'shopping_list_remove_item',
+            reverse('shopping_list_remove_item', args=[self.open_list.id, items[0].id]),
+            label='async',
+            method='post',
+            queries=3,
+            seconds=0.25,
+            status=204,
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertWithinBudget(
+            'shopping_list_remove_item',
+            reverse('shopping_list_remove_item', args=[self.open_list.id, items[1].id]),
+            method='post',
+            queries=5,
+            seconds=0.5,
+            status=302,
+        )
+
+    def test_shopping_list_events(self):
+        def read_handshake(response):
+            # The stream never ends on its own: read the opening frame and hang up.
+            self.assertEqual(next(iter(response.streaming_content)), b'retry: 3000\n\n')
+            response.close()
+
+        url = reverse('shopping_list_events', args=[self.open_list.id])
+        with realtime.use_broker(realtime.InProcessBroker()):
+            self.assertWithinBudget(
+                'shopping_list_events', url, queries=3, seconds=0.25, consume=read_handshake
+            )
+
+    def test_shopping_list_close(self):
+        url = reverse('shopping_list_close', args=[self.open_list.id])
+        self.assertWithinBudget('shopping_list_close', url, queries=3, seconds=0.5)
+        self.assertWithinBudget(
+            'shopping_list_close', url, method='post', queries=10, seconds=0.5, status=302
+        )
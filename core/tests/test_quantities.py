@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.models import Ingredient, Recipe, RecipeIngredient, ShoppingList, ShoppingListItem, round_quantity
+
+
+class ShoppingListQuantityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('econome', password='econome-password')
+        cls.butter = Ingredient.objects.create(name='Beurre')
+        cls.recipe = Recipe.objects.create(owner=cls.user, name='Sablés')
+        RecipeIngredient.objects.create(
+            recipe=cls.recipe, ingredient=cls.butter, quantity_per_person=Decimal('0.25'), unit='kg'
+        )
+
+    def setUp(self):
+        self.shopping_list = ShoppingList.objects.create(owner=self.user, name='Courses', people_count=4)
+        self.manual = ShoppingListItem.objects.create(
+            shopping_list=self.shopping_list, name='Bougies', quantity=Decimal('3')
+        )
+        (self.item,), _ = self.shopping_list.add_recipes([(self.recipe.id, 1)])
+
+    def _quantity(self):
+        self.item.refresh_from_db()
+        return self.item.quantity
+
+    def test_rescaling_rounds_half_up_like_adding(self):
+        self.assertEqual(self.item.per_person_quantity, Decimal('0.0625'))
+        self.assertEqual(self._quantity(), Decimal('0.25'))
+
+        # 0.125 and 0.375: exact halves, where half-even would round to 0.12 and 0.38.
+        for people, expected in ((2, Decimal('0.13')), (6, Decimal('0.38')), (3, Decimal('0.19'))):
+            self.shopping_list.set_people_count(people)
+            quantity = self._quantity()
+            self.assertEqual(quantity, expected)
+            self.assertEqual(quantity, round_quantity(people * self.item.per_person_quantity))
+
+        self.manual.refresh_from_db()
+        self.assertEqual(self.manual.quantity, Decimal('3'))
+
+    def test_adding_again_keeps_the_rescaled_rounding(self):
+        self.shopping_list.set_people_count(2)
+        self.shopping_list.add_recipes([(self.recipe.id, 2)])
+
+        # 0.0625 + 0.25 per person, for two people: 0.625 rounds up to 0.63.
+        self.assertEqual(self._quantity(), Decimal('0.63'))
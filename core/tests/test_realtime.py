@@ -0,0 +1,105 @@
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from core import realtime
+from core.models import Ingredient, ShoppingList, ShoppingListItem
+
+
+class ShoppingListEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('abonne', password='abonne-password')
+        cls.flour = Ingredient.objects.create(name='Farine')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.shopping_list = ShoppingList.objects.create(owner=self.user, name='Courses', people_count=2)
+        self.item = ShoppingListItem.objects.create(
+            shopping_list=self.shopping_list, ingredient=self.flour, name='Farine', unit='g', quantity=Decimal('200'),
+        )
+        self.enterContext(realtime.use_broker(realtime.InProcessBroker()))
+        # A missing event shows up as a keepalive instead of blocking for long.
+        self.enterContext(mock.patch.object(realtime, 'KEEPALIVE_SECONDS', 0.5))
+
+        self.stream = realtime.stream_events(self.shopping_list.id)
+        self.addCleanup(self.stream.close)
+        self.assertEqual(next(self.stream), 'retry: 3000\n\n')
+
+    def _post(self, url, data=None, **headers):
+        with self.captureOnCommitCallbacks(execute=True), self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            return self.client.post(url, data or {}, **headers)
+
+    def _next_event(self):
+        frame = next(self.stream)
+        self.assertTrue(frame.startswith('data: '), frame)
+        return json.loads(frame[len('data: '):])
+
+    def test_toggle_is_delivered(self):
+        url = reverse('shopping_list_toggle_item', args=[self.shopping_list.id, self.item.id])
+        self._post(url, {'checked': '1'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(self._next_event(), {'type': 'checked', 'item': self.item.id, 'checked': True})
+
+    def test_removal_is_delivered(self):
+        url = reverse('shopping_list_remove_item', args=[self.shopping_list.id, self.item.id])
+        self._post(url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(self._next_event(), {'type': 'removed', 'item': self.item.id})
+
+    def test_quantity_change_is_delivered(self):
+        url = reverse('shopping_list_detail', args=[self.shopping_list.id])
+        self._post(url, {'ingredient_id': self.flour.id, 'quantity': '50', 'unit': 'g'})
+
+        event = self._next_event()
+        self.assertEqual((event['type'], event['item'], event['quantity']), ('quantity', self.item.id, '250.00'))
+
+    def test_rejected_change_is_not_delivered(self):
+        ShoppingList.objects.filter(id=self.shopping_list.id).update(is_closed=True)
+        url = reverse('shopping_list_toggle_item', args=[self.shopping_list.id, self.item.id])
+        self._post(url, {'checked': '1'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(next(self.stream), ': keepalive\n\n')
+
+
+class ShoppingListEventsConnectionTests(TransactionTestCase):
+    # Outside a test transaction, as in production: the view may close.
+    serialized_rollback = True
+
+    def setUp(self):
+        user = get_user_model().objects.create_user('veilleur', password='veilleur-password')
+        self.shopping_list = ShoppingList.objects.create(owner=user, name='Courses')
+        self.client.force_login(user)
+        self.enterContext(realtime.use_broker(realtime.InProcessBroker()))
+
+    def test_connection_is_released_while_the_stream_is_open(self):
+        connection = connections['default']
+        with mock.patch.object(connection, 'close', wraps=connection.close) as close:
+            with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+                response = self.client.get(reverse('shopping_list_events', args=[self.shopping_list.id]))
+            stream = iter(response.streaming_content)
+            self.addCleanup(response.close)
+
+            self.assertEqual(next(stream), b'retry: 3000\n\n')
+            close.assert_called_once_with()
+
+            # Still subscribed after the connection went back.
+            realtime.publish(self.shopping_list.id, {'type': 'removed', 'item': 1})
+            self.assertEqual(json.loads(next(stream).decode()[len('data: '):]), {'type': 'removed', 'item': 1})
+            close.assert_called_once_with()
+
+
+class PostgresBrokerTests(SimpleTestCase):
+    def test_notifications_reach_local_subscribers(self):
+        broker = realtime.PostgresBroker()
+        with mock.patch.object(realtime.PostgresBroker, '_listen') as listen:
+            subscription = broker.subscribe(7, asynchronous=False)
+            other = broker.subscribe(8, asynchronous=False)
+        broker._listener.join()
+        listen.assert_called_once_with()
+
+        broker._dispatch(json.dumps({'list': 7, 'event': {'type': 'removed', 'item': 3}}))
+        self.assertEqual(subscription.get(0), {'type': 'removed', 'item': 3})
+        self.assertIsNone(other.get(0))
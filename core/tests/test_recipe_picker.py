@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.http import QueryDict
+from django.test import TestCase
+from django.urls import reverse
+
+from core.forms import AddRecipesForm
+from core.models import Ingredient, Recipe, RecipeIngredient, ShoppingList
+
+
+class AddRecipesFormTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user('cuisinier', password='cuisinier-password')
+        cls.soup, cls.salad = Recipe.objects.bulk_create(
+            [Recipe(owner=user, name='Soupe'), Recipe(owner=user, name='Salade')]
+        )
+
+    def _form(self, query_string, default_people=2):
+        return AddRecipesForm(QueryDict(query_string), default_people=default_people)
+
+    def test_picker_tokens(self):
+        form = self._form(f'selection={self.soup.id}:4&selection={self.salad.id}:1')
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['selection'], [(self.soup.id, 4), (self.salad.id, 1)])
+
+    def test_checkboxes_without_javascript(self):
+        form = self._form(f'selection={self.soup.id}&people_{self.soup.id}=5&selection={self.salad.id}')
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['selection'], [(self.soup.id, 5), (self.salad.id, 2)])
+
+    def test_rejected_selections(self):
+        for query_string, message in (
+            ('', 'Sélectionnez au moins une recette.'),
+            ('selection=abc', 'Sélection invalide.'),
+            (f'selection={self.soup.id}:0', 'Sélection invalide.'),
+            ('selection=999999:2', "Certaines recettes n'existent plus."),
+        ):
+            with self.subTest(query_string=query_string):
+                form = self._form(query_string)
+                self.assertFalse(form.is_valid())
+                self.assertEqual(form.errors['selection'], [message])
+
+
+class RecipePickerViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('cuisinier', password='cuisinier-password')
+        cls.shopping_list = ShoppingList.objects.create(owner=cls.user, name='Courses', people_count=2)
+        leek = Ingredient.objects.create(name='Poireau')
+        cls.soup, cls.salad = Recipe.objects.bulk_create(
+            [Recipe(owner=cls.user, name='Soupe de poireaux'), Recipe(owner=cls.user, name='Salade')]
+        )
+        RecipeIngredient.objects.create(recipe=cls.soup, ingredient=leek, quantity_per_person=Decimal('1.5'), unit='unit')
+        RecipeIngredient.objects.create(recipe=cls.salad, ingredient=leek, quantity_per_person=Decimal('3'), unit='unit')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_search_api(self):
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            response = self.client.get(reverse('api_recipe_search'), {'q': 'poireaux'})
+        self.assertEqual(
+            response.json()['results'],
+            [{'id': self.soup.id, 'name': 'Soupe de poireaux', 'ingredient_count': 1, 'categories': []}],
+        )
+
+    def test_only_selected_recipes_are_added(self):
+        url = reverse('shopping_list_add_recipes', args=[self.shopping_list.id])
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            response = self.client.post(url, {'selection': [f'{self.soup.id}:4']})
+        self.assertRedirects(
+            response, reverse('shopping_list_detail', args=[self.shopping_list.id]), fetch_redirect_response=False
+        )
+        item = self.shopping_list.items.get()
+        self.assertEqual(item.quantity, Decimal('6'))
@@ -0,0 +1,82 @@
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection, migrations, models
+from django.db.migrations.loader import MigrationLoader
+from django.test import TransactionTestCase
+
+from core.models import Counter, Ingredient, IngredientCategory, ShoppingList, ShoppingListItem
+from core.schema import PreserveTriggers
+from core.search import search_ingredients
+
+
+class PreserveTriggersTests(TransactionTestCase):
+    # Schema changes cannot run inside the transaction of a TestCase on SQLite.
+    serialized_rollback = True
+
+    def setUp(self):
+        self.state = MigrationLoader(connection).project_state()
+
+    def _triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+            return set(cursor.fetchall())
+
+    def _migrate(self, operation):
+        to_state = self.state.clone()
+        operation.state_forwards('core', to_state)
+        with connection.schema_editor() as schema_editor:
+            operation.database_forwards('core', schema_editor, self.state, to_state)
+        self.addCleanup(self._unmigrate, operation, to_state)
+
+    def _unmigrate(self, operation, from_state):
+        with connection.schema_editor() as schema_editor:
+            operation.database_backwards('core', schema_editor, from_state, self.state)
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite rebuilds tables for AlterField')
+    def test_bare_alter_field_trips_over_the_triggers(self):
+        with self.assertRaisesMessage(OperationalError, 'error in trigger'):
+            self._migrate(migrations.AlterField('shoppinglist', 'name', models.CharField(max_length=150)))
+
+    def test_alter_field_keeps_counter_and_version_triggers(self):
+        triggers = self._triggers() if connection.vendor == 'sqlite' else None
+        self._migrate(
+            PreserveTriggers([migrations.AlterField('shoppinglist', 'name', models.CharField(max_length=150))])
+        )
+        if triggers is not None:
+            self.assertEqual(self._triggers(), triggers)
+
+        open_lists = Counter.read(Counter.OPEN_LISTS)
+        owner = get_user_model().objects.create_user('migrateur', password='migrateur-password')
+        shopping_list = ShoppingList.objects.create(owner=owner, name='Courses')
+        ShoppingListItem.objects.create(shopping_list=shopping_list, name='Sel', quantity=Decimal('1'), checked=True)
+
+        shopping_list.refresh_from_db()
+        self.assertEqual((shopping_list.item_count, shopping_list.checked_count, shopping_list.version), (1, 1, 1))
+        self.assertEqual(Counter.read(Counter.OPEN_LISTS), open_lists + 1)
+
+    def test_alter_fields_keep_the_ingredient_search_index_in_sync(self):
+        self._migrate(
+            PreserveTriggers(
+                [
+                    migrations.AlterField('ingredient', 'name', models.CharField(max_length=150, unique=True)),
+                    migrations.AlterField('ingredientcategory', 'name', models.CharField(max_length=100, unique=True)),
+                ]
+            )
+        )
+
+        category = IngredientCategory.objects.create(name='Agrumes')
+        Ingredient.objects.create(name='Citron vert', category=category)
+        self.assertEqual([i.name for i in search_ingredients(Ingredient.objects.all(), 'citron')], ['Citron vert'])
+
+        category.name = 'Fruits exotiques'
+        category.save()
+        self.assertEqual([i.name for i in search_ingredients(Ingredient.objects.all(), 'exotiques')], ['Citron vert'])
+        self.assertFalse(search_ingredients(Ingredient.objects.all(), 'agrumes').exists())
+
+    def test_deconstructs_for_the_migration_writer(self):
+        operation = PreserveTriggers([migrations.AlterField('shoppinglist', 'name', models.CharField(max_length=150))])
+        name, args, kwargs = operation.deconstruct()
+        self.assertEqual((name, args), ('PreserveTriggers', []))
+        self.assertEqual(PreserveTriggers(**kwargs).database_operations, operation.database_operations)
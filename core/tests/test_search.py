@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.db.models.functions import Length
+from django.test import TestCase
+
+from core.models import Ingredient, IngredientCategory, Recipe
+from core.pagination import INGREDIENT_PAGE_SIZE, paginate_by_name
+from core.search import SqliteFtsIngredientSearch, SqliteFtsRecipeSearch
+
+
+class SqliteFtsSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        tomatoes = IngredientCategory.objects.create(name='Tomates')
+        Ingredient.objects.create(name='Coeur de boeuf', category=tomatoes)
+        Ingredient.objects.create(name='Tomate cerise')
+        Ingredient.objects.create(name='Poivron')
+        owner = get_user_model().objects.create_user('chercheur', password='chercheur-password')
+        for index in range(5):
+            Recipe.objects.create(owner=owner, name=f'Gratin {index}')
+        Recipe.objects.create(owner=owner, name='Salade')
+
+    def test_ingredient_matches_rank_names_above_categories(self):
+        results = SqliteFtsIngredientSearch().search(Ingredient.objects.all(), 'tomate')
+        self.assertEqual([ingredient.name for ingredient in results], ['Tomate cerise', 'Coeur de boeuf'])
+        self.assertLess(results[0].search_rank, results[1].search_rank)
+
+    def test_recipe_matches_page_through_the_keyset(self):
+        recipes = SqliteFtsRecipeSearch().search(Recipe.objects.all(), 'gratin')
+        first = paginate_by_name(recipes, page_size=3)
+        second = paginate_by_name(recipes, first.next_token, page_size=3)
+
+        self.assertEqual([recipe.name for recipe in first.items], ['Gratin 0', 'Gratin 1', 'Gratin 2'])
+        self.assertEqual([recipe.name for recipe in second.items], ['Gratin 3', 'Gratin 4'])
+        self.assertIsNone(second.next_token)
+
+
+class RankedPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Names of varying length spread the matches over many bm25 ranks,
+        # and the category matches rank below every name match.
+        sauces = IngredientCategory.objects.create(name='Tomates et sauces')
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=f'Tomate {"x" * (index % 9)} {index:03d}') for index in range(90)]
+            + [Ingredient(name=f'Coulis {index:03d}', category=sauces) for index in range(40)]
+        )
+
+    def _walk(self, queryset):
+        pages, after = [], None
+        while True:
+            page = paginate_by_name(queryset, after)
+            pages.append([ingredient.id for ingredient in page])
+            after = page.next_token
+            if after is None:
+                return pages
+
+    def test_every_ranked_match_is_reachable(self):
+        ranked = SqliteFtsIngredientSearch().search(Ingredient.objects.all(), 'tomate')
+        pages = self._walk(ranked)
+
+        self.assertEqual([len(page) for page in pages], [INGREDIENT_PAGE_SIZE, INGREDIENT_PAGE_SIZE, 30])
+        walked = [pk for page in pages for pk in page]
+        self.assertEqual(walked, list(ranked.order_by('search_rank', 'name', 'id').values_list('id', flat=True)))
+
+    def test_descending_rank_is_walked_in_order(self):
+        # Like the trigram similarity of PostgreSQL: higher ranks first.
+        ranked = Ingredient.objects.annotate(search_rank=Length('name')).order_by('-search_rank', 'name')
+        walked = [pk for page in self._walk(ranked) for pk in page]
+        self.assertEqual(walked, list(ranked.order_by('-search_rank', 'name', 'id').values_list('id', flat=True)))
+        self.assertEqual(len(walked), 130)
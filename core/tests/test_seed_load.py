@@ -0,0 +1,61 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count, Q
+from django.test import TestCase, override_settings
+
+from core.models import Counter, Ingredient, Recipe, RecipeIngredient, ShoppingList, ShoppingListSnapshot
+
+
+class SeedLoadTests(TestCase):
+    def _seed(self, **options):
+        call_command(
+            'seed_load', users=3, ingredients=60, recipes=25, open_lists=2, closed_lists=5, stdout=StringIO(), **options
+        )
+
+    def test_rows_and_trigger_maintained_state(self):
+        catalog_version = Counter.read(Counter.CATALOG_VERSION)
+        self._seed()
+
+        self.assertEqual(get_user_model().objects.count(), 3)
+        self.assertEqual(Ingredient.objects.count(), 60)
+        self.assertEqual(Recipe.objects.count(), 25)
+        self.assertEqual(ShoppingList.objects.filter(is_closed=False).count(), 2)
+        self.assertEqual(ShoppingList.objects.filter(is_closed=True).count(), 5)
+        self.assertGreater(Counter.read(Counter.CATALOG_VERSION), catalog_version)
+        self.assertEqual(
+            Counter.read_many(Counter.RECIPES, Counter.OPEN_LISTS), {Counter.RECIPES: 25, Counter.OPEN_LISTS: 2}
+        )
+
+        # The child rows bypass the ORM: the triggers still saw every insert.
+        for recipe in Recipe.objects.annotate(ingredient_rows=Count('ingredients')):
+            self.assertGreater(recipe.ingredient_rows, 0)
+            self.assertEqual(recipe.version, recipe.ingredient_rows)
+
+        open_lists = ShoppingList.objects.filter(is_closed=False).annotate(
+            rows=Count('items'), checked_rows=Count('items', filter=Q(items__checked=True))
+        )
+        for shopping_list in open_lists:
+            self.assertGreater(shopping_list.rows, 0)
+            self.assertEqual(
+                (shopping_list.item_count, shopping_list.checked_count), (shopping_list.rows, shopping_list.checked_rows)
+            )
+            self.assertEqual(shopping_list.version, shopping_list.rows)
+
+        for shopping_list in ShoppingList.objects.filter(is_closed=True).select_related('snapshot'):
+            self.assertEqual((shopping_list.item_count, shopping_list.checked_count), (0, 0))
+            self.assertEqual(shopping_list.snapshot.item_count, shopping_list.summary['items'])
+            self.assertEqual(
+                sum(item.checked for item in shopping_list.snapshot.frozen_items()), shopping_list.summary['checked']
+            )
+
+    @override_settings(FREEZE_CLOSED_LISTS=False)
+    def test_closed_lists_keep_their_items_when_freezing_is_off(self):
+        self._seed()
+
+        self.assertFalse(ShoppingListSnapshot.objects.exists())
+        for shopping_list in ShoppingList.objects.filter(is_closed=True).annotate(rows=Count('items')):
+            self.assertEqual(shopping_list.item_count, shopping_list.rows)
+            self.assertEqual(shopping_list.summary['items'], shopping_list.rows)
+        self.assertEqual(RecipeIngredient.objects.values('recipe').distinct().count(), 25)
@@ -0,0 +1,130 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Ingredient, IngredientCategory, ShoppingList, ShoppingListItem, ShoppingListSnapshot
+
+
+class ShoppingListSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('archiviste', password='archiviste-password')
+        fruits = IngredientCategory.objects.create(name='Fruits')
+        cls.apple = Ingredient.objects.create(name='Pomme', category=fruits)
+        cls.pear = Ingredient.objects.create(name='Poire', category=fruits)
+        cls.salt = Ingredient.objects.create(name='Sel')
+
+    def setUp(self):
+        self.shopping_list = ShoppingList.objects.create(owner=self.user, name='Courses', people_count=2)
+        ShoppingListItem.objects.create(
+            shopping_list=self.shopping_list, ingredient=self.apple, name='Pomme', unit='unit',
+            quantity=Decimal('4'), per_person_quantity=Decimal('2'), checked=True,
+        )
+        ShoppingListItem.objects.create(
+            shopping_list=self.shopping_list, ingredient=self.pear, name='Poire', unit='kg', quantity=Decimal('1.5'),
+        )
+        ShoppingListItem.objects.create(
+            shopping_list=self.shopping_list, ingredient=self.salt, name='Sel', unit='g', quantity=Decimal('10'),
+        )
+        ShoppingListItem.objects.create(shopping_list=self.shopping_list, name='Bougies', quantity=Decimal('1'))
+
+    def test_close_freezes_items_in_display_order(self):
+        self.shopping_list.close()
+
+        self.assertFalse(self.shopping_list.items.exists())
+        snapshot = ShoppingListSnapshot.objects.get(shopping_list=self.shopping_list)
+        self.assertEqual(snapshot.item_count, 4)
+        self.assertEqual(
+            [(item.category, item.name, item.checked) for item in snapshot.frozen_items()],
+            [('Fruits', 'Poire', False), ('Fruits', 'Pomme', True), (None, 'Bougies', False), (None, 'Sel', False)],
+        )
+        self.assertEqual(self.shopping_list.summary['items'], 4)
+
+    def test_second_close_changes_nothing(self):
+        self.client.force_login(self.user)
+        url = reverse('shopping_list_close', args=[self.shopping_list.id])
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            self.client.post(url)
+        closed = ShoppingList.objects.select_related('snapshot').get(id=self.shopping_list.id)
+
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            response = self.client.post(url)
+        self.assertRedirects(response, reverse('shopping_list_archive'), fetch_redirect_response=False)
+        self.shopping_list.close()
+
+        reclosed = ShoppingList.objects.select_related('snapshot').get(id=self.shopping_list.id)
+        self.assertEqual(reclosed.summary, closed.summary)
+        self.assertEqual(reclosed.summary['items'], 4)
+        self.assertEqual(reclosed.closed_at, closed.closed_at)
+        self.assertEqual(bytes(reclosed.snapshot.data), bytes(closed.snapshot.data))
+        self.assertEqual(reclosed.snapshot.item_count, 4)
+
+    def test_changes_to_frozen_list_are_conflicts(self):
+        item_id = self.shopping_list.items.get(name='Poire').id
+        self.shopping_list.close()
+        self.client.force_login(self.user)
+
+        for name in ('shopping_list_toggle_item', 'shopping_list_remove_item'):
+            url = reverse(name, args=[self.shopping_list.id, item_id])
+            with self.subTest(name), self.assertLogs('mealplanner.instrumentation', 'INFO'):
+                response = self.client.post(url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+                self.assertEqual(response.status_code, 409)
+                self.assertIn('clôturée', response.json()['error'])
+
+                response = self.client.post(url)
+                self.assertRedirects(
+                    response, reverse('shopping_list_detail', args=[self.shopping_list.id]),
+                    fetch_redirect_response=False,
+                )
+
+    @override_settings(FREEZE_CLOSED_LISTS=False)
+    def test_close_keeps_items_when_freezing_is_off(self):
+        self.shopping_list.close()
+        self.assertEqual(self.shopping_list.items.count(), 4)
+        self.assertFalse(ShoppingListSnapshot.objects.exists())
+
+    def test_detail_orders_live_items_in_the_database(self):
+        ShoppingListItem.objects.create(shopping_list=self.shopping_list, name='allumettes', quantity=Decimal('1'))
+        self.client.force_login(self.user)
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            response = self.client.get(reverse('shopping_list_detail', args=[self.shopping_list.id]))
+
+        groups = response.context['item_groups']
+        self.assertEqual(
+            [(group['label'], [item.display_name for item in group['entries']]) for group in groups],
+            [('Fruits', ['Poire', 'Pomme']), ('Sans catégorie', ['allumettes', 'Bougies', 'Sel'])],
+        )
+
+    def test_detail_renders_frozen_list_like_live_list(self):
+        self.client.force_login(self.user)
+        url = reverse('shopping_list_detail', args=[self.shopping_list.id])
+        ShoppingList.objects.filter(id=self.shopping_list.id).update(is_closed=True)
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            live = self.client.get(url).context['item_groups']
+        ShoppingListSnapshot.freeze(self.shopping_list)
+        with self.assertLogs('mealplanner.instrumentation', 'INFO'):
+            response = self.client.get(url)
+
+        def flatten(groups):
+            return [
+                (group['label'], item.display_name, item.quantity, item.get_unit_display(), item.checked)
+                for group in groups
+                for item in group['entries']
+            ]
+
+        self.assertEqual(flatten(response.context['item_groups']), flatten(live))
+        self.assertContains(response, 'Bougies')
+
+    def test_thaw_restores_items(self):
+        self.shopping_list.close()
+        self.salt.delete()
+        self.shopping_list.snapshot.thaw()
+
+        items = {item.name: item for item in self.shopping_list.items.all()}
+        self.assertEqual(set(items), {'Pomme', 'Poire', 'Sel', 'Bougies'})
+        self.assertEqual(items['Pomme'].ingredient, self.apple)
+        self.assertEqual(items['Pomme'].per_person_quantity, Decimal('2'))
+        self.assertIsNone(items['Sel'].ingredient)
+        self.assertFalse(ShoppingListSnapshot.objects.exists())
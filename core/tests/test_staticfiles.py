@@ -0,0 +1,45 @@
+import gzip
+import json
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+
+class StaticPipelineTests(SimpleTestCase):
+    def setUp(self):
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        self.static_root = Path(static_root.name)
+
+        storages = {
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': 'mealplanner.staticfiles.PrecompressedManifestStaticFilesStorage'},
+        }
+        with override_settings(STATIC_ROOT=self.static_root, STORAGES=storages):
+            call_command('collectstatic', interactive=False, verbosity=0)
+
+        with open(self.static_root / 'staticfiles.json', encoding='utf-8') as handle:
+            self.manifest = json.load(handle)['paths']
+
+    def test_css_is_bundled_under_a_hashed_name(self):
+        bundle_name = self.manifest['core/css/style.css']
+        self.assertNotEqual(bundle_name, 'core/css/style.css')
+        bundle = (self.static_root / bundle_name).read_text(encoding='utf-8')
+
+        variables = (Path(settings.BASE_DIR) / 'core/static/core/css/variables.css').read_text(encoding='utf-8-sig')
+        self.assertIn(variables.strip(), bundle)
+        # Only the remote fonts are left to import, ahead of every rule.
+        imports = [line for line in bundle.splitlines() if line.startswith('@import')]
+        self.assertTrue(imports)
+        self.assertTrue(all('//' in line for line in imports))
+        self.assertTrue(bundle.startswith(imports[0]))
+
+    def test_hashed_files_have_precompressed_variants(self):
+        for name in ('core/css/style.css', 'core/js/app.js'):
+            hashed = self.static_root / self.manifest[name]
+            compressed = hashed.with_name(hashed.name + '.gz')
+            self.assertEqual(gzip.decompress(compressed.read_bytes()), hashed.read_bytes())
+            self.assertLess(compressed.stat().st_size, hashed.stat().st_size)
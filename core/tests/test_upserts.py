@@ -0,0 +1,101 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import QuerySet
+from django.test import TestCase
+
+from core.models import Ingredient, Recipe, RecipeIngredient, ShoppingList, ShoppingListItem, upsert_increment
+
+
+class UpsertIncrementTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('fusion', password='fusion-password')
+        cls.flour = Ingredient.objects.create(name='Farine')
+        cls.recipe = Recipe.objects.create(owner=cls.user, name='Pain')
+
+    def setUp(self):
+        self.shopping_list = ShoppingList.objects.create(owner=self.user, name='Courses', people_count=2)
+
+    def _add_to_recipe(self, amount, unit='g'):
+        key = {'recipe': self.recipe, 'ingredient': self.flour, 'unit': unit}
+        return upsert_increment(RecipeIngredient, match=key, values=key, field='quantity_per_person', amount=amount)
+
+    def _add_manual(self, amount, unit='g'):
+        return upsert_increment(
+            ShoppingListItem,
+            match={
+                'shopping_list': self.shopping_list, 'ingredient': self.flour, 'unit': unit,
+                'per_person_quantity__isnull': True,
+            },
+            values={
+                'shopping_list': self.shopping_list, 'ingredient': self.flour, 'name': 'Farine', 'unit': unit,
+                'per_person_quantity': None,
+            },
+            field='quantity',
+            amount=amount,
+        )
+
+    def test_same_natural_key_merges_quantities(self):
+        self.assertTrue(self._add_to_recipe(Decimal('100')))
+        self.assertFalse(self._add_to_recipe(Decimal('50')))
+        self.assertTrue(self._add_to_recipe(Decimal('1'), unit='kg'))
+
+        self.assertEqual(
+            sorted(RecipeIngredient.objects.values_list('unit', 'quantity_per_person')),
+            [('g', Decimal('150.00')), ('kg', Decimal('1.00'))],
+        )
+
+    def test_manual_and_per_person_rows_stay_apart(self):
+        # The partial unique constraints key manual and per-person rows apart.
+        per_person = ShoppingListItem.objects.create(
+            shopping_list=self.shopping_list, ingredient=self.flour, name='Farine', unit='g',
+            quantity=Decimal('200'), per_person_quantity=Decimal('100'),
+        )
+        self.assertTrue(self._add_manual(Decimal('30')))
+        self.assertFalse(self._add_manual(Decimal('20')))
+
+        manual = ShoppingListItem.objects.get(shopping_list=self.shopping_list, per_person_quantity__isnull=True)
+        self.assertEqual(manual.quantity, Decimal('50.00'))
+        per_person.refresh_from_db()
+        self.assertEqual(per_person.quantity, Decimal('200.00'))
+        self.assertEqual(self.shopping_list.items.count(), 2)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ShoppingListItem.objects.create(
+                shopping_list=self.shopping_list, ingredient=self.flour, name='Farine', unit='g', quantity=1,
+            )
+
+    def test_checked_manual_row_takes_the_increment(self):
+        # The checked state is not part of the natural key: no second row.
+        self._add_manual(Decimal('30'))
+        self.shopping_list.items.update(checked=True)
+        self.assertFalse(self._add_manual(Decimal('20')))
+
+        item = self.shopping_list.items.get()
+        self.assertEqual((item.quantity, item.checked), (Decimal('50.00'), True))
+
+    def test_concurrent_insert_is_folded_into_an_increment(self):
+        self._add_manual(Decimal('30'))
+        update = QuerySet.update
+        calls = []
+
+        def racing_update(queryset, **kwargs):
+            # The first UPDATE misses the row another request inserts right after.
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=racing_update):
+            self.assertFalse(self._add_manual(Decimal('20')))
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.shopping_list.items.get().quantity, Decimal('50.00'))
+
+    def test_integrity_error_without_a_row_to_update_is_raised(self):
+        self._add_manual(Decimal('30'))
+        with mock.patch.object(QuerySet, 'update', return_value=0):
+            with self.assertRaises(IntegrityError):
+                self._add_manual(Decimal('20'))
+        self.assertEqual(self.shopping_list.items.get().quantity, Decimal('30.00'))
@@ -6,6 +6,9 @@ urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('register/', views.register, name='register'),
 
+    path('api/ingredients/search/', views.api_ingredient_search, name='api_ingredient_search'),
+    path('api/recipes/search/', views.api_recipe_search, name='api_recipe_search'),
+
     path('ingredients/', views.ingredient_list, name='ingredient_list'),
     path('ingredients/<int:ingredient_id>/edit/', views.ingredient_edit, name='ingredient_edit'),
     path('ingredients/<int:ingredient_id>/delete/', views.ingredient_delete, name='ingredient_delete'),
@@ -24,5 +27,6 @@ urlpatterns = [
     path('lists/<int:list_id>/people/', views.shopping_list_update_people, name='shopping_list_update_people'),
     path('lists/<int:list_id>/items/<int:item_id>/toggle/', views.shopping_list_toggle_item, name='shopping_list_toggle_item'),
     path('lists/<int:list_id>/items/<int:item_id>/remove/', views.shopping_list_remove_item, name='shopping_list_remove_item'),
+    path('lists/<int:list_id>/events/', views.shopping_list_events, name='shopping_list_events'),
     path('lists/<int:list_id>/close/', views.shopping_list_close, name='shopping_list_close'),
 ]
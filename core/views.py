@@ -1,14 +1,29 @@
-﻿from decimal import Decimal
+﻿import hashlib
+from functools import partial
+from itertools import groupby
 from urllib.parse import urlencode
-from collections import OrderedDict
 
+from django.conf import settings
 from django.contrib import messages
-from django.contrib.auth import login
+from django.contrib.auth import get_user_model, login
 from django.contrib.auth.decorators import login_required
-from django.db.models import ProtectedError
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.db.models import Case, Count, OuterRef, ProtectedError, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import quote_etag
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import condition, require_GET
 
+from . import catalog, realtime
 from .forms import (
     AddRecipesForm,
     IngredientCategoryForm,
@@ -21,7 +36,20 @@ from .forms import (
     ShoppingListForm,
     UNIT_CHOICES_WITH_EMPTY,
 )
-from .models import Ingredient, IngredientCategory, Recipe, RecipeIngredient, ShoppingList, ShoppingListItem
+from .models import (
+    ITEM_DISPLAY_ORDER,
+    Counter,
+    GroupConcat,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingList,
+    ShoppingListItem,
+    ShoppingListSnapshot,
+    upsert_increment,
+)
+from .pagination import RECIPE_PAGE_SIZE, paginate_by_closed_at, paginate_by_name
+from .search import search_ingredients, search_recipes
 
 
 def _extract_ingredient_filters(source):
@@ -34,7 +62,7 @@ def _filter_ingredients(query, selected_category):
     ingredients = Ingredient.objects.select_related('category').order_by('name')
 
     if query:
-        ingredients = ingredients.filter(name__icontains=query)
+        ingredients = search_ingredients(ingredients, query)
 
     if selected_category == 'none':
         ingredients = ingredients.filter(category__isnull=True)
@@ -49,6 +77,43 @@ def _filter_ingredients(query, selected_category):
     return ingredients, selected_category
 
 
+def _paginate_ingredients(ingredients, query, selected_category, after=None):
+    estimate = None
+    if not query and not selected_category:
+        estimate = catalog.get_ingredient_count_estimate
+    return paginate_by_name(ingredients, after, estimate=estimate)
+
+
+def _ingredient_search_etag(request):
+    query, selected_category = _extract_ingredient_filters(request.GET)
+    after = request.GET.get('after') or ''
+    fingerprint = hashlib.sha1(f"{query}\n{selected_category}\n{after}".encode('utf-8')).hexdigest()[:16]
+    return f"{catalog.get_version()}-{fingerprint}"
+
+
+def _page_etag(request, *stamps):
+    # Validator of an HTML page: the version stamps of what it shows, the
+    # catalog version, and the session, which carries the user and the CSRF
+    # token of the layout.
+    parts = (*stamps, catalog.get_version(), request.session.session_key or '')
+    return quote_etag(hashlib.sha1('\n'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:20])
+
+
+def _revalidated(response, etag):
+    # Private to the session and always revalidated: the 304 is the cheap path.
+    response.headers['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _not_modified(request, etag):
+    # Pending flash messages are part of the page: never answer 304 over them.
+    if request.method not in ('GET', 'HEAD') or messages.get_messages(request):
+        return None
+    response = get_conditional_response(request, etag=etag)
+    return _revalidated(response, etag) if response is not None else None
+
+
 def _redirect_with_ingredient_filters(route_name, route_kwargs, query, selected_category):
     url = reverse(route_name, kwargs=route_kwargs)
     params = {}
@@ -61,31 +126,79 @@ def _redirect_with_ingredient_filters(route_name, route_kwargs, query, selected_
     return url
 
 
+def _group_label(ingredient):
+    if ingredient and ingredient.category:
+        return ingredient.category.name
+    return 'Sans catégorie'
+
+
+def _group_by_label(items, label):
+    # Items arrive in display order, so each category is a single run.
+    return [{'label': group_label, 'entries': list(entries)} for group_label, entries in groupby(items, key=label)]
+
+
 def _shopping_items_grouped_by_category(shopping_list):
-    items = list(shopping_list.items.select_related('ingredient__category'))
-
-    def sort_key(item):
-        category_name = ''
-        if item.ingredient and item.ingredient.category:
-            category_name = item.ingredient.category.name
-
-        has_category = bool(category_name)
-        category_sort = category_name.lower() if has_category else 'zzzzzzzz'
-        item_name_sort = item.display_name.lower()
-        return (category_sort, item.checked, item_name_sort)
-
-    grouped = OrderedDict()
-    for item in sorted(items, key=sort_key):
-        if item.ingredient and item.ingredient.category:
-            label = item.ingredient.category.name
-        else:
-            label = 'Sans catégorie'
+    items = shopping_list.items.select_related('ingredient__category').order_by(*ITEM_DISPLAY_ORDER)
+    return _group_by_label(items.iterator(), lambda item: _group_label(item.ingredient))
+
+
+def _frozen_items_grouped_by_category(snapshot):
+    # Frozen items are stored in display order already.
+    return _group_by_label(snapshot.frozen_items(), lambda item: item.category or 'Sans catégorie')
+
 
-        if label not in grouped:
-            grouped[label] = []
-        grouped[label].append(item)
+# The item rows embed CSRF forms: the cached fragment holds this placeholder,
+# swapped for the requesting user's token on the way out.
+_CSRF_PLACEHOLDER = 'csrf-token-placeholder'
 
-    return [{'label': label, 'entries': grouped_items} for label, grouped_items in grouped.items()]
+
+def _render_item_groups(request, shopping_list, item_groups):
+    # Cached per list version. created_at guards against a reused id, the
+    # catalog version against renamed ingredients and categories. item_groups
+    # is lazy: a cache hit never reads the items.
+    key = 'shopping_list_items:{}:{}:{}:{}:{}'.format(
+        shopping_list.id,
+        shopping_list.created_at.timestamp(),
+        shopping_list.version,
+        int(shopping_list.is_closed),
+        catalog.get_version(),
+    )
+    cache = caches[getattr(settings, 'SHOPPING_LIST_CACHE_ALIAS', 'default')]
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(
+            'core/partials/shopping_list_item_groups.html',
+            {'shopping_list': shopping_list, 'item_groups': item_groups, 'csrf_token': _CSRF_PLACEHOLDER},
+        )
+        cache.set(key, html, getattr(settings, 'SHOPPING_LIST_CACHE_TIMEOUT', 3600))
+    return mark_safe(html.replace(f'value="{_CSRF_PLACEHOLDER}"', f'value="{get_token(request)}"'))
+
+
+@login_required
+@require_GET
+@condition(etag_func=_ingredient_search_etag)
+def api_ingredient_search(request):
+    query, selected_category = _extract_ingredient_filters(request.GET)
+    ingredients, selected_category = _filter_ingredients(query, selected_category)
+    page = _paginate_ingredients(ingredients, query, selected_category, request.GET.get('after'))
+
+    response = JsonResponse(
+        {
+            'count': page.count_label,
+            'next': page.next_token,
+            'results': [
+                {
+                    'id': ingredient.id,
+                    'name': ingredient.name,
+                    'category': ingredient.category.name if ingredient.category else None,
+                }
+                for ingredient in page
+            ],
+        }
+    )
+    # Always revalidate: the browser replays the ETag and gets a 304 while the catalog is unchanged.
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 def register(request):
@@ -104,23 +217,24 @@ def register(request):
 
 @login_required
 def dashboard(request):
-    open_lists = ShoppingList.objects.filter(is_closed=False).order_by('-created_at')
-    active_list = open_lists.first()
+    # Counts come from the trigger-maintained counters: one query for the
+    # open lists (with their item counts), one for the recipe total.
+    open_lists = list(ShoppingList.objects.filter(is_closed=False).order_by('-created_at'))
 
     return render(
         request,
         'core/dashboard.html',
         {
-            'active_list': active_list,
+            'active_list': open_lists[0] if open_lists else None,
             'open_lists': open_lists,
-            'recipes_count': Recipe.objects.count(),
+            'recipes_count': Counter.read(Counter.RECIPES),
         },
     )
 
 
 @login_required
 def ingredient_list(request):
-    categories = IngredientCategory.objects.all().order_by('name')
+    categories = catalog.get_categories()
     search_query, selected_category = _extract_ingredient_filters(request.GET)
     ingredients, selected_category = _filter_ingredients(search_query, selected_category)
 
@@ -141,22 +255,13 @@ def ingredient_list(request):
                 messages.success(request, 'Ingrédient créé.')
                 return redirect('ingredient_list')
 
-    if request.GET.get('partial') == '1':
-        return render(
-            request,
-            'core/partials/ingredient_catalog.html',
-            {
-                'ingredients': ingredients,
-                'search_query': search_query,
-                'selected_category': selected_category,
-            },
-        )
+    ingredient_page = _paginate_ingredients(ingredients, search_query, selected_category)
 
     return render(
         request,
         'core/ingredient_list.html',
         {
-            'ingredients': ingredients,
+            'ingredient_page': ingredient_page,
             'categories': categories,
             'ingredient_form': ingredient_form,
             'category_form': category_form,
@@ -225,10 +330,86 @@ def ingredient_delete(request, ingredient_id):
     )
 
 
+def _category_names(category_ids, category_names):
+    names = [
+        category_names[category_id]
+        for category_id in (category_ids or '').split(',')
+        if category_id in category_names
+    ]
+    return sorted(names, key=str.lower)
+
+
+def _filter_recipes(query, selected_owner=''):
+    # Correlated subqueries rather than a GROUP BY: they only run for the rows
+    # of the page, which the (name, id) index yields in order.
+    recipe_ingredients = RecipeIngredient.objects.filter(recipe=OuterRef('pk')).order_by().values('recipe')
+    recipes = Recipe.objects.select_related('owner').annotate(
+        ingredient_count=Coalesce(Subquery(recipe_ingredients.annotate(total=Count('id')).values('total')), 0),
+        category_ids=Subquery(
+            recipe_ingredients.annotate(ids=GroupConcat('ingredient__category_id', distinct=True)).values('ids')
+        ),
+    )
+    if query:
+        recipes = search_recipes(recipes, query)
+    if selected_owner:
+        try:
+            recipes = recipes.filter(owner_id=int(selected_owner))
+        except ValueError:
+            selected_owner = ''
+    return recipes, selected_owner
+
+
+def _paginate_recipes(recipes, query, selected_owner, after=None):
+    estimate = None
+    if not query and not selected_owner:
+        estimate = partial(Counter.read, Counter.RECIPES)
+    page = paginate_by_name(recipes, after, page_size=RECIPE_PAGE_SIZE, estimate=estimate)
+
+    # Category names come from the cached catalog.
+    category_names = {str(category.id): category.name for category in catalog.get_categories()}
+    for recipe in page:
+        recipe.category_names = _category_names(recipe.category_ids, category_names)
+    return page
+
+
+@login_required
+@require_GET
+def api_recipe_search(request):
+    query = (request.GET.get('q') or '').strip()
+    recipes, selected_owner = _filter_recipes(query, (request.GET.get('owner') or '').strip())
+    page = _paginate_recipes(recipes, query, selected_owner, request.GET.get('after'))
+    return JsonResponse(
+        {
+            'count': page.count_label,
+            'next': page.next_token,
+            'results': [
+                {
+                    'id': recipe.id,
+                    'name': recipe.name,
+                    'ingredient_count': recipe.ingredient_count,
+                    'categories': recipe.category_names,
+                }
+                for recipe in page
+            ],
+        }
+    )
+
+
 @login_required
 def recipe_list(request):
-    recipes = Recipe.objects.all()
-    return render(request, 'core/recipe_list.html', {'recipes': recipes})
+    query = (request.GET.get('q') or '').strip()
+    recipes, selected_owner = _filter_recipes(query, (request.GET.get('owner') or '').strip())
+
+    return render(
+        request,
+        'core/recipe_list.html',
+        {
+            'recipe_page': _paginate_recipes(recipes, query, selected_owner, request.GET.get('after')),
+            'search_query': query,
+            'selected_owner': selected_owner,
+            'owners': get_user_model().objects.filter(recipes__isnull=False).distinct().order_by('username'),
+        },
+    )
 
 
 @login_required
@@ -245,7 +426,8 @@ def recipe_create(request):
 
 @login_required
 def recipe_detail(request, recipe_id):
-    recipe = get_object_or_404(Recipe, id=recipe_id)
+    recipe = get_object_or_404(catalog.annotate_version(Recipe.objects.all()), id=recipe_id)
+    catalog.prime_version(recipe.catalog_version)
 
     if request.method == 'POST':
         ingredient_query, selected_category = _extract_ingredient_filters(request.POST)
@@ -256,24 +438,17 @@ def recipe_detail(request, recipe_id):
             unit = add_form.cleaned_data['unit']
             quantity = add_form.cleaned_data['quantity_per_person']
 
-            existing = RecipeIngredient.objects.filter(
-                recipe=recipe,
-                ingredient=ingredient_ref,
-                unit=unit,
-            ).first()
-
-            if existing:
-                existing.quantity_per_person = (existing.quantity_per_person + quantity).quantize(Decimal('0.01'))
-                existing.save(update_fields=['quantity_per_person'])
-                messages.success(request, 'Ingrédient déjà présent: quantité mise à jour.')
-            else:
-                RecipeIngredient.objects.create(
-                    recipe=recipe,
-                    ingredient=ingredient_ref,
-                    unit=unit,
-                    quantity_per_person=quantity,
-                )
+            created = upsert_increment(
+                RecipeIngredient,
+                match={'recipe': recipe, 'ingredient': ingredient_ref, 'unit': unit},
+                values={'recipe': recipe, 'ingredient': ingredient_ref, 'unit': unit},
+                field='quantity_per_person',
+                amount=quantity,
+            )
+            if created:
                 messages.success(request, 'Ingrédient ajouté.')
+            else:
+                messages.success(request, 'Ingrédient déjà présent: quantité mise à jour.')
         else:
             messages.error(request, "Impossible d'ajouter cet ingrédient. Vérifiez la quantité.")
 
@@ -286,23 +461,26 @@ def recipe_detail(request, recipe_id):
             )
         )
 
-    ingredient_categories = IngredientCategory.objects.all().order_by('name')
+    etag = _page_etag(request, 'recipe', recipe.id, recipe.version, recipe.name)
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    ingredient_categories = catalog.get_categories()
     ingredient_query, selected_category = _extract_ingredient_filters(request.GET)
     ingredients, selected_category = _filter_ingredients(ingredient_query, selected_category)
 
     context = {
         'recipe': recipe,
-        'ingredients': ingredients,
+        'recipe_ingredients': recipe.ingredients.select_related('ingredient'),
+        'ingredient_page': _paginate_ingredients(ingredients, ingredient_query, selected_category),
         'ingredient_categories': ingredient_categories,
         'ingredient_query': ingredient_query,
         'selected_category': selected_category,
         'unit_choices': UNIT_CHOICES_WITH_EMPTY,
     }
 
-    if request.GET.get('partial') == 'recipe_ingredients':
-        return render(request, 'core/partials/recipe_ingredient_results.html', context)
-
-    return render(request, 'core/recipe_detail.html', context)
+    return _revalidated(render(request, 'core/recipe_detail.html', context), etag)
 
 
 @login_required
@@ -326,8 +504,8 @@ def recipe_ingredient_delete(request, ingredient_id):
     return render(request, 'core/ingredient_delete.html', {'ingredient': ingredient})
 
 
-def _get_list_for_user(list_id):
-    return get_object_or_404(ShoppingList, id=list_id)
+def _get_list_for_user(list_id, queryset=None):
+    return get_object_or_404(ShoppingList if queryset is None else queryset, id=list_id)
 
 
 @login_required
@@ -345,7 +523,8 @@ def shopping_list_create(request):
 
 @login_required
 def shopping_list_detail(request, list_id):
-    shopping_list = _get_list_for_user(list_id)
+    shopping_list = _get_list_for_user(list_id, catalog.annotate_version(ShoppingList.objects.all()))
+    catalog.prime_version(shopping_list.catalog_version)
 
     if request.method == 'POST':
         ingredient_query, selected_category = _extract_ingredient_filters(request.POST)
@@ -367,27 +546,32 @@ def shopping_list_detail(request, list_id):
             quantity = add_form.cleaned_data['quantity']
             unit = add_form.cleaned_data['unit']
 
-            existing = ShoppingListItem.objects.filter(
-                shopping_list=shopping_list,
-                ingredient=ingredient_ref,
-                unit=unit,
-                per_person_quantity__isnull=True,
-            ).first()
-
-            if existing:
-                existing.quantity = (existing.quantity + quantity).quantize(Decimal('0.01'))
-                existing.save(update_fields=['quantity'])
-                messages.success(request, 'Ingrédient déjà présent: quantité mise à jour.')
-            else:
-                ShoppingListItem.objects.create(
-                    shopping_list=shopping_list,
-                    ingredient=ingredient_ref,
-                    name=ingredient_ref.name,
-                    unit=unit,
-                    quantity=quantity,
-                    per_person_quantity=None,
-                )
+            match = {
+                'shopping_list': shopping_list,
+                'ingredient': ingredient_ref,
+                'unit': unit,
+                'per_person_quantity__isnull': True,
+            }
+            created = upsert_increment(
+                ShoppingListItem,
+                match=match,
+                values={
+                    'shopping_list': shopping_list,
+                    'ingredient': ingredient_ref,
+                    'name': ingredient_ref.name,
+                    'unit': unit,
+                    'per_person_quantity': None,
+                },
+                field='quantity',
+                amount=quantity,
+            )
+            item = ShoppingListItem.objects.select_related('ingredient').get(**match)
+            event_type = 'added' if created else 'quantity'
+            realtime.publish(shopping_list.id, realtime.item_event(event_type, item, _group_label(ingredient_ref)))
+            if created:
                 messages.success(request, 'Ingrédient ajouté à la liste.')
+            else:
+                messages.success(request, 'Ingrédient déjà présent: quantité mise à jour.')
         else:
             messages.error(request, "Impossible d'ajouter cet ingrédient. Vérifiez la quantité.")
 
@@ -400,24 +584,57 @@ def shopping_list_detail(request, list_id):
             )
         )
 
-    ingredient_categories = IngredientCategory.objects.all().order_by('name')
+    etag = _page_etag(
+        request,
+        'list',
+        shopping_list.id,
+        shopping_list.version,
+        shopping_list.is_closed,
+        shopping_list.people_count,
+        shopping_list.name,
+    )
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    if shopping_list.is_closed:
+        # Closed lists are read-only: no ingredient search, and frozen lists
+        # render from their snapshot row.
+        def closed_item_groups():
+            snapshot = ShoppingListSnapshot.objects.filter(shopping_list=shopping_list).first()
+            if snapshot is not None:
+                return _frozen_items_grouped_by_category(snapshot)
+            return _shopping_items_grouped_by_category(shopping_list)
+
+        item_groups = SimpleLazyObject(closed_item_groups)
+        response = render(
+            request,
+            'core/shopping_list_detail.html',
+            {
+                'shopping_list': shopping_list,
+                'item_groups': item_groups,
+                'item_groups_html': _render_item_groups(request, shopping_list, item_groups),
+            },
+        )
+        return _revalidated(response, etag)
+
+    ingredient_categories = catalog.get_categories()
     ingredient_query, selected_category = _extract_ingredient_filters(request.GET)
     ingredients, selected_category = _filter_ingredients(ingredient_query, selected_category)
 
+    item_groups = SimpleLazyObject(partial(_shopping_items_grouped_by_category, shopping_list))
     context = {
         'shopping_list': shopping_list,
-        'item_groups': _shopping_items_grouped_by_category(shopping_list),
-        'ingredients': ingredients,
+        'item_groups': item_groups,
+        'item_groups_html': _render_item_groups(request, shopping_list, item_groups),
+        'ingredient_page': _paginate_ingredients(ingredients, ingredient_query, selected_category),
         'ingredient_categories': ingredient_categories,
         'ingredient_query': ingredient_query,
         'selected_category': selected_category,
         'unit_choices': UNIT_CHOICES_WITH_EMPTY,
     }
 
-    if request.GET.get('partial') == 'shopping_list_ingredients':
-        return render(request, 'core/partials/shopping_list_ingredient_results.html', context)
-
-    return render(request, 'core/shopping_list_detail.html', context)
+    return _revalidated(render(request, 'core/shopping_list_detail.html', context), etag)
 
 
 @login_required
@@ -427,57 +644,31 @@ def shopping_list_add_recipes(request, list_id):
         messages.warning(request, "La liste est clôturée, impossible d'ajouter des recettes.")
         return redirect('shopping_list_detail', list_id=shopping_list.id)
 
-    recipes = Recipe.objects.all().prefetch_related('ingredients__ingredient')
-    form = AddRecipesForm(
-        request.POST or None,
-        recipes=recipes,
-        default_people=shopping_list.people_count,
-    )
+    form = AddRecipesForm(request.POST or None, default_people=shopping_list.people_count)
 
     if request.method == 'POST' and form.is_valid():
-        selected = form.selected_recipes()
-        if not selected:
-            form.add_error(None, 'Sélectionnez au moins une recette.')
-        else:
-            list_people = max(shopping_list.people_count, 1)
-            for recipe, people in selected:
-                ratio = Decimal(people) / Decimal(list_people)
-                for recipe_ingredient in recipe.ingredients.all():
-                    per_person = (recipe_ingredient.quantity_per_person * ratio).quantize(Decimal('0.0001'))
-                    existing = ShoppingListItem.objects.filter(
-                        shopping_list=shopping_list,
-                        ingredient=recipe_ingredient.ingredient,
-                        unit=recipe_ingredient.unit,
-                        per_person_quantity__isnull=False,
-                    ).first()
-                    if existing:
-                        existing.per_person_quantity = (existing.per_person_quantity + per_person).quantize(
-                            Decimal('0.0001')
-                        )
-                        existing.quantity = (Decimal(list_people) * existing.per_person_quantity).quantize(
-                            Decimal('0.01')
-                        )
-                        existing.name = recipe_ingredient.ingredient.name
-                        existing.save(update_fields=['per_person_quantity', 'quantity', 'name'])
-                    else:
-                        quantity = (Decimal(list_people) * per_person).quantize(Decimal('0.01'))
-                        ShoppingListItem.objects.create(
-                            shopping_list=shopping_list,
-                            ingredient=recipe_ingredient.ingredient,
-                            name=recipe_ingredient.ingredient.name,
-                            unit=recipe_ingredient.unit,
-                            quantity=quantity,
-                            per_person_quantity=per_person,
-                        )
-            messages.success(request, 'Recettes ajoutées à la liste.')
-            return redirect('shopping_list_detail', list_id=shopping_list.id)
+        # Only the selected recipes' ingredients are loaded.
+        created, updated = shopping_list.add_recipes(form.cleaned_data['selection'])
+        for event_type, items in (('added', created), ('quantity', updated)):
+            for item in items:
+                realtime.publish(
+                    shopping_list.id, realtime.item_event(event_type, item, _group_label(item.ingredient))
+                )
+        messages.success(request, 'Recettes ajoutées à la liste.')
+        return redirect('shopping_list_detail', list_id=shopping_list.id)
 
+    # First page of the picker; the search and further pages go through
+    # api_recipe_search.
+    query = (request.GET.get('q') or '').strip()
+    recipes, _ = _filter_recipes(query)
     return render(
         request,
         'core/shopping_list_add_recipes.html',
         {
             'shopping_list': shopping_list,
             'form': form,
+            'recipe_page': _paginate_recipes(recipes, query, '', request.GET.get('after')),
+            'search_query': query,
         },
     )
 
@@ -491,9 +682,8 @@ def shopping_list_update_people(request, list_id):
 
     form = PeopleCountForm(request.POST or None, instance=shopping_list)
     if request.method == 'POST' and form.is_valid():
-        form.save()
-        for item in shopping_list.items.filter(per_person_quantity__isnull=False):
-            item.recalculate()
+        shopping_list.set_people_count(form.cleaned_data['people_count'])
+        realtime.publish(shopping_list.id, {'type': 'people', 'people_count': shopping_list.people_count})
         messages.success(request, 'Nombre de personnes mis à jour.')
         return redirect('shopping_list_detail', list_id=shopping_list.id)
 
@@ -507,37 +697,111 @@ def shopping_list_update_people(request, list_id):
     )
 
 
+def _is_async(request):
+    return request.headers.get('x-requested-with') == 'XMLHttpRequest'
+
+
+def _requested_checked_state(request):
+    value = request.POST.get('checked')
+    if value in ('0', '1'):
+        return value == '1'
+    return None
+
+
+def _open_list_items(list_id, item_id):
+    return ShoppingListItem.objects.filter(id=item_id, shopping_list_id=list_id, shopping_list__is_closed=False)
+
+
+def _async_rejection(list_id, item_id, message):
+    # Only reached when the single-statement write matched nothing: tell a
+    # missing item apart from a closed list. A frozen list has no item rows
+    # left, so the list state is checked first.
+    shopping_list = _get_list_for_user(list_id)
+    if not shopping_list.is_closed:
+        get_object_or_404(ShoppingListItem, id=item_id, shopping_list=shopping_list)
+    return JsonResponse({'error': message}, status=409)
+
+
 @login_required
 def shopping_list_toggle_item(request, list_id, item_id):
+    closed_message = 'La liste est clôturée, impossible de modifier les achats.'
+    requested = _requested_checked_state(request) if request.method == 'POST' else None
+
+    if request.method == 'POST' and _is_async(request):
+        if requested is None:
+            checked = Case(When(checked=True, then=Value(False)), default=Value(True))
+        else:
+            checked = Value(requested)
+        if not _open_list_items(list_id, item_id).update(checked=checked):
+            return _async_rejection(list_id, item_id, closed_message)
+        if requested is None:
+            requested = ShoppingListItem.objects.values_list('checked', flat=True).get(id=item_id)
+        realtime.publish(list_id, {'type': 'checked', 'item': item_id, 'checked': requested})
+        return JsonResponse({'id': item_id, 'checked': requested})
+
     shopping_list = _get_list_for_user(list_id)
+    if request.method == 'POST' and shopping_list.is_closed:
+        messages.warning(request, closed_message)
+        return redirect('shopping_list_detail', list_id=shopping_list.id)
     item = get_object_or_404(ShoppingListItem, id=item_id, shopping_list=shopping_list)
 
     if request.method == 'POST':
-        if shopping_list.is_closed:
-            messages.warning(request, 'La liste est clôturée, impossible de modifier les achats.')
-            return redirect('shopping_list_detail', list_id=shopping_list.id)
-        item.checked = not item.checked
+        item.checked = (not item.checked) if requested is None else requested
         item.save(update_fields=['checked'])
+        realtime.publish(shopping_list.id, {'type': 'checked', 'item': item.id, 'checked': item.checked})
 
     return redirect('shopping_list_detail', list_id=shopping_list.id)
 
 
 @login_required
 def shopping_list_remove_item(request, list_id, item_id):
+    closed_message = 'La liste est clôturée, impossible de supprimer des éléments.'
+
+    if request.method == 'POST' and _is_async(request):
+        deleted, _ = _open_list_items(list_id, item_id).delete()
+        if not deleted:
+            return _async_rejection(list_id, item_id, closed_message)
+        realtime.publish(list_id, {'type': 'removed', 'item': item_id})
+        return HttpResponse(status=204)
+
     shopping_list = _get_list_for_user(list_id)
+    if request.method == 'POST' and shopping_list.is_closed:
+        messages.warning(request, closed_message)
+        return redirect('shopping_list_detail', list_id=shopping_list.id)
     item = get_object_or_404(ShoppingListItem, id=item_id, shopping_list=shopping_list)
     if request.method == 'POST':
-        if shopping_list.is_closed:
-            messages.warning(request, 'La liste est clôturée, impossible de supprimer des éléments.')
-            return redirect('shopping_list_detail', list_id=shopping_list.id)
         item.delete()
+        realtime.publish(shopping_list.id, {'type': 'removed', 'item': item_id})
         messages.success(request, 'Ingrédient supprimé de la liste.')
     return redirect('shopping_list_detail', list_id=shopping_list.id)
 
 
+@login_required
+def shopping_list_events(request, list_id):
+    shopping_list = _get_list_for_user(list_id)
+    # The stream stays open for up to an hour, and request_finished (which
+    # returns connections to the pool) only fires when it ends: hand the
+    # connection used by the lookups back now.
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+    if isinstance(request, ASGIRequest):
+        stream = realtime.stream_events_async(shopping_list.id)
+    else:
+        stream = realtime.stream_events(shopping_list.id)
+
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def shopping_list_close(request, list_id):
     shopping_list = _get_list_for_user(list_id)
+    if shopping_list.is_closed:
+        messages.info(request, 'Cette liste est déjà clôturée.')
+        return redirect('shopping_list_archive')
     if request.method == 'POST':
         shopping_list.close()
         messages.success(request, 'Liste clôturée et archivée.')
@@ -547,20 +811,21 @@ def shopping_list_close(request, list_id):
 
 @login_required
 def shopping_list_archive(request):
-    closed_lists = ShoppingList.objects.filter(is_closed=True).order_by('-closed_at')
-    return render(request, 'core/shopping_list_archive.html', {'closed_lists': closed_lists})
+    after = request.GET.get('after')
+    closed_lists = paginate_by_closed_at(ShoppingList.objects.filter(is_closed=True), after)
+    return render(
+        request,
+        'core/shopping_list_archive.html',
+        {'closed_lists': closed_lists, 'is_first_page': not after},
+    )
 
 
 @login_required
 def shopping_list_active(request):
-    open_lists = ShoppingList.objects.filter(is_closed=False).order_by('-created_at')
-    active_list = open_lists.first()
-    if not active_list:
+    active_list_id = (
+        ShoppingList.objects.filter(is_closed=False).order_by('-created_at').values_list('id', flat=True).first()
+    )
+    if not active_list_id:
         messages.info(request, 'Aucune liste active. Créez-en une nouvelle.')
         return redirect('shopping_list_create')
-    return redirect('shopping_list_detail', list_id=active_list.id)
-
-
-
-
-
+    return redirect('shopping_list_detail', list_id=active_list_id)
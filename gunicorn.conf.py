@@ -0,0 +1,8 @@
+# Read by gunicorn from the working directory (/app in the image).
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    # Drop the "livesum" gauges of a worker that exited (pool state), so a
+    # restarted worker is not counted twice.
+    multiprocess.mark_process_dead(worker.pid)
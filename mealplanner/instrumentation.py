@@ -0,0 +1,179 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+from .metrics import observe_connection, observe_pools, observe_request
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view_time = 0.0
+        self.template_time = 0.0
+        self.query_count = 0
+        self.query_time = 0.0
+        self.connection_count = 0
+        self.total_time = 0.0
+        self.response_size = None
+        self.url_name = None
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook: every query of the request goes through here.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.query_time += time.perf_counter() - started
+
+    def server_timing(self):
+        return ', '.join(
+            [
+                f'db;dur={self.query_time * 1000:.1f};desc="{self.query_count} queries"',
+                f'tpl;dur={self.template_time * 1000:.1f}',
+                f'view;dur={self.view_time * 1000:.1f}',
+                f'total;dur={self.total_time * 1000:.1f}',
+            ]
+        )
+
+    def as_log_record(self, request, response):
+        return {
+            'url_name': self.url_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': self.query_count,
+            'db_ms': round(self.query_time * 1000, 1),
+            'connections': self.connection_count,
+            'template_ms': round(self.template_time * 1000, 1),
+            'view_ms': round(self.view_time * 1000, 1),
+            'total_ms': round(self.total_time * 1000, 1),
+            'bytes': self.response_size,
+        }
+
+
+def current_metrics():
+    return _current.get()
+
+
+@receiver(connection_created)
+def _count_connection(sender, connection, **kwargs):
+    # With persistent connections most requests should report none.
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.connection_count += 1
+    if getattr(settings, 'METRICS_ENABLED', True):
+        observe_connection(connection.alias)
+
+
+def _wrap_connections(metrics):
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(metrics))
+    return stack
+
+
+class InstrumentationMiddleware:
+    # Keep it first in MIDDLEWARE so "total" covers the whole stack. "view" runs
+    # from the view call until its response is back here, so it also includes
+    # the response hooks of the middleware listed below (session save, ...).
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with _wrap_connections(metrics):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(metrics, request, response)
+
+    async def __acall__(self, request):
+        # Connections belong to a thread: install the wrappers in the one that
+        # serves this request's sync code (views, ORM). The ContextVar is copied
+        # into it by sync_to_async.
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            stack = await sync_to_async(_wrap_connections)(metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _current.reset(token)
+        return self._finish(metrics, request, response)
+
+    def _finish(self, metrics, request, response):
+        if metrics.view_started is not None:
+            metrics.view_time = time.perf_counter() - metrics.view_started
+        metrics.total_time = time.perf_counter() - metrics.started
+        if not response.streaming:
+            metrics.response_size = len(response.content)
+        match = request.resolver_match
+        metrics.url_name = (match.url_name or match.view_name) if match else None
+
+        if getattr(settings, 'SERVER_TIMING', True):
+            response['Server-Timing'] = metrics.server_timing()
+        logger.info(json.dumps(metrics.as_log_record(request, response)))
+        if getattr(settings, 'METRICS_ENABLED', True):
+            observe_request(metrics, request.method, response.status_code)
+            observe_pools()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+        return None
+
+
+class _InstrumentedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = current_metrics()
+        if metrics is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    # Times top-level renders only: includes happen inside the engine and are
+    # part of their parent's render.
+    def from_string(self, template_code):
+        return _InstrumentedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _InstrumentedTemplate(super().get_template(template_name))
@@ -0,0 +1,165 @@
+import os
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from prometheus_client.core import GaugeMetricFamily, HistogramMetricFamily
+
+# With PROMETHEUS_MULTIPROC_DIR set (see Dockerfile), prometheus_client keeps
+# each worker's samples in mmap files on local disk and /metrics sums them,
+# whichever worker answers the scrape.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+LIST_ITEM_BUCKETS = (0, 5, 10, 20, 30, 50, 75, 100, 150, 250)
+
+REQUESTS = Counter(
+    'mealplanner_http_requests_total',
+    'HTTP requests by URL name, method and status.',
+    ['url_name', 'method', 'status'],
+)
+LATENCY = Histogram(
+    'mealplanner_http_request_duration_seconds',
+    'Time spent serving a request, middleware included.',
+    ['url_name', 'method'],
+    buckets=LATENCY_BUCKETS,
+)
+QUERIES = Histogram(
+    'mealplanner_http_request_db_queries',
+    'SQL queries run while serving a request.',
+    ['url_name', 'method'],
+    buckets=QUERY_BUCKETS,
+)
+CONNECTIONS = Counter(
+    'mealplanner_db_connections_total',
+    'Database connections set up by Django (checked out of the pool when pooling is on).',
+    ['alias'],
+)
+POOL_CONNECTIONS = Gauge(
+    'mealplanner_db_pool_connections', 'Connections held by the pools.', ['alias', 'state'], multiprocess_mode='livesum'
+)
+POOL_MAX_SIZE = Gauge(
+    'mealplanner_db_pool_max_size', 'Pool size limits, summed over workers.', ['alias'], multiprocess_mode='livesum'
+)
+POOL_WAITING = Gauge(
+    'mealplanner_db_pool_waiting_requests', 'Requests waiting for a connection.', ['alias'], multiprocess_mode='livesum'
+)
+POOL_REQUESTS = Counter('mealplanner_db_pool_requests', 'Connections requested from the pools.', ['alias'])
+# Overflow: every connection was in use and the request had to queue.
+POOL_QUEUED = Counter(
+    'mealplanner_db_pool_queued_requests', 'Pool requests that found no free connection.', ['alias']
+)
+POOL_WAIT = Counter('mealplanner_db_pool_wait_seconds', 'Time spent waiting for a pool connection.', ['alias'])
+POOL_TIMEOUTS = Counter('mealplanner_db_pool_timeouts', 'Pool requests that timed out.', ['alias'])
+
+
+def observe_request(request_metrics, method, status):
+    # Unresolved paths share one label value: raw paths would explode cardinality.
+    url_name = request_metrics.url_name or 'unresolved'
+    REQUESTS.labels(url_name, method, str(status)).inc()
+    LATENCY.labels(url_name, method).observe(request_metrics.total_time)
+    QUERIES.labels(url_name, method).observe(request_metrics.query_count)
+
+
+def observe_connection(alias):
+    CONNECTIONS.labels(alias).inc()
+
+
+def observe_pools():
+    # Each gunicorn worker has its own pool and reports it after every request:
+    # the gauges add up over the live workers and the counters grow by what
+    # the pool counted since the last report, so /metrics gives the whole
+    # service whichever worker answers the scrape.
+    for connection in connections.all():
+        pool = getattr(connection, 'pool', None)
+        if pool is None:
+            continue
+        alias = connection.alias
+        # psycopg leaves out the counters that are still at zero.
+        stats = pool.pop_stats()
+        size, available = stats.get('pool_size', 0), stats.get('pool_available', 0)
+        POOL_CONNECTIONS.labels(alias, 'in_use').set(size - available)
+        POOL_CONNECTIONS.labels(alias, 'idle').set(available)
+        POOL_MAX_SIZE.labels(alias).set(stats.get('pool_max', 0))
+        POOL_WAITING.labels(alias).set(stats.get('requests_waiting', 0))
+        POOL_REQUESTS.labels(alias).inc(stats.get('requests_num', 0))
+        POOL_QUEUED.labels(alias).inc(stats.get('requests_queued', 0))
+        POOL_WAIT.labels(alias).inc(stats.get('requests_wait_ms', 0) / 1000)
+        POOL_TIMEOUTS.labels(alias).inc(stats.get('requests_errors', 0))
+
+
+class DomainCollector:
+    # Read from the database at scrape time, so they need no cross-process aggregation.
+    def collect(self):
+        from core.models import Counter as StoredCounter, Ingredient, IngredientCategory, ShoppingList
+
+        counters = StoredCounter.read_many(StoredCounter.OPEN_LISTS, StoredCounter.RECIPES)
+
+        # Aggregates only: a per-list label would grow with every open list and
+        # expose each list's contents to whoever scrapes.
+        aggregates = {f'le_{bound}': Count('id', filter=Q(item_count__lte=bound)) for bound in LIST_ITEM_BUCKETS}
+        totals = ShoppingList.objects.filter(is_closed=False).aggregate(
+            lists=Count('id'),
+            items=Coalesce(Sum('item_count'), 0),
+            checked=Coalesce(Sum('checked_count'), 0),
+            **aggregates,
+        )
+
+        lists = GaugeMetricFamily('mealplanner_open_lists', 'Open shopping lists.')
+        lists.add_metric([], counters[StoredCounter.OPEN_LISTS])
+        yield lists
+
+        items = GaugeMetricFamily('mealplanner_open_list_items', 'Items across open shopping lists.', labels=['checked'])
+        items.add_metric(['true'], totals['checked'])
+        items.add_metric(['false'], totals['items'] - totals['checked'])
+        yield items
+
+        per_list = HistogramMetricFamily(
+            'mealplanner_open_list_size',
+            'Items per open shopping list.',
+            buckets=[(str(bound), totals[f'le_{bound}']) for bound in LIST_ITEM_BUCKETS] + [('+Inf', totals['lists'])],
+            sum_value=totals['items'],
+        )
+        yield per_list
+
+        for name, documentation, model in (
+            ('mealplanner_catalog_ingredients', 'Ingredients in the catalog.', Ingredient),
+            ('mealplanner_catalog_categories', 'Ingredient categories.', IngredientCategory),
+        ):
+            gauge = GaugeMetricFamily(name, documentation)
+            gauge.add_metric([], model.objects.count())
+            yield gauge
+
+        recipes = GaugeMetricFamily('mealplanner_recipes', 'Recipes.')
+        recipes.add_metric([], counters[StoredCounter.RECIPES])
+        yield recipes
+
+
+def _registry():
+    registry = CollectorRegistry(auto_describe=True)
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry.register(REGISTRY)
+    registry.register(DomainCollector())
+    return registry
+
+
+@require_GET
+def metrics_view(request):
+    # Denied unless a token is configured: the web container's port can be
+    # reached without going through the nginx allow list. DEBUG keeps it open
+    # for local development.
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        if not settings.DEBUG:
+            raise Http404
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
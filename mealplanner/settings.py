@@ -53,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'mealplanner.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,7 +67,8 @@ ROOT_URLCONF = 'mealplanner.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates + mesure du temps de rendu (cf. mealplanner/instrumentation.py)
+        'BACKEND': 'mealplanner.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -90,8 +92,32 @@ if DATABASE_URL:
     # PostgreSQL pour production (Docker)
     import dj_database_url
     DATABASES = {
-        'default': dj_database_url.parse(DATABASE_URL)
+        'default': dj_database_url.parse(DATABASE_URL, conn_health_checks=True)
     }
+    # Par défaut, pool de connexions psycopg (paquet psycopg[pool]) : en ASGI
+    # chaque requête tourne dans son propre thread, des connexions persistantes
+    # s'y accumuleraient. Le pool est propre à chaque worker gunicorn
+    # (WEB_CONCURRENCY) : DB_MAX_CONNECTIONS, le budget de connexions de
+    # l'application (sous max_connections de PostgreSQL, 100 par défaut), est
+    # partagé entre les workers, moins la connexion LISTEN de chacun
+    # (cf. core/realtime.py). Au-delà, les requêtes attendent une connexion
+    # libre (DB_POOL_TIMEOUT secondes au plus).
+    # DB_POOL=False (serveur WSGI uniquement) garde à la place chaque connexion
+    # DB_CONN_MAX_AGE secondes, vérifiée avant réutilisation.
+    if env_bool('DB_POOL', True):
+        WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY') or '1')
+        DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS') or '80')
+        DB_POOL_MAX_SIZE = int(
+            os.environ.get('DB_POOL_MAX_SIZE') or max(DB_MAX_CONNECTIONS // WEB_CONCURRENCY - 1, 2)
+        )
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': min(int(os.environ.get('DB_POOL_MIN_SIZE') or '2'), DB_POOL_MAX_SIZE),
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT') or '10'),
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE') or '60')
 else:
     # SQLite pour développement local
     DATABASES = {
@@ -101,6 +127,77 @@ else:
         }
     }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    # Lookups trigram (recherche d'ingrédients, cf. core/search.py)
+    INSTALLED_APPS.append('django.contrib.postgres')
+
+# Recherche d'ingrédients : backend choisi selon la base (pg_trgm ou FTS5),
+# surchargeable avec un chemin pointé vers une classe exposant search(queryset, query).
+INGREDIENT_SEARCH_BACKEND = os.environ.get('INGREDIENT_SEARCH_BACKEND') or None
+
+# Cache (catalogue d'ingrédients/catégories, cf. core/catalog.py).
+# La version du catalogue est stockée en base : le cache local-mémoire de
+# chaque worker gunicorn reste cohérent sans backend partagé.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'list-courses'),
+    }
+}
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', '3600'))
+
+# Rendu des articles d'une liste mis en cache par version de la liste
+# (ShoppingList.version, incrémentée par des triggers à chaque modification).
+SHOPPING_LIST_CACHE_ALIAS = 'default'
+SHOPPING_LIST_CACHE_TIMEOUT = int(os.environ.get('SHOPPING_LIST_CACHE_TIMEOUT', '3600'))
+
+# Diffusion temps réel des modifications de listes (SSE, cf. core/realtime.py).
+# Avec PostgreSQL, LISTEN/NOTIFY relaie chaque modification à tous les workers
+# gunicorn ; sinon (SQLite, développement) le broker vit dans le processus et
+# ne convient qu'à un seul processus.
+SHOPPING_LIST_BROKER = os.environ.get('SHOPPING_LIST_BROKER') or (
+    'core.realtime.PostgresBroker'
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql'
+    else 'core.realtime.InProcessBroker'
+)
+
+# Listes clôturées : les articles sont figés dans un instantané compressé
+# (ShoppingListSnapshot) et les lignes ShoppingListItem supprimées.
+FREEZE_CLOSED_LISTS = env_bool('FREEZE_CLOSED_LISTS', True)
+
+# Stockage à froid (manage.py archive_compact / archive_restore) : les listes
+# clôturées depuis plus de ARCHIVE_RETENTION_DAYS jours partent dans des
+# fichiers NDJSON compressés de ARCHIVE_EXPORT_DIR.
+ARCHIVE_RETENTION_DAYS = int(os.environ.get('ARCHIVE_RETENTION_DAYS', '365'))
+ARCHIVE_EXPORT_DIR = Path(os.environ.get('ARCHIVE_EXPORT_DIR', BASE_DIR / 'archives'))
+
+# Instrumentation par requête (cf. mealplanner/instrumentation.py) : en-tête
+# Server-Timing visible dans les devtools et une ligne de log JSON par requête.
+SERVER_TIMING = env_bool('SERVER_TIMING', True)
+
+# Métriques Prometheus sur /metrics (cf. mealplanner/metrics.py). Avec plusieurs
+# workers gunicorn, définir PROMETHEUS_MULTIPROC_DIR (répertoire local vidé au
+# démarrage). METRICS_TOKEN est exigé en « Authorization: Bearer » ; sans
+# jeton, /metrics répond 404 (sauf en DEBUG).
+METRICS_ENABLED = env_bool('METRICS_ENABLED', True)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'mealplanner.instrumentation': {
+            'handlers': ['console'],
+            'level': os.environ.get('INSTRUMENTATION_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -116,6 +213,24 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Fichiers statiques en production (cf. mealplanner/staticfiles.py) : la CSS
+# est regroupée en un fichier, les noms sont hachés (cache long sans risque) et
+# collectstatic produit des variantes .gz (.br si le paquet brotli est
+# installé) servies telles quelles par nginx. Désactivé par défaut avec DEBUG.
+STATIC_MANIFEST = env_bool('STATIC_MANIFEST', not DEBUG)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'mealplanner.staticfiles.PrecompressedManifestStaticFilesStorage'
+            if STATIC_MANIFEST
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = 'login'